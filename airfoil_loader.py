@@ -1,5 +1,6 @@
 from pathlib import Path
-import yaml
+import json
+import os
 import random
 
 def load_airfoil(name):
@@ -25,6 +26,8 @@ def load_airfoil(name):
     if not info_file.exists():
         raise FileNotFoundError(f"Arquivo info.yaml não encontrado em '{af_dir}'")
 
+    import yaml     # Só é necessário ao refazer o índice do catálogo
+
     with open(info_file, "r") as f:
         info = yaml.safe_load(f)
 
@@ -43,51 +46,130 @@ def load_airfoil(name):
         raise FileNotFoundError(f"Arquivo geometry.dat não encontrado em '{af_dir}'")
 
     return {
+        "name": name,
         "cl_max": summary["cl_max"],
         "alpha_cl_max": summary["alpha_cl_max"],
         "dat_path": str(dat_file)
     }
 
 # ============================================================
-# LOOP DE CARREGAMENTO ORGANIZADO POR CATEGORIA
+# CATÁLOGO INDEXADO
 # ============================================================
 
-airfoils_database_asa = {} # Apenas assymmetric
-airfoils_database_eh = {}  # symmetric e inverted
-airfoils_database_ev = {}  # Apenas symmetric
-
 base_path = "airfoils"
-base_dir = Path(base_path)
-
-if base_dir.exists() and base_dir.is_dir():
-    # Mapeamento de pastas para seus respectivos dicionários alvo
-    # Pasta -> Lista de dicionários onde deve ser incluído
-    mapping = {
-        "assymmetric": [airfoils_database_asa],
-        "symmetric": [airfoils_database_eh, airfoils_database_ev],
-        "inverted": [airfoils_database_eh]
-    }
+INDEX_FILE = "index.json"
+
+# Pasta -> categorias (bancos) em que os perfis da pasta entram
+MAPPING = {
+    "assymmetric": ["asa"],
+    "symmetric": ["eh", "ev"],
+    "inverted": ["eh"]
+}
+
+class AirfoilCatalog:
+    """
+    Catálogo dos perfis em airfoils/, lido de um índice compacto (airfoils/index.json).
 
-    for subfolder_name, targets in mapping.items():
-        subfolder_path = base_dir / subfolder_name
-        
-        if subfolder_path.exists() and subfolder_path.is_dir():
-            for folder in subfolder_path.iterdir():
+    O índice guarda o resumo de cada perfil, a data de modificação de cada pasta e a de
+    cada info.yaml. Ele só é refeito (lendo todos os info.yaml) quando alguma delas muda:
+    perfil novo, removido, arquivo substituído ou info.yaml editado no lugar. Para forçar a
+    releitura, use rebuild().
+
+    Nada é lido até o primeiro acesso a database() ou names().
+    """
+
+    def __init__(self, base_path=base_path, index_file=INDEX_FILE):
+        self.base_dir = Path(base_path)
+        self.index_path = self.base_dir / index_file
+        self._databases = None
+
+    def signature(self):
+        # Data de modificação de cada subpasta, de cada pasta de perfil e do seu info.yaml
+        # (sem abrir arquivos): editar o info.yaml no lugar não muda a data da pasta
+        signature = {}
+        for subfolder_name in MAPPING:
+            subfolder_path = self.base_dir / subfolder_name
+            if not subfolder_path.is_dir():
+                continue
+            signature[subfolder_name] = subfolder_path.stat().st_mtime_ns
+            for entry in os.scandir(subfolder_path):
+                if entry.is_dir():
+                    signature[f"{subfolder_name}/{entry.name}"] = entry.stat().st_mtime_ns
+                    try:
+                        info_mtime = os.stat(os.path.join(entry.path, "info.yaml")).st_mtime_ns
+                    except OSError:
+                        info_mtime = None
+                    signature[f"{subfolder_name}/{entry.name}/info.yaml"] = info_mtime
+        return signature
+
+    def _read_index(self, signature):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return index if index.get("signature") == signature else None
+
+    def _build_index(self, signature):
+        airfoils = {}
+        for subfolder_name in MAPPING:
+            subfolder_path = self.base_dir / subfolder_name
+            if not subfolder_path.is_dir():
+                continue
+            for folder in sorted(subfolder_path.iterdir()):
                 if folder.is_dir():
                     try:
-                        airfoil_name = folder.name
-                        data = load_airfoil(airfoil_name)
-                        
-                        # Adiciona o perfil nos dicionários correspondentes
-                        for target_dict in targets:
-                            target_dict[airfoil_name] = data
-                        
-                        print(f"Sucesso: {airfoil_name} carregado em sua categoria ({subfolder_name}).")
-                        
+                        airfoils.setdefault(subfolder_name, {})[folder.name] = load_airfoil(folder.name)
                     except (FileNotFoundError, KeyError) as e:
                         print(f"⚠️ Erro ao carregar '{folder.name}': {e}")
-else:
-    print(f"⚠️ Erro: O diretório base '{base_path}' não foi encontrado.")
+
+        index = {"signature": signature, "airfoils": airfoils}
+
+        # Escrita atômica; sem permissão de escrita o índice só não é reaproveitado
+        tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f, indent=1)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            pass
+        return index
+
+    def load(self, force=False):
+        if not self.base_dir.is_dir():
+            print(f"⚠️ Erro: O diretório base '{self.base_dir}' não foi encontrado.")
+            self._databases = {"asa": {}, "eh": {}, "ev": {}}
+            return self._databases
+
+        signature = self.signature()
+        index = None if force else self._read_index(signature)
+        if index is None:
+            index = self._build_index(signature)
+
+        databases = {"asa": {}, "eh": {}, "ev": {}}
+        for subfolder_name, targets in MAPPING.items():
+            for airfoil_name, data in index["airfoils"].get(subfolder_name, {}).items():
+                for target in targets:
+                    databases[target][airfoil_name] = data
+
+        self._databases = databases
+        print(f"📦 Catálogo carregado: {len(databases['asa'])} perfis de asa, {len(databases['eh'])} de EH, {len(databases['ev'])} de EV.")
+        return databases
+
+    def rebuild(self):
+        return self.load(force=True)
+
+    def database(self, category):
+        # category: 'asa', 'eh' ou 'ev'
+        if self._databases is None:
+            self.load()
+        return self._databases[category]
+
+    def names(self, category):
+        return sorted(self.database(category).keys())
+
+
+catalog = AirfoilCatalog()
 
 def select_airfoil(name_or_random, database, label="Componente"):
     """
@@ -107,12 +189,26 @@ def select_airfoil(name_or_random, database, label="Componente"):
 
     return database[chosen_name]
 
-LISTA_ASA = sorted(list(airfoils_database_asa.keys()))
-LISTA_EH  = sorted(list(airfoils_database_eh.keys()))
-LISTA_EV  = sorted(list(airfoils_database_ev.keys()))
-
-print(f"📦 Catálogo carregado: {len(LISTA_ASA)} perfis de asa, {len(LISTA_EH)} de EH, {len(LISTA_EV)} de EV.")
+# ============================================================
+# INTERFACE DE MÓDULO (CARREGADA NO PRIMEIRO ACESSO)
+# ============================================================
 
-# print(airfoils_database_asa)
-# print(airfoils_database_eh)
-# print(airfoils_database_ev)
\ No newline at end of file
+# LISTA_* e airfoils_database_* ficam fora do __all__ para que "from airfoil_loader import *"
+# não dispare a leitura do catálogo
+__all__ = ["load_airfoil", "select_airfoil", "AirfoilCatalog", "catalog"]
+
+_LAZY = {
+    "airfoils_database_asa": lambda: catalog.database("asa"),   # Apenas assymmetric
+    "airfoils_database_eh": lambda: catalog.database("eh"),     # symmetric e inverted
+    "airfoils_database_ev": lambda: catalog.database("ev"),     # Apenas symmetric
+    "LISTA_ASA": lambda: catalog.names("asa"),
+    "LISTA_EH": lambda: catalog.names("eh"),
+    "LISTA_EV": lambda: catalog.names("ev"),
+}
+
+def __getattr__(name):
+    if name in _LAZY:
+        value = _LAZY[name]()
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,295 @@
+"""
+Banco de análise de uma campanha de otimização.
+
+Uma execução com MPI grava um banco do SqliteRecorder por processo (<db>0, <db>1, ... ou
+<db>_0, <db>_1, ...). O AnalysisStore junta todos em uma única tabela SQLite com uma linha
+por indivíduo distinto:
+
+- os indivíduos repetidos (mesmas variáveis de design, o DE reavalia vários) são gravados
+  uma vez só, com o número de avaliações em n_evaluations
+- viabilidade e violação total das restrições são calculadas na junção
+- a tabela sources guarda o último counter juntado de cada banco, então juntar de novo
+  os mesmos bancos só acrescenta as iterações gravadas depois
+- há índices no score, nas restrições e em (feasible, generation, score), então as
+  consultas de frente de Pareto, melhor viável por geração e histograma de violações
+  são buscas no índice em vez de varreduras dos bancos do recorder
+
+A geração de cada indivíduo vem do checkpoint do PoolDifferentialEvolutionDriver ao lado
+do banco (<db>.ckpt), que guarda a iteração em que cada geração começou, inclusive as de
+uma execução retomada com --resume. Sem checkpoint (bancos por processo do MPI), a geração
+é só estimada pelo contador, pelo tamanho da população e pelo número de processos, e as
+iterações do modo surrogate ou de uma execução retomada ficam com a geração errada.
+"""
+import glob
+import hashlib
+import os
+import pickle
+import re
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from recorder_reader import RecorderReader, FEASIBILITY, DEFAULT_COLUMNS, SCORE
+from variables import DESIGN_VARIABLES
+
+
+def rank_paths(db_path):
+    '''
+    Bancos de cada processo de uma execução paralela (ou o próprio banco, se houver só ele)
+    '''
+    paths = [p for p in glob.glob(glob.escape(db_path) + '*')
+             if re.fullmatch(r'_?\d+', p[len(db_path):])]
+    paths.sort(key=lambda p: int(p[len(db_path):].lstrip('_')))
+    if not paths and os.path.exists(db_path):
+        paths = [db_path]
+    return paths
+
+
+def generation_map(db_path):
+    '''
+    (início de cada geração, iter_count do checkpoint) lidos de <db>.ckpt, ou None se o banco
+    não tem um checkpoint com esse registro
+    '''
+    try:
+        with open(f'{db_path}.ckpt', 'rb') as f:
+            state = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    starts = state.get('generation_starts')
+    if starts is None or len(starts) != state['generation'] + 1 or 'iter_count' not in state:
+        return None
+    return np.asarray(starts), state['iter_count']
+
+
+def _iterations(cases, counters):
+    # Número da iteração do driver no fim do iteration_coordinate ('rank0:...|12'), ou counter - 1
+    numbers = pd.Series(cases, dtype=object).str.extract(r'\|(\d+)$')[0]
+    return np.where(numbers.isna(), counters - 1, pd.to_numeric(numbers, errors='coerce').fillna(-1)).astype(int)
+
+
+def _sql_name(name):
+    # Coluna SQL de uma variável: o nome sem o caminho do subsistema
+    return name.split('.')[-1]
+
+
+def _violation(values, lower, upper):
+    # Violação de um limite (0 quando respeitado), vetorizada
+    violation = np.zeros(len(values))
+    if lower is not None:
+        violation = np.maximum(violation, lower - values)
+    if upper is not None:
+        violation = np.maximum(violation, values - upper)
+    return violation
+
+
+class AnalysisStore:
+    """
+    Tabela única e indexada dos indivíduos de uma ou mais execuções.
+
+    - merge(paths, pop_size, n_ranks, generation_offset): junta bancos do SqliteRecorder,
+      sem repetir indivíduos
+    - pareto_front(objectives): indivíduos viáveis não dominados
+    - best_per_generation(): melhor indivíduo viável de cada geração
+    - violation_histogram(name): distribuição das violações de uma restrição
+    """
+
+    def __init__(self, path, columns=DEFAULT_COLUMNS, bounds=FEASIBILITY):
+        self.path = path
+        self.columns = list(dict.fromkeys(list(columns) + list(bounds) + [SCORE]))
+        self.bounds = bounds
+        self.sql_columns = {name: _sql_name(name) for name in self.columns}
+        if len(set(self.sql_columns.values())) != len(self.columns):
+            raise ValueError('Duas variáveis resultam na mesma coluna do banco de análise.')
+        self.design_columns = [name for name in self.columns if name in DESIGN_VARIABLES]
+
+        self.conn = sqlite3.connect(path)
+        self._create()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _create(self):
+        values = ', '.join(f'"{col}" REAL' for col in self.sql_columns.values())
+        with self.conn:
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS individuals ('
+                'hash TEXT PRIMARY KEY, source TEXT, rank INTEGER, counter INTEGER, "case" TEXT, '
+                'generation INTEGER, n_evaluations INTEGER NOT NULL DEFAULT 1, '
+                f'feasible INTEGER, violation REAL, {values})'
+            )
+            # Último counter já juntado de cada banco: juntar de novo só acrescenta as iterações novas
+            self.conn.execute('CREATE TABLE IF NOT EXISTS sources (source TEXT PRIMARY KEY, last_counter INTEGER NOT NULL)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_score ON individuals (score)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_feasible_generation_score '
+                              'ON individuals (feasible, generation, score)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_feasible_score ON individuals (feasible, score)')
+            for name in self.bounds:
+                col = self.sql_columns[name]
+                self.conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{col}" ON individuals ("{col}")')
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM individuals').fetchone()[0]
+
+    ###########################################################################
+    # JUNÇÃO
+    ###########################################################################
+    def _hashes(self, frame):
+        # Hash das variáveis de design arredondadas: identifica indivíduos repetidos
+        design = np.round(frame[self.design_columns].to_numpy(dtype=float), 10)
+        return [hashlib.sha1(row.tobytes()).hexdigest() for row in design]
+
+    def generations(self, path, cases, counters, pop_size=None, n_ranks=1, generation_offset=0):
+        '''
+        Geração de cada iteração de um banco: pelo checkpoint ao lado dele quando existe,
+        senão estimada (cada processo avalia pop_size/n_ranks indivíduos por geração); -1
+        quando não há como saber
+        '''
+        mapping = generation_map(path)
+        if mapping is not None:
+            starts, end = mapping
+            iterations = _iterations(cases, counters)
+            generation = np.searchsorted(starts, iterations, side='right') - 1
+            # Depois do último checkpoint (execução interrompida) a geração é estimada
+            if pop_size:
+                after = iterations >= end
+                generation[after] = len(starts) + (iterations[after] - end)//pop_size
+            else:
+                generation[iterations >= end] = -1
+            return generation
+        if pop_size:
+            return generation_offset + ((counters - 1)*n_ranks)//pop_size
+        return np.full(len(counters), -1)
+
+    def merge(self, paths, pop_size=None, n_ranks=None, generation_offset=0):
+        '''
+        Junta os bancos do SqliteRecorder (lidos em blocos) e devolve o número de indivíduos novos.
+        As iterações de cada banco já juntadas antes são puladas, então juntar de novo os
+        mesmos bancos (ou os de uma execução ainda em andamento) não conta avaliações em dobro.
+
+        Bancos sem checkpoint têm a geração estimada: n_ranks é o número de processos que
+        dividiram cada geração (padrão: o número de bancos) e generation_offset a primeira
+        geração gravada neles
+        '''
+        n_ranks = n_ranks or len(paths)
+        before = len(self)
+        columns = list(self.sql_columns.values())
+        names = ', '.join(f'"{col}"' for col in columns)
+        placeholders = ', '.join('?' for _ in range(9 + len(columns)))
+        sql = (f'INSERT INTO individuals (hash, source, rank, counter, "case", generation, '
+               f'n_evaluations, feasible, violation, {names}) '
+               f'VALUES ({placeholders}) '
+               f'ON CONFLICT(hash) DO UPDATE SET n_evaluations = n_evaluations + 1')
+
+        for rank, path in enumerate(paths):
+            source = os.path.abspath(path)
+            row = self.conn.execute('SELECT last_counter FROM sources WHERE source = ?', (source,)).fetchone()
+            last_counter = row[0] if row else 0
+            with RecorderReader(path) as reader:
+                for frame in reader.iter_frames(self.columns):
+                    frame = frame[frame.index > last_counter]
+                    if frame.empty:
+                        continue
+                    counters = frame.index.to_numpy()
+                    generation = self.generations(path, frame['case'], counters, pop_size, n_ranks,
+                                                  generation_offset)
+                    violation = sum(_violation(frame[name].to_numpy(dtype=float), lower, upper)
+                                    for name, (lower, upper) in self.bounds.items())
+                    feasible = violation == 0
+                    # NaN (falha de simulação) nunca é viável
+                    feasible &= ~frame[list(self.bounds)].isna().any(axis=1).to_numpy()
+
+                    values = frame[self.columns].to_numpy(dtype=float)
+                    rows = [
+                        (h, path, rank, int(c), case, int(g), 1, int(f), float(v), *map(float, vals))
+                        for h, c, case, g, f, v, vals in zip(self._hashes(frame), counters, frame['case'],
+                                                            generation, feasible, violation, values)
+                    ]
+                    with self.conn:
+                        self.conn.executemany(sql, rows)
+                        self.conn.execute('INSERT INTO sources (source, last_counter) VALUES (?, ?) '
+                                          'ON CONFLICT(source) DO UPDATE SET last_counter = excluded.last_counter',
+                                          (source, int(counters.max())))
+
+        with self.conn:
+            self.conn.execute('ANALYZE')
+        return len(self) - before
+
+    ###########################################################################
+    # CONSULTAS
+    ###########################################################################
+    def query(self, sql, params=()):
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def best_per_generation(self):
+        '''
+        Melhor indivíduo viável de cada geração (busca em idx_feasible_generation_score)
+        '''
+        # Com MAX, o SQLite devolve as demais colunas da linha do máximo de cada grupo
+        frame = self.query('SELECT *, MAX(score) AS best FROM individuals '
+                           'WHERE feasible = 1 GROUP BY generation ORDER BY generation')
+        return frame.drop(columns='best')
+
+    def top(self, n=10):
+        return self.query('SELECT * FROM individuals WHERE feasible = 1 ORDER BY score DESC LIMIT ?', (n,))
+
+    def pareto_front(self, objectives=None):
+        '''
+        Indivíduos viáveis não dominados. objectives: nome -> 'max' ou 'min'
+        (padrão: maior score e maior margem estática)
+        '''
+        if objectives is None:
+            objectives = {SCORE: 'max', 'individual_scorer.me': 'max'}
+        cols = [self.sql_columns[name] for name in objectives]
+        signs = np.array([1.0 if sense == 'max' else -1.0 for sense in objectives.values()])
+
+        # Em ordem lexicográfica decrescente dos objetivos, um candidato só pode ser dominado
+        # pelos anteriores, então basta compará-lo com a frente já montada
+        order = ', '.join(f'"{col}" {"DESC" if sign > 0 else "ASC"}' for col, sign in zip(cols, signs))
+        frame = self.query(f'SELECT * FROM individuals WHERE feasible = 1 ORDER BY {order}')
+        values = frame[cols].to_numpy(dtype=float)*signs
+
+        front = []
+        for ii, point in enumerate(values):
+            if not front or not np.any(np.all(values[front] >= point, axis=1)):
+                front.append(ii)
+        return frame.iloc[front].reset_index(drop=True)
+
+    def violation_histogram(self, name, bins=20):
+        '''
+        Histograma (contagens, bordas) das violações de uma restrição, só entre os
+        indivíduos que a violam (buscas por faixa no índice da restrição)
+        '''
+        col = self.sql_columns[name]
+        lower, upper = self.bounds[name]
+        violations = []
+        if lower is not None:
+            rows = self.conn.execute(f'SELECT ? - "{col}" FROM individuals WHERE "{col}" < ?', (lower, lower))
+            violations += [r[0] for r in rows]
+        if upper is not None:
+            rows = self.conn.execute(f'SELECT "{col}" - ? FROM individuals WHERE "{col}" > ?', (upper, upper))
+            violations += [r[0] for r in rows]
+        return np.histogram(np.array(violations, dtype=float), bins=bins)
+
+
+##### TESTES #####
+
+if __name__ == '__main__':
+    import sys
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else './log/evolutions/banana_convencional_2026_02_12_1646.db'
+    paths = rank_paths(db_path)
+    with AnalysisStore(db_path + '.analysis') as store:
+        print('Indivíduos novos:', store.merge(paths, pop_size=40), 'de', len(paths), 'banco(s)')
+        print(store.top(5)[['generation', 'score', 'n_evaluations']])
+        print(store.best_per_generation()[['generation', 'score']].tail())
+        print(store.pareto_front()[['score', 'me']])
+        for name in FEASIBILITY:
+            counts, edges = store.violation_histogram(name, bins=5)
+            print(name, counts, np.round(edges, 3))
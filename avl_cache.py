@@ -0,0 +1,123 @@
+"""
+Cache persistente dos resultados do AVL.
+
+Cada caso simulado é identificado por um hash do texto da geometria gerada pelo
+avlwrapper (o mesmo arquivo .avl que o AVL leria) junto com os parâmetros do caso
+(alfa, profundor, estado de voo e CG). Quando o mesmo avião e o mesmo caso aparecem
+de novo, seja um indivíduo repetido pelo DE, uma reexecução da campanha ou o
+pós-processamento de um projeto conhecido, o dicionário de resultados do
+session.get_results() é devolvido sem abrir o AVL.
+
+Os resultados ficam em um banco SQLite em optimizer_out/, com limite de entradas
+e descarte das menos usadas recentemente (LRU).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from variables import AVL_CACHE_PATH, AVL_CACHE_MAX_ENTRIES
+
+
+def geometry_text(geometry):
+    '''
+    Texto do arquivo de geometria do AVL gerado pelo avlwrapper (to_string no 0.2, create_input
+    nas versões que o têm), ou None se não for possível gerá-lo
+    '''
+    for method in ('to_string', 'create_input'):
+        if hasattr(geometry, method):
+            return getattr(geometry, method)()
+    return None
+
+
+def case_key(geometry_hash, case_params):
+    '''
+    Chave de um caso: hash da geometria + parâmetros do caso (sem o nome do caso)
+    '''
+    params = json.dumps(case_params, sort_keys=True, default=float)
+    return hashlib.sha256((geometry_hash + params).encode('utf-8')).hexdigest()
+
+
+class AVLCache:
+    """
+    Cache de resultados do AVL em disco (SQLite) com limite LRU de entradas.
+
+    - get(key): devolve o dicionário de resultados do caso ou None
+    - put(key, results): guarda o resultado e descarta as entradas mais antigas além de max_entries
+    - hits / misses: contadores de acertos e faltas deste processo
+    """
+
+    def __init__(self, path=AVL_CACHE_PATH, max_entries=AVL_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, last_access REAL NOT NULL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_last_access ON results (last_access)')
+        self.conn.commit()
+
+    def get(self, key):
+        row = self.conn.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        with self.conn:
+            self.conn.execute('UPDATE results SET last_access = ? WHERE key = ?', (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key, results):
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO results (key, value, last_access) VALUES (?, ?, ?)',
+                (key, json.dumps(results), time.time())
+            )
+            n = self.conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+            if n > self.max_entries:
+                self.conn.execute(
+                    'DELETE FROM results WHERE key IN '
+                    '(SELECT key FROM results ORDER BY last_access ASC LIMIT ?)',
+                    (n - self.max_entries,)
+                )
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': len(self),
+        }
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute('DELETE FROM results')
+        self.hits = 0
+        self.misses = 0
+
+
+_cache = None
+
+def get_cache():
+    '''
+    Cache compartilhado pelo processo (aberto na primeira chamada)
+    '''
+    global _cache
+    if _cache is None:
+        _cache = AVLCache()
+    return _cache
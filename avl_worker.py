@@ -0,0 +1,241 @@
+"""
+Processo persistente do AVL.
+
+O Session do avlwrapper abre um processo do AVL a cada chamada: escreve a geometria,
+roda, lê as saídas e encerra. O AVLWorker mantém um único processo vivo por worker do
+MDO e, a cada chamada, carrega a nova geometria (LOAD) e os casos (CASE) pelo stdin do
+mesmo processo, roda os casos no menu OPER e grava só as saídas usadas pelo Simulator:
+
+- FT (forças totais)       -> 'Totals'
+- ST (derivadas)           -> 'StabilityDerivatives'
+- FS (forças nas faixas)   -> 'StripForces'
+
+O resultado tem o mesmo formato do Session.get_results(), com só os blocos pedidos para
+cada caso (perfis de saída do Simulator). Os arquivos de geometria e de casos continuam
+sendo gerados pelo avlwrapper.
+
+Se o AVL travar (sem saída dentro de AVL_PIPE_TIMEOUT) ou morrer, o processo é
+encerrado, reaberto na próxima chamada e a chamada atual falha com erro, como uma
+simulação que não converge.
+"""
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from multiprocessing import util
+
+from avlwrapper import Session
+
+from variables import AVL_EXECUTABLE, AVL_PIPE_TIMEOUT
+
+_NUMBER = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eEdD][-+]?\d+)?|NaN|\*+'
+_PAIR = re.compile(r'([^\s=]+)\s*=\s*(' + _NUMBER + r')')
+_SURFACE = re.compile(r'Surface\s*#\s*\d+\s+(.+?)\s*$')
+
+# Comando do menu OPER que grava cada bloco de saída
+OUTPUT_COMMANDS = {'Totals': 'FT', 'StabilityDerivatives': 'ST', 'StripForces': 'FS'}
+
+
+def _to_float(text):
+    try:
+        return float(text.replace('D', 'E').replace('d', 'e'))
+    except ValueError:
+        return float('nan')
+
+
+def input_text(obj):
+    # Texto de entrada do AVL de uma Geometry ou Case (to_string no avlwrapper; str nas versões novas)
+    to_string = getattr(obj, 'to_string', None)
+    return to_string() if to_string is not None else str(obj)
+
+
+def parse_pairs(text):
+    '''
+    Pares "nome = valor" de uma saída FT ou ST. Vale a primeira ocorrência de cada nome
+    (o ST repete Cnb na linha de estabilidade espiral)
+    '''
+    values = {}
+    for line in text.splitlines():
+        for name, value in _PAIR.findall(line):
+            values.setdefault(name, _to_float(value))
+    return values
+
+
+def parse_strip_forces(text):
+    '''
+    Colunas da tabela de faixas de cada superfície de uma saída FS. Superfícies com o
+    mesmo nome (a metade espelhada por YDUPLICATE) são concatenadas, como no avlwrapper
+    '''
+    surfaces = {}
+    surface = None
+    columns = None
+    for line in text.splitlines():
+        match = _SURFACE.search(line)
+        if match:
+            name = re.sub(r'\s*\(YDUP\)$', '', match.group(1))
+            surface = surfaces.setdefault(name, {})
+            columns = None
+            continue
+
+        tokens = line.split()
+        if surface is None or not tokens:
+            continue
+        if tokens[0] == 'j' and columns is None:
+            columns = line.replace('c cl', 'c_cl').split()[1:]
+            columns = ['c cl' if c == 'c_cl' else c for c in columns]
+            continue
+        if columns is not None and tokens[0].isdigit() and len(tokens) == len(columns) + 1:
+            for name, value in zip(columns, tokens[1:]):
+                surface.setdefault(name, []).append(_to_float(value))
+    return surfaces
+
+
+class AVLWorker:
+    """
+    Um processo do AVL reaproveitado entre chamadas.
+
+    - run(geometry, cases, outputs): resultados no formato do Session.get_results()
+    - restarts: quantas vezes o processo precisou ser reaberto
+    """
+
+    def __init__(self, executable=AVL_EXECUTABLE, timeout=AVL_PIPE_TIMEOUT):
+        self.executable = executable
+        self.timeout = timeout
+        self.process = None
+        self.scratch = None
+        self.restarts = 0
+        self.n_calls = 0
+        self._output = []
+
+    def start(self):
+        self.scratch = tempfile.mkdtemp(prefix='avl_pipe_')
+        # O AVL roda na pasta do projeto: os caminhos dos perfis (AFILE) são relativos a ela
+        self.process = subprocess.Popen([self.executable], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT, cwd=os.getcwd(), text=True, bufsize=1)
+        # O stdout precisa ser drenado para o AVL não bloquear; só o fim fica guardado para erros
+        self._output = []
+        threading.Thread(target=self._drain, args=(self.process.stdout, self._output), daemon=True).start()
+
+    @staticmethod
+    def _drain(stream, output):
+        for line in iter(stream.readline, ''):
+            output.append(line)
+            del output[:-50]
+
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def close(self):
+        if self.process is not None:
+            try:
+                if self.alive():
+                    self.process.stdin.write('\nQUIT\n')
+                    self.process.stdin.flush()
+                    self.process.wait(timeout=2)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+            self.process = None
+        if self.scratch is not None:
+            shutil.rmtree(self.scratch, ignore_errors=True)
+            self.scratch = None
+
+    def restart(self):
+        self.close()
+        self.restarts += 1
+
+    def _path(self, name):
+        # O caminho mais curto entre o relativo à pasta do projeto e o absoluto (o AVL
+        # limita o tamanho dos nomes de arquivo; a pasta de rascunho pode estar em /dev/shm)
+        path = os.path.abspath(os.path.join(self.scratch, name))
+        try:
+            return min(os.path.relpath(path), path, key=len)
+        except ValueError:
+            return path
+
+    def run(self, geometry, cases, outputs=None):
+        '''
+        Roda os casos sobre a geometria. outputs: blocos de saída de cada caso
+        (chaves de OUTPUT_COMMANDS; None, ou None para um caso, grava todos)
+        '''
+        # A pasta de rascunho pode ter sido apagada no fim de uma execução do driver
+        if not self.alive() or not os.path.isdir(self.scratch):
+            if self.process is not None:
+                self.restart()
+            self.start()
+
+        # O Session numera os casos e completa os estados não definidos (CG, Mach, CD0) com os da geometria
+        cases = Session(geometry=geometry, cases=cases).cases
+
+        self.n_calls += 1
+        call = self.n_calls
+        geometry_file = self._path(f'g{call}.avl')
+        case_file = self._path(f'c{call}.run')
+        with open(geometry_file, 'w') as f:
+            f.write(input_text(geometry))
+        with open(case_file, 'w') as f:
+            for case in cases:
+                f.write(input_text(case))
+
+        if outputs is None:
+            outputs = [None]*len(cases)
+        files = []
+        commands = [f'LOAD {geometry_file}', f'CASE {case_file}', 'OPER']
+        for number, (case, blocks) in enumerate(zip(cases, outputs), start=1):
+            case_files = {block: self._path(f'o{call}_{number}.{OUTPUT_COMMANDS[block].lower()}')
+                          for block in (blocks or OUTPUT_COMMANDS)}
+            files.append((case.name, case_files))
+            commands += [str(number), 'X'] + [f'{OUTPUT_COMMANDS[block]} {path}' for block, path in case_files.items()]
+        # O marcador só é escrito depois de todas as saídas: quando existe, elas estão completas
+        marker = self._path(f'm{call}.ft')
+        commands += [f'FT {marker}', '']
+
+        try:
+            self.process.stdin.write('\n'.join(commands) + '\n')
+            self.process.stdin.flush()
+            self._wait_for(marker)
+
+            results = {}
+            for name, case_files in files:
+                results[name] = {}
+                for block, path in case_files.items():
+                    with open(path) as f:
+                        text = f.read()
+                    results[name][block] = parse_strip_forces(text) if block == 'StripForces' else parse_pairs(text)
+            return results
+        finally:
+            for path in [geometry_file, case_file, marker] + [p for _, case_files in files for p in case_files.values()]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _wait_for(self, path):
+        deadline = time.monotonic() + self.timeout
+        delay = 1e-4
+        while not os.path.exists(path):
+            if not self.alive():
+                tail = ''.join(self._output[-10:])
+                self.restart()
+                raise RuntimeError(f'O processo do AVL terminou durante a simulação:\n{tail}')
+            if time.monotonic() > deadline:
+                self.restart()
+                raise TimeoutError(f'O AVL não respondeu em {self.timeout} s e foi reiniciado.')
+            time.sleep(delay)
+            delay = min(delay*2, 0.01)
+
+
+_worker = None
+
+def get_worker():
+    '''
+    Processo do AVL do processo atual (aberto na primeira chamada, encerrado na saída,
+    inclusive nos workers do pool, que não rodam o atexit)
+    '''
+    global _worker
+    if _worker is None:
+        _worker = AVLWorker()
+        util.Finalize(_worker, _worker.close, exitpriority=20)
+    return _worker
@@ -0,0 +1,227 @@
+"""
+Benchmark do pipeline de avaliação de um indivíduo.
+
+Mede, para aeronaves de referência das três configurações (convencional, canard e asa
+voadora), o tempo de:
+
+- construção do Prototype
+- support.mac (quadratura) e support.mac_exact
+- Simulator.scorer(), com o tempo de cada etapa (timing.StageTimer) e as chamadas do AVL
+- performance.mtow e performance.mtow_np com os coeficientes obtidos no scorer
+- importação do airfoil_loader com a leitura do catálogo (em um processo novo)
+
+O resultado vai para um JSON com a revisão do git, para comparar entre commits:
+    python benchmark.py --backend vlm
+    python benchmark.py --backend vlm --compare log/benchmarks/<rev antiga>_vlm.json
+
+O backend 'replay' não roda nenhum solver: repete os resultados do AVL gravados antes
+com --record no arquivo de replay (replay.py), então as partes fora do AVL ficam
+determinísticas e podem ser medidas em qualquer máquina:
+    python benchmark.py --backend avl --record
+    python benchmark.py --backend replay
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from prototype import Prototype
+from simulator import Simulator
+from performance import mtow, mtow_np
+from support import mac, mac_exact
+from airfoil_loader import catalog
+from timing import STAGES
+from variables import DEFAULT_VALUES
+
+BENCHMARK_DIR = 'log/benchmarks'
+
+REFERENCE_AIRFOILS = {
+    'af_root_data': ('asa', 'MIN1112'),
+    'af_tip_data': ('asa', 'eppler421'),
+    'af_eh_data': ('eh', 'NACA0012'),
+    'af_ev_data': ('ev', 'NACA0012'),
+    'af_canard_data': ('ev', 'NACA0012'),
+}
+
+
+def reference_designs():
+    '''
+    Argumentos do Prototype de cada aeronave de referência: os valores iniciais do
+    variables.py com as superfícies ausentes zeradas, como no Individual
+    '''
+    airfoils = {key: catalog.database(category)[name] for key, (category, name) in REFERENCE_AIRFOILS.items()}
+    base = {**DEFAULT_VALUES, **airfoils, 'motor_z': 0.30}
+
+    return {
+        'convencional': {**base, 'cn_b': 0.0, 'af_canard_data': None},
+        'canard': dict(base),
+        'asa_voadora': {**base, 'eh_b': 0.0, 'ev_b': 0.0, 'cn_b': 0.0,
+                        'af_eh_data': None, 'af_ev_data': None, 'af_canard_data': None},
+    }
+
+
+def git_revision():
+    try:
+        rev = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    capture_output=True, text=True).stdout.strip())
+        return rev, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+
+
+def measure(func, repeat):
+    '''
+    Executa func repeat vezes e devolve (estatísticas em segundos, último resultado)
+    '''
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    stats = {'median': statistics.median(times), 'min': min(times), 'max': max(times), 'repeat': repeat}
+    return stats, result
+
+
+def bench_design(kwargs, backend, repeat, record=False):
+    '''
+    Tempos de cada etapa de uma aeronave de referência, ou {'failed': motivo} se o
+    Prototype não suporta a configuração (a asa voadora, sem EH, divide por eh_b)
+    '''
+    results = {}
+
+    try:
+        results['prototype'], prototype = measure(lambda: Prototype(**kwargs), repeat)
+    except (ZeroDivisionError, ValueError) as e:
+        return {'failed': f'{type(e).__name__}: {e}'}
+
+    wing = (prototype.w_bt, prototype.w_baf, prototype.w_cr, prototype.w_ct)
+    results['mac'], _ = measure(lambda: mac(0, *wing), repeat)
+    results['mac_exact'], _ = measure(lambda: mac_exact(*wing), repeat)
+
+    simulators = []
+
+    def score():
+        # Sem o cache da campanha: cada scorer resolve (ou repete) todos os casos
+        simulator = Simulator(prototype, cache=False, backend=backend, record_replay=record)
+        simulator.scorer()
+        simulators.append(simulator)
+        return simulator
+
+    # O primeiro scorer grava os resultados (record) ou aquece os caches do processo
+    score()
+    results['scorer'], simulator = measure(score, repeat)
+    results['scorer']['avl_calls'] = simulator.n_avl_calls
+    for stage in STAGES[1:]:
+        results['scorer'][f'median_{stage}'] = statistics.median(s.timer.times[stage] for s in simulators[1:])
+
+    try:
+        args = (simulator.p, simulator.t, simulator.v, prototype.pv, prototype.s_ref,
+                simulator.cl_ge[0], simulator.clmax, simulator.cd_ge[0], simulator.cd[0], prototype.pot)
+    except (KeyError, AttributeError):
+        # Sem os coeficientes (simulação falhou) o MTOW não é medido
+        return results
+
+    kw = dict(g=9.81, mu=0.03, n=1.2, gamma=0)
+    try:
+        results['mtow'], _ = measure(lambda: mtow(*args, **kw), repeat)
+    except ValueError as e:
+        # f_mtow sem troca de sinal em [5, 30] kg: o bisect do mtow não tem o que medir
+        results['mtow'] = {'failed': str(e)}
+        return results
+    results['mtow_np'], _ = measure(lambda: mtow_np(*args, **kw), repeat)
+    return results
+
+
+def bench_import(repeat):
+    # Processo novo a cada repetição: o custo inclui abrir o catálogo, como em cada worker
+    code = ('import time; start = time.perf_counter(); import airfoil_loader; '
+            'airfoil_loader.LISTA_ASA; print(time.perf_counter() - start)')
+    times = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        times.append(float(out.stdout.strip().splitlines()[-1]))
+    return {'median': statistics.median(times), 'min': min(times), 'max': max(times), 'repeat': repeat}
+
+
+def compare(current, baseline_path):
+    '''
+    Razão entre as medianas atuais e as de um JSON anterior (< 1 = mais rápido agora)
+    '''
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    print(f"\nComparação com {baseline_path} (rev {baseline.get('git_rev')}):")
+    rows = [('import_airfoil_loader', current['imports'], baseline.get('imports', {}))]
+    for design, stages in current['designs'].items():
+        if 'failed' in stages:
+            continue
+        old_stages = baseline.get('designs', {}).get(design, {})
+        for stage, stats in stages.items():
+            rows.append((f'{design}/{stage}', stats, old_stages.get(stage, {})))
+
+    for name, stats, old in rows:
+        if isinstance(old, dict) and old.get('median') and 'median' in stats:
+            print(f"{name:<36}{old['median']*1e3:>12.2f} ms{stats['median']*1e3:>12.2f} ms"
+                  f"{stats['median']/old['median']:>10.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark do pipeline de avaliação')
+    parser.add_argument('--backend', default='replay', choices=['avl', 'vlm', 'replay'])
+    parser.add_argument('--record', action='store_true',
+                        help='grava os resultados do AVL para o backend replay')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='arquivo JSON (padrão: log/benchmarks/<rev>_<backend>.json)')
+    parser.add_argument('--compare', metavar='JSON', help='resultado anterior para comparação')
+    args = parser.parse_args(argv)
+
+    if args.record and args.backend != 'avl':
+        parser.error('--record grava resultados do AVL: use --backend avl')
+
+    rev, dirty = git_revision()
+    report = {
+        'git_rev': rev,
+        'dirty': dirty,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'backend': args.backend,
+        'repeat': args.repeat,
+        'imports': bench_import(args.repeat),
+        'designs': {},
+    }
+
+    output = args.output or os.path.join(BENCHMARK_DIR, f"{rev}{'-dirty' if dirty else ''}_{args.backend}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+
+    for name, kwargs in reference_designs().items():
+        print(f'⏱️ {name}')
+        report['designs'][name] = bench_design(kwargs, args.backend, args.repeat, args.record)
+        if 'failed' in report['designs'][name]:
+            print(f"    ⚠️ não medida: {report['designs'][name]['failed']}")
+        else:
+            for stage, stats in report['designs'][name].items():
+                if 'failed' in stats:
+                    print(f"    {stage:<14}{'falhou':>15}: {stats['failed']}")
+                else:
+                    print(f"    {stage:<14}{stats['median']*1e3:>12.2f} ms")
+
+        # Gravado a cada aeronave: uma falha adiante não perde as medidas já feitas
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    print(f'\n📄 Resultados em {output}')
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
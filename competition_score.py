@@ -2,7 +2,12 @@
 Calcula a pontuação da competição de voo automaticamente a partir do Simulator/Prototype.
 Fórmula atualizada: PVOO = FPV × FPR × PEE × (0.185N^2 − 0.775N + 1.81) × 1.15^−b
 """
+import logging
+
 from variables import NR_DEFAULT, PEE_FACTOR, Nhor_DEFAULT, APRESENTACAO, VIDEOVOO
+from mdo_logging import get_logger
+
+logger = get_logger('competition_score')
 
 # =======================
 # PARÂMETROS FIXOS DA COMPETIÇÃO
@@ -33,8 +38,8 @@ def compute_competition_score(pv, cp_max, b, N_horizontal=Nhor_DEFAULT, NR=NR_DE
     total_weight_max = pv + cp_allowed
 
     if pv + cp_max > MAX_WEIGHT:
-        print(f"\n⚠️ Aviso: peso total com carga máxima ({pv + cp_max:.2f} kg) excede o limite de {MAX_WEIGHT} kg.")
-        print(f"    ⚠️ Calculando PVOO somente até {cp_allowed:.2f} kg de carga paga.")
+        logger.info('\n⚠️ Aviso: peso total com carga máxima (%.2f kg) excede o limite de %s kg.', pv + cp_max, MAX_WEIGHT)
+        logger.info('    ⚠️ Calculando PVOO somente até %.2f kg de carga paga.', cp_allowed)
 
     # 2. Carga mínima de projeto (conforme regulamento ou estratégia)
     cp_min = 5.0
@@ -54,38 +59,39 @@ def compute_competition_score(pv, cp_max, b, N_horizontal=Nhor_DEFAULT, NR=NR_DE
     # 5. Outros Fatores
     FPR = min(1.0, 0.5 + 0.75 * NR / 185)
     
-    # 6. Cálculo iterativo para o log (opcional)
-    cp_values = []
-    PVOO_values = []
-    step = (cp_allowed - cp_min) / 5 if cp_allowed > cp_min else 1.0
-    
-    cp = cp_min
-    while cp <= cp_allowed + 1e-6:
-        EE = cp / pv
-        PEE = PEE_FACTOR * EE
-        # PVOO = FPV × FPR × PEE × FatorN × FatorB
-        PVOO = FPV * FPR * PEE * horizontal_factor * wingspan_factor
-        cp_values.append(cp)
-        PVOO_values.append(PVOO)
-        cp += step
-
-    # 7. Retorno do PVOO Final (Carga Máxima Permitida)
+    # 6. Retorno do PVOO Final (Carga Máxima Permitida)
     final_cp = cp_allowed
     final_EE = final_cp / pv
     final_PEE = PEE_FACTOR * final_EE
     final_PVOO = FPV * FPR * final_PEE * horizontal_factor * wingspan_factor
 
-    print("\n✅ Resultado final (Fórmula Atualizada):")
-    print(f"Peso vazio: {pv:.2f} kg | Envergadura: {b:.2f} m")
-    print(f"Carga paga máxima: {cp_allowed:.2f} kg")
-    print(f"EE máxima: {final_EE:.2f}")
-    print(f"Fator N ({N_horizontal} superfícies): {horizontal_factor:.2f}")
-    #print(f"Fator Envergadura (b={b:.2f}m): {wingspan_factor:.4f}")
-    print(f"PVOO Final: {final_PVOO:.2f}")
-    
-    print("\n📊 Estimativa de Pontuação Final (PVOO + Relatórios + Vídeo):")
-    for cp_val, pvoo_val in zip(cp_values, PVOO_values):
-        p_total = pvoo_val + APRESENTACAO + VIDEOVOO + NR_DEFAULT
-        print(f"CP: {cp_val:.2f} kg | PVOO: {pvoo_val:.2f} | P_TOTAL: {p_total:.2f}")
+    # 7. Tabela de estimativas para o log, só calculada com o nível DEBUG ligado
+    if logger.isEnabledFor(logging.DEBUG):
+        cp_values = []
+        PVOO_values = []
+        step = (cp_allowed - cp_min) / 5 if cp_allowed > cp_min else 1.0
+
+        cp = cp_min
+        while cp <= cp_allowed + 1e-6:
+            EE = cp / pv
+            PEE = PEE_FACTOR * EE
+            # PVOO = FPV × FPR × PEE × FatorN × FatorB
+            PVOO = FPV * FPR * PEE * horizontal_factor * wingspan_factor
+            cp_values.append(cp)
+            PVOO_values.append(PVOO)
+            cp += step
+
+        logger.debug("\n✅ Resultado final (Fórmula Atualizada):")
+        logger.debug("Peso vazio: %.2f kg | Envergadura: %.2f m", pv, b)
+        logger.debug("Carga paga máxima: %.2f kg", cp_allowed)
+        logger.debug("EE máxima: %.2f", final_EE)
+        logger.debug("Fator N (%s superfícies): %.2f", N_horizontal, horizontal_factor)
+        #logger.debug("Fator Envergadura (b=%.2fm): %.4f", b, wingspan_factor)
+        logger.debug("PVOO Final: %.2f", final_PVOO)
+
+        logger.debug("\n📊 Estimativa de Pontuação Final (PVOO + Relatórios + Vídeo):")
+        for cp_val, pvoo_val in zip(cp_values, PVOO_values):
+            p_total = pvoo_val + APRESENTACAO + VIDEOVOO + NR_DEFAULT
+            logger.debug("CP: %.2f kg | PVOO: %.2f | P_TOTAL: %.2f", cp_val, pvoo_val, p_total)
 
     return {"PVOO": final_PVOO}
\ No newline at end of file
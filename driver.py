@@ -0,0 +1,371 @@
+"""
+Driver de Evolução Diferencial do MDO com avaliação da população em paralelo.
+
+O DifferentialEvolutionDriver do OpenMDAO só avalia indivíduos em paralelo via MPI.
+Este driver mantém as mesmas opções (pop_size, max_gen, F, Pc e penalidades) e o mesmo
+registro no SqliteRecorder, mas avalia cada geração em um pool de processos local
+(concurrent.futures):
+
+- cada worker monta o seu próprio problema OpenMDAO (problem_factory) e usa uma pasta
+  temporária só sua (scratch.py, em memória quando possível), para que os arquivos do
+  avlwrapper de workers diferentes não colidam
+- os resultados voltam para Individual.prefetched no processo principal, que então passa
+  cada indivíduo pelo modelo normalmente (sem simular de novo) e o registra no recorder
+
+Com pool_workers = 0 os indivíduos são avaliados em série, um a um.
+
+Com surrogate = True, um modelo RBF do fitness penalizado (surrogate.py), treinado com
+todas as avaliações verdadeiras (e com as de uma execução anterior em surrogate_db),
+ordena os filhos de cada geração pela melhora prevista sobre o pai, e só a fração
+surrogate_fraction mais promissora é avaliada no Individual. Os demais filhos perdem
+para o pai sem simulação.
+
+Com checkpoint_path, o estado do DE (população, fitness, geração, estado do gerador
+aleatório, contadores de iterações e de avaliações e a iteração em que cada geração
+começou) é salvo a cada checkpoint_every gerações. resume_from aponta para um
+checkpoint de uma execução interrompida, que continua da geração seguinte exatamente
+como teria continuado sem a interrupção.
+"""
+import os
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import openmdao.api as om
+from openmdao.core.constants import INF_BOUND
+
+import avl_cache
+import replay
+import scratch
+from individual import Individual
+from surrogate import FitnessSurrogate
+
+
+class PoolDifferentialEvolutionDriver(om.DifferentialEvolutionDriver):
+    """
+    Evolução diferencial (DE/rand/1/bin) com a população avaliada em um pool de processos.
+    """
+
+    def _declare_options(self):
+        super()._declare_options()
+        self.options.declare('pool_workers', default=0, types=int, lower=0,
+                             desc='Número de processos que avaliam a população em paralelo. '
+                                  '0 avalia em série no processo principal.')
+        self.options.declare('problem_factory', default=None, allow_none=True,
+                             desc='Função sem argumentos que cria o om.Problem do MDO (sem driver '
+                                  'nem recorder). Cada worker chama essa função uma vez.')
+        self.options.declare('surrogate', default=False, types=bool,
+                             desc='Pré-seleciona os filhos de cada geração com um modelo RBF do fitness.')
+        self.options.declare('surrogate_fraction', default=0.25, types=float, lower=0.0, upper=1.0,
+                             desc='Fração dos filhos de cada geração avaliada de verdade no modo surrogate.')
+        self.options.declare('surrogate_min_samples', default=80, types=int, lower=1,
+                             desc='Avaliações verdadeiras necessárias antes de usar o modelo.')
+        self.options.declare('surrogate_db', default=None, allow_none=True, types=str,
+                             desc='Banco do SqliteRecorder de uma execução anterior para treinar o modelo.')
+        self.options.declare('checkpoint_path', default=None, allow_none=True, types=str,
+                             desc='Arquivo onde o estado do DE é salvo periodicamente (None desliga).')
+        self.options.declare('checkpoint_every', default=1, types=int, lower=1,
+                             desc='Intervalo, em gerações, entre checkpoints.')
+        self.options.declare('resume_from', default=None, allow_none=True, types=str,
+                             desc='Checkpoint de uma execução anterior para continuar a otimização.')
+
+    ###########################################################################
+    # LAÇO PRINCIPAL
+    ###########################################################################
+    def run(self):
+        lower, upper, x0 = self._desvar_bounds()
+        n_var = len(x0)
+
+        rng = np.random.default_rng(getattr(self, '_randomstate', None))
+        pop_size = self.options['pop_size'] or 20 * n_var
+        max_gen = self.options['max_gen']
+
+        surrogate = self._start_surrogate(lower, upper)
+        self.n_true_evaluations = 0
+        # iter_count no início de cada geração: a geração de cada iteração gravada (analysis_store)
+        self.generation_starts = []
+
+        state = self._load_checkpoint(n_var, pop_size)
+        if state is None:
+            # População inicial aleatória dentro dos limites, com os valores iniciais como primeiro indivíduo
+            population = lower + rng.random((pop_size, n_var)) * (upper - lower)
+            population[0] = x0
+            fitness = np.full(pop_size, np.inf)
+            first_gen = 0
+        else:
+            population, fitness = state['population'], state['fitness']
+            rng.bit_generator.state = state['rng_state']
+            first_gen = state['generation'] + 1
+            # Contadores continuam os da execução anterior: as iterações gravadas no novo banco
+            # seguem a numeração de onde ela parou, em vez de recomeçar como uma execução nova
+            self.iter_count = state.get('iter_count', self.iter_count)
+            self.n_true_evaluations = state.get('n_true_evaluations', 0)
+            self.generation_starts = list(state.get('generation_starts', []))
+
+        executor, scratch_root = self._start_pool()
+        try:
+            if first_gen == 0:
+                new_gen = population.copy()
+            else:
+                new_gen = self._offspring(population, rng, lower, upper)
+            for generation in range(first_gen, max_gen + 1):
+                self.generation_starts.append(self.iter_count)
+
+                # Na primeira geração (ou sem modelo) todos os filhos são avaliados
+                selected = np.arange(pop_size)
+                if generation > 0 and surrogate is not None and surrogate.ready:
+                    selected = self._preselect(surrogate, new_gen, fitness)
+
+                fun = np.full(pop_size, np.inf)
+                fun[selected] = self._evaluate(new_gen[selected], executor)
+                self.n_true_evaluations += len(selected)
+                if surrogate is not None:
+                    surrogate.add(new_gen[selected], fun[selected])
+
+                improved = np.zeros(pop_size, dtype=bool)
+                improved[selected] = fun[selected] <= fitness[selected]
+                population[improved] = new_gen[improved]
+                fitness[improved] = fun[improved]
+
+                if generation % self.options['checkpoint_every'] == 0 or generation == max_gen:
+                    self._save_checkpoint(population, fitness, generation, rng)
+
+                if generation < max_gen:
+                    new_gen = self._offspring(population, rng, lower, upper)
+        finally:
+            self._stop_pool(executor, scratch_root)
+
+        if surrogate is not None:
+            print(f'🧠 Modo surrogate: {self.n_true_evaluations} avaliações verdadeiras '
+                  f'de {pop_size * (max_gen + 1)} filhos gerados')
+
+        # Deixa o modelo no estado do melhor indivíduo
+        best = int(np.argmin(fitness))
+        self.objective_callback(population[best], best)
+
+        return False
+
+    ###########################################################################
+    # CHECKPOINT
+    ###########################################################################
+    def _save_checkpoint(self, population, fitness, generation, rng):
+        path = self.options['checkpoint_path']
+        if path is None:
+            return
+
+        state = {
+            'population': population,
+            'fitness': fitness,
+            'generation': generation,
+            'rng_state': rng.bit_generator.state,
+            'iter_count': self.iter_count,
+            'n_true_evaluations': self.n_true_evaluations,
+            'generation_starts': self.generation_starts,
+            'desvars': list(self._desvar_idx),
+        }
+        # Escrita atômica: uma interrupção durante a escrita mantém o checkpoint anterior
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f)
+        os.replace(tmp_path, path)
+
+    def _load_checkpoint(self, n_var, pop_size):
+        path = self.options['resume_from']
+        if path is None:
+            return None
+
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        if state['desvars'] != list(self._desvar_idx) or state['population'].shape != (pop_size, n_var):
+            raise RuntimeError(f'O checkpoint {path} não corresponde às variáveis de design e à '
+                               f'população deste problema.')
+        print(f"↩️ Retomando a otimização de {path} a partir da geração {state['generation'] + 1}")
+        return state
+
+    ###########################################################################
+    # MODELO SUBSTITUTO
+    ###########################################################################
+    def _start_surrogate(self, lower, upper):
+        if not self.options['surrogate']:
+            return None
+
+        surrogate = FitnessSurrogate(lower, upper, min_samples=self.options['surrogate_min_samples'])
+        db_path = self.options['surrogate_db']
+        if db_path is not None:
+            if os.path.exists(db_path):
+                x, fitness = self._recorded_samples(db_path, lower, upper)
+                surrogate.add(x, fitness)
+                print(f'🧠 Modelo substituto iniciado com {len(fitness)} avaliações de {db_path}')
+            else:
+                print(f'⚠️ Banco {db_path} não encontrado, modelo substituto começa vazio')
+        return surrogate
+
+    def _preselect(self, surrogate, trials, fitness):
+        # Índices dos filhos com maior melhora prevista sobre o pai da mesma posição
+        n_eval = max(1, int(np.ceil(self.options['surrogate_fraction'] * len(trials))))
+        gain = surrogate.predict(trials) - fitness
+        return np.sort(np.argsort(gain)[:n_eval])
+
+    def _recorded_samples(self, db_path, lower, upper):
+        '''
+        Lê (x, fitness penalizado) dos casos do driver gravados pelo SqliteRecorder,
+        nas mesmas unidades (escaladas) do driver e dentro dos limites atuais
+        '''
+        reader = om.CaseReader(db_path)
+        xs, fitness = [], []
+        for case_id in reader.list_cases('driver', recurse=False, out_stream=None):
+            case = reader.get_case(case_id)
+            try:
+                desvars = case.get_design_vars(scaled=True)
+                x = np.concatenate([np.atleast_1d(desvars[name]) for name in self._desvar_idx]).astype(float)
+                objective = float(np.max(next(iter(case.get_objectives(scaled=True).values()))))
+                penalty = self._penalty(case.get_constraints(scaled=True))
+            except (KeyError, StopIteration):
+                continue
+            if len(x) == len(lower) and np.all(x >= lower) and np.all(x <= upper):
+                xs.append(x)
+                fitness.append(objective + penalty)
+        return np.array(xs).reshape(-1, len(lower)), np.array(fitness)
+
+    def _penalty(self, con_values):
+        # Mesma penalidade do objective_callback do DifferentialEvolutionDriver
+        violations = []
+        for name, val in con_values.items():
+            con = self._cons[name]
+            val = np.atleast_1d(val)
+            if con['lower'] is not None and np.any(con['lower'] > -INF_BOUND):
+                violations.append(np.where(val >= con['lower'], 0.0, np.abs(val - con['lower'])))
+            elif con['upper'] is not None and np.any(con['upper'] < INF_BOUND):
+                violations.append(np.where(val <= con['upper'], 0.0, np.abs(val - con['upper'])))
+            elif con['equals'] is not None:
+                violations.append(np.abs(val - con['equals']))
+        if not violations:
+            return 0.0
+        violations = np.concatenate(violations)
+        return self.options['penalty_parameter'] * np.sum(np.power(violations, self.options['penalty_exponent']))
+
+    def _desvar_bounds(self):
+        # Índices de cada variável de design no vetor x, limites e valores iniciais
+        desvar_vals = self.get_design_var_values()
+        self._desvar_idx = {}
+        count = 0
+        for name, meta in self._designvars.items():
+            self._desvar_idx[name] = (count, count + meta['size'])
+            count += meta['size']
+
+        lower = np.empty(count)
+        upper = np.empty(count)
+        x0 = np.empty(count)
+        for name, meta in self._designvars.items():
+            i, j = self._desvar_idx[name]
+            lower[i:j] = meta['lower']
+            upper[i:j] = meta['upper']
+            x0[i:j] = desvar_vals[name]
+
+        return lower, upper, np.clip(x0, lower, upper)
+
+    def _offspring(self, population, rng, lower, upper):
+        # Mutação DE/rand/1 seguida de cruzamento binomial
+        F = self.options['F']
+        Pc = self.options['Pc']
+        pop_size, n_var = population.shape
+        trials = np.empty_like(population)
+
+        for ii in range(pop_size):
+            others = [idx for idx in range(pop_size) if idx != ii]
+            a, b, c = population[rng.choice(others, 3, replace=False)]
+            mutant = np.clip(a + F * (b - c), lower, upper)
+
+            cross = rng.random(n_var) < Pc
+            cross[rng.integers(n_var)] = True
+            trials[ii] = np.where(cross, mutant, population[ii])
+
+        return trials
+
+    def _evaluate(self, candidates, executor):
+        # Avalia uma geração: pré-calcula no pool (se houver) e registra indivíduo a indivíduo
+        if executor is not None:
+            self._prefetch(candidates, executor)
+
+        fun = np.empty(len(candidates))
+        for ii, x in enumerate(candidates):
+            f, success, _ = self.objective_callback(x, ii)
+            fun[ii] = float(np.max(f)) if success else np.inf
+        return fun
+
+    ###########################################################################
+    # POOL DE PROCESSOS
+    ###########################################################################
+    def _start_pool(self):
+        n_workers = self.options['pool_workers']
+        if n_workers == 0:
+            # Em série, o próprio processo principal usa a pasta de rascunho
+            scratch_root = scratch.create_run_dir()
+            self._saved_tempdir = tempfile.tempdir
+            scratch.use_worker_dir(scratch_root)
+            return None, scratch_root
+
+        factory = self.options['problem_factory']
+        if factory is None:
+            raise RuntimeError("A avaliação paralela precisa da opção 'problem_factory'.")
+
+        scratch_root = scratch.create_run_dir()
+        executor = ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                       initargs=(factory, scratch_root))
+        print(f'⚙️ Avaliando a população em {n_workers} processos paralelos')
+        return executor, scratch_root
+
+    def _stop_pool(self, executor, scratch_root):
+        if executor is not None:
+            executor.shutdown(wait=True)
+        else:
+            tempfile.tempdir = getattr(self, '_saved_tempdir', None)
+        if scratch_root is not None:
+            scratch.remove_run_dir(scratch_root)
+
+    def _prefetch(self, candidates, executor):
+        futures = [executor.submit(evaluate_candidate, x, self._desvar_idx) for x in candidates]
+        for future in futures:
+            try:
+                key, results = future.result()
+            except Exception as e:
+                # O indivíduo será simulado no processo principal
+                print(f'⚠️ Falha na avaliação paralela: {e}')
+                continue
+            Individual.prefetched[key] = results
+
+
+###########################################################################
+# FUNÇÕES DOS WORKERS
+###########################################################################
+_worker_problem = None
+
+def _init_worker(problem_factory, scratch_root):
+    '''
+    Prepara um worker: pasta temporária exclusiva para o avlwrapper e problema OpenMDAO próprio
+    '''
+    global _worker_problem
+
+    scratch.use_worker_dir(scratch_root)
+
+    # Conexões SQLite herdadas do processo principal não podem ser reaproveitadas, nem o
+    # fragmento de replay aberto por ele (o worker grava no seu próprio, com o seu pid)
+    avl_cache._cache = None
+    replay._archive = None
+
+    prob = problem_factory()
+    prob.setup()
+    prob.final_setup()
+    _worker_problem = prob
+
+def evaluate_candidate(x, desvar_idx):
+    '''
+    Avalia um vetor de variáveis de design no problema do worker e devolve (chave, outputs) do Individual
+    '''
+    prob = _worker_problem
+    for name, (i, j) in desvar_idx.items():
+        prob.driver.set_design_var(name, x[i:j])
+    prob.model.run_solve_nonlinear()
+
+    return prob.model.individual_scorer.last_evaluation
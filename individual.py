@@ -1,8 +1,41 @@
+import time
+
 import openmdao.api as om
 from prototype import Prototype
 from simulator import Simulator
+from stability import vht_min, vht_max, vvt_min, vvt_max
 from variables import *
 from airfoil_loader import (LISTA_ASA, LISTA_EH, LISTA_EV, airfoils_database_asa, airfoils_database_eh, airfoils_database_ev)
+from mdo_logging import get_logger
+from timing import STAGES, StageTimer, TimingSummary
+
+logger = get_logger('individual')
+
+# Limites (inferior, superior) das restrições que dependem só da geometria e da massa,
+# conhecidas logo após a construção do Prototype. Também usados no optimizer.py
+GEOMETRIC_LIMITS = {
+    'ar': (5.0, None),
+    'eh_ar': (None, 4.8),
+    'vht': (vht_min, vht_max),
+    'vvt': (vvt_min, vvt_max),
+    'low_cg': (-0.03, None),
+    'eh_z_const': (0.05, None),
+    'x_cg_p': (0.25, 0.34),
+}
+
+def prescreen(prototype, tol=PRESCREEN_TOL):
+    '''
+    Lista as restrições de GEOMETRIC_LIMITS violadas por mais de tol (relativo ao limite) pelo protótipo
+    '''
+    violated = []
+    for name, (lower, upper) in GEOMETRIC_LIMITS.items():
+        value = getattr(prototype, name)
+        if lower is not None and lower - value > tol*max(abs(lower), 1e-3):
+            violated.append(name)
+        elif upper is not None and value - upper > tol*max(abs(upper), 1e-3):
+            violated.append(name)
+    return violated
+
 
 class Individual(om.ExplicitComponent):
     """
@@ -12,8 +45,26 @@ class Individual(om.ExplicitComponent):
     - Constrói o avião (Prototype)
     - Simula seu desempenho (Simulator)
     - Retorna score e métricas para otimização
+
+    Quando a população é avaliada em paralelo, os resultados calculados pelos workers
+    ficam em Individual.prefetched, indexados pelos inputs, e o compute apenas os copia.
+
+    Indivíduos que violam claramente restrições geométricas (prescreen) não passam pelo
+    AVL. n_evaluations e n_prescreened contam as avaliações e os descartes.
+
+    Com evaluation_log (um EvaluationLog), cada avaliação grava uma linha JSON com as
+    variáveis de design e os outputs.
+
+    Os outputs time_<etapa> e avl_calls medem cada avaliação (ver timing.py) e
+    timing_summary os acumula para o relatório do fim da otimização.
     """
 
+    prefetched = {}
+    evaluation_log = None
+    timing_summary = TimingSummary()
+    n_evaluations = 0
+    n_prescreened = 0
+
     def setup(self):
         """
         Definição das entradas (variáveis de design)
@@ -91,12 +142,51 @@ class Individual(om.ExplicitComponent):
         # Carga propulsiva
         self.add_output('cp', val=0.0)
 
+        # Indivíduo descartado na pré-triagem, sem simulação no AVL (1) ou simulado (0)
+        self.add_output('prescreened', val=0.0)
+
+        # ======= TEMPOS DA AVALIAÇÃO =======
+        # Tempo de parede (s) de cada etapa e sessões do AVL abertas pelo indivíduo
+        for stage in STAGES:
+            self.add_output(f'time_{stage}', val=0.0)
+        self.add_output('time_total', val=0.0)
+        self.add_output('avl_calls', val=0.0)
+
         self.declare_partials(of='*', wrt='*', method='fd')
 
     def compute(self, inputs, outputs):
         """
         Executa a simulação de um indivíduo
         """
+        start = time.perf_counter()
+        key = tuple((name, float(inputs[name][0])) for name in sorted(inputs.keys()))
+        results = Individual.prefetched.pop(key, None)
+        prefetched = results is not None
+        if results is None:
+            results = self.evaluate(inputs)
+        self.last_evaluation = (key, results)
+
+        Individual.n_evaluations += 1
+        if results['prescreened']:
+            Individual.n_prescreened += 1
+        Individual.timing_summary.add(results)
+
+        if Individual.evaluation_log is not None:
+            Individual.evaluation_log.write(
+                evaluation=Individual.n_evaluations,
+                prefetched=prefetched,
+                wall_time=time.perf_counter() - start,
+                inputs=dict(key),
+                outputs=results,
+            )
+
+        for name, value in results.items():
+            outputs[name] = value
+
+    def evaluate(self, inputs):
+        """
+        Constrói e simula o avião e devolve o dicionário com os valores dos outputs
+        """
         global primeira_execucao
         # ======= CONVERSÃO DOS INPUTS =======
         w_bt = float(inputs['w_bt'])
@@ -136,68 +226,69 @@ class Individual(om.ExplicitComponent):
                 i = int(round(float(idx_float)))
                 i = max(0, min(i, len(lista) - 1))
                 chosen_name = lista[i]
-                msg = f"🎲 [OTIMIZANDO] {label}: Selecionado o perfil '{chosen_name}'"
+                logger.debug("🎲 [OTIMIZANDO] %s: Selecionado o perfil '%s'", label, chosen_name)
             else:
                 chosen_name = instrucao
                 if chosen_name not in database:
                     raise KeyError(f"❌ Erro: Perfil '{chosen_name}' não encontrado.")
-                msg = f"✅ [FIXO]    {label}: Usando o perfil '{chosen_name}'"
-            
-            return database[chosen_name], msg # Retorna o dado E a mensagem
+                logger.debug("✅ [FIXO]    %s: Usando o perfil '%s'", label, chosen_name)
+
+            return database[chosen_name]
 
         # 2. Carregamos SEMPRE a Asa (pois toda configuração tem asa)
-        dados_root, msg_root = definir_perfil(root_af, inputs['idx_asa_root'], LISTA_ASA, airfoils_database_asa, "Raiz da Asa")
-        dados_tip, msg_tip = definir_perfil(tip_af, inputs['idx_asa_tip'], LISTA_ASA, airfoils_database_asa, "Ponta da Asa")
-        print(msg_root)
-        print(msg_tip)
+        dados_root = definir_perfil(root_af, inputs['idx_asa_root'], LISTA_ASA, airfoils_database_asa, "Raiz da Asa")
+        dados_tip = definir_perfil(tip_af, inputs['idx_asa_tip'], LISTA_ASA, airfoils_database_asa, "Ponta da Asa")
         # 3. Lógica condicional de carregamento e impressão
         # Inicializamos variáveis vazias/None para evitar erros
         dados_eh = dados_ev = dados_canard = None
 
         if P_CONFIG == "asa_voadora":
             eh_b = ev_b = cn_b = 0.0
-            print("🛸 Configuração: ASA VOADORA")
+            logger.debug("🛸 Configuração: ASA VOADORA")
             # Não carrega nem printa EH, EV ou Canard
 
         elif P_CONFIG == "canard":
             # Carrega e printa tudo
-            dados_eh, msg_eh = definir_perfil(eh_af, inputs['idx_eh'], LISTA_EH, airfoils_database_eh, "EH")
-            dados_ev, msg_ev = definir_perfil(ev_af, inputs['idx_ev'], LISTA_EV, airfoils_database_ev, "EV")
-            dados_canard, msg_cn = definir_perfil(cn_af, inputs['idx_cn'], LISTA_EV, airfoils_database_ev, "Canard")
-            print(msg_eh)
-            print(msg_ev)
-            print(msg_cn)
-            print("🦆 Configuração: CANARD")
+            dados_eh = definir_perfil(eh_af, inputs['idx_eh'], LISTA_EH, airfoils_database_eh, "EH")
+            dados_ev = definir_perfil(ev_af, inputs['idx_ev'], LISTA_EV, airfoils_database_ev, "EV")
+            dados_canard = definir_perfil(cn_af, inputs['idx_cn'], LISTA_EV, airfoils_database_ev, "Canard")
+            logger.debug("🦆 Configuração: CANARD")
 
         else: # CONVENCIONAL
             cn_b = 0.0
             # Carrega e printa apenas EH e EV
-            dados_eh, msg_eh = definir_perfil(eh_af, inputs['idx_eh'], LISTA_EH, airfoils_database_eh, "EH")
-            dados_ev, msg_ev = definir_perfil(ev_af, inputs['idx_ev'], LISTA_EV, airfoils_database_ev, "EV")
-            print(msg_eh)
-            print(msg_ev)
-            print("🛩️ Configuração: CONVENCIONAL")
+            dados_eh = definir_perfil(eh_af, inputs['idx_eh'], LISTA_EH, airfoils_database_eh, "EH")
+            dados_ev = definir_perfil(ev_af, inputs['idx_ev'], LISTA_EV, airfoils_database_ev, "EV")
+            logger.debug("🛩️ Configuração: CONVENCIONAL")
 
         # ======= CONSTRUÇÃO DO AVIÃO =======
-        prototype = Prototype(
-            w_bt=w_bt, w_baf=w_baf, w_cr=w_cr, w_ci=w_ci, w_ct=w_ct,
-            w_z=w_z, w_inc=w_inc, w_wo=w_wo, w_d=w_d,
-            eh_b=eh_b, eh_cr=eh_cr, eh_ct=eh_ct, eh_inc=eh_inc,
-            eh_x=eh_x, eh_z=eh_z,
-            ev_ct=ev_ct, ev_b=ev_b,
-            motor_x=motor_x,
-            motor_z=0.30,
-            af_root_data=dados_root,
-            af_tip_data=dados_tip,
-            af_eh_data=dados_eh,
-            af_ev_data=dados_ev,
-            af_canard_data=dados_canard,
-            cn_b=cn_b, cn_cr=cn_cr, cn_ct=cn_ct, 
-            cn_inc=cn_inc, cn_x=cn_x, cn_d=cn_d, cn_z=cn_z
-        )
+        timer = StageTimer()
+        with timer.stage('prototype'):
+            prototype = Prototype(
+                w_bt=w_bt, w_baf=w_baf, w_cr=w_cr, w_ci=w_ci, w_ct=w_ct,
+                w_z=w_z, w_inc=w_inc, w_wo=w_wo, w_d=w_d,
+                eh_b=eh_b, eh_cr=eh_cr, eh_ct=eh_ct, eh_inc=eh_inc,
+                eh_x=eh_x, eh_z=eh_z,
+                ev_ct=ev_ct, ev_b=ev_b,
+                motor_x=motor_x,
+                motor_z=0.30,
+                af_root_data=dados_root,
+                af_tip_data=dados_tip,
+                af_eh_data=dados_eh,
+                af_ev_data=dados_ev,
+                af_canard_data=dados_canard,
+                cn_b=cn_b, cn_cr=cn_cr, cn_ct=cn_ct, 
+                cn_inc=cn_inc, cn_x=cn_x, cn_d=cn_d, cn_z=cn_z
+            )
+
+        # ======= PRÉ-TRIAGEM =======
+        violated = prescreen(prototype) if PRESCREEN else []
+        if violated:
+            logger.info("⛔ Pré-triagem: %s fora dos limites, indivíduo descartado sem rodar o AVL", ', '.join(violated))
+            return self.collect_outputs(prototype, Simulator(prototype, cache=False, timer=timer), PRESCREEN_SCORE, prescreened=True)
 
         # ======= SIMULAÇÃO =======
-        simulator = Simulator(prototype)
+        simulator = Simulator(prototype, timer=timer)
 
         # Score global do indivíduo
         score = simulator.scorer()[1]
@@ -260,17 +351,29 @@ class Individual(om.ExplicitComponent):
         # outputs['stall_constraint'] = min(ordem_estol, seguranca_trim)
 
         # ======= DEMAIS OUTPUTS =======
-        outputs['score'] = score
-        outputs['vht'] = prototype.vht
-        outputs['vvt'] = prototype.vvt
-        outputs['ar'] = prototype.ar
-        outputs['eh_ar'] = prototype.eh_ar
-        outputs['a_trim'] = simulator.a_trim
-        outputs['me'] = simulator.me
-        outputs['low_cg'] = prototype.low_cg
-        outputs['x_cg_p'] = prototype.x_cg_p
-        outputs['cp'] = simulator.cp
-        #outputs['cl_max_3d_wing'] = cl_max_3d_asa
-        #outputs['cl_max_3d_canard'] = cl_max_3d_canard
-        outputs['eh_z_const'] = prototype.eh_z_const
-        
\ No newline at end of file
+        return self.collect_outputs(prototype, simulator, score)
+
+    def collect_outputs(self, prototype, simulator, score, prescreened=False):
+        """
+        Monta o dicionário de outputs do indivíduo a partir do protótipo e do simulador
+        """
+        return {
+            'score': score,
+            'vht': prototype.vht,
+            'vvt': prototype.vvt,
+            'ar': prototype.ar,
+            'eh_ar': prototype.eh_ar,
+            'a_trim': simulator.a_trim,
+            'me': simulator.me,
+            'low_cg': prototype.low_cg,
+            'x_cg_p': prototype.x_cg_p,
+            'cp': simulator.cp,
+            #'cl_max_3d_wing': cl_max_3d_asa,
+            #'cl_max_3d_canard': cl_max_3d_canard,
+            'eh_z_const': prototype.eh_z_const,
+            # Menor margem clmax - cl das faixas no voo trimado (0 sem simulação trimada)
+            'stall_constraint': simulator.stall_constraint if simulator.stall_constraint is not None else 0.0,
+            'prescreened': float(prescreened),
+            'avl_calls': float(simulator.n_avl_calls),
+            **simulator.timer.outputs(),
+        }
@@ -0,0 +1,57 @@
+"""
+Mensagens e registro das avaliações do MDO.
+
+As mensagens de Individual, Simulator e competition_score passam pelo logging, com
+argumentos no estilo %, então nada é formatado quando o nível está desligado
+(LOG_LEVEL = 'WARNING' no modo de otimização). Fora do optimizer.py, configure_logging
+escolhe o nível e o destino.
+
+Cada avaliação também pode ser gravada como uma linha JSON (variáveis de design e
+resultados) pelo EvaluationLog, em vez de dezenas de linhas de texto por indivíduo.
+"""
+import json
+import logging
+import sys
+import time
+
+from variables import LOG_LEVEL
+
+LOGGER_NAME = 'mdo'
+
+logging.getLogger(LOGGER_NAME).setLevel(LOG_LEVEL)
+
+
+def get_logger(name):
+    return logging.getLogger(f'{LOGGER_NAME}.{name}')
+
+
+def configure_logging(level=LOG_LEVEL, stream=None):
+    '''
+    Define o nível das mensagens do MDO e as envia, sem prefixos, para stream (padrão stdout)
+    '''
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    handler = logging.StreamHandler(stream if stream is not None else sys.stdout)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.propagate = False
+    return logger
+
+
+class EvaluationLog:
+    """
+    Arquivo JSON-lines com um registro por avaliação de indivíduo.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def write(self, **record):
+        record.setdefault('time', time.time())
+        self.file.write(json.dumps(record, default=float) + '\n')
+
+    def close(self):
+        self.file.close()
@@ -4,12 +4,15 @@ from prototype import *
 from simulator import *
 from individual import *
 from performance import *
+import argparse
 import os
 import sys
 from datetime import datetime
 
 from variables import *
+from driver import PoolDifferentialEvolutionDriver
 from airfoil_loader import LISTA_ASA, LISTA_EH
+from mdo_logging import configure_logging, EvaluationLog
 
 """
 Programa principal do MDO.
@@ -20,232 +23,301 @@ Responsabilidades deste arquivo:
 - Registrar variáveis, objetivo e restrições
 - Executar o processo de otimização
 
+O modelo (indivíduo, valores iniciais, variáveis de design, objetivo e restrições) é
+montado por build_problem(), que também é usada pelos processos que avaliam a
+população em paralelo. Por isso a execução fica protegida por if __name__ == '__main__'.
+
+Uma execução interrompida continua de onde parou com:
+    python optimizer.py --resume log/evolutions/<projeto>_<data>.db
+A nova execução grava em um novo .db e retoma do checkpoint <db>.ckpt da anterior.
+
 """
 
-# =========================
-# CRIAÇÃO DO PROBLEMA
-# =========================
+def build_problem():
+    """
+    Cria o problema do MDO com o indivíduo, valores iniciais, variáveis de design,
+    objetivo e restrições. Não inclui driver nem recorder.
+    """
+    # =========================
+    # CRIAÇÃO DO PROBLEMA
+    # =========================
+
+    prob = om.Problem()
+
+    # =========================
+    # SUBSISTEMA PRINCIPAL
+    # =========================
+
+    prob.model.add_subsystem(
+        'individual_scorer',
+        Individual(),
+        promotes_inputs=INDIVIDUAL_INPUTS
+    )
+
+    # =========================
+    # VALORES INICIAIS
+    # =========================
+
+    # Define os valores iniciais de cada variável de design
+    # Esses valores são o "primeiro indivíduo" da população
+    for var_name, default_value in DEFAULT_VALUES.items():
+        prob.model.set_input_defaults(var_name, default_value)
+
+    # Define os valores dos perfis (FORA do loop)
+    prob.model.set_input_defaults('individual_scorer.idx_asa_root', 0.0)
+    prob.model.set_input_defaults('individual_scorer.idx_asa_tip', 0.0)
+    prob.model.set_input_defaults('individual_scorer.idx_eh', 0.0)
+    prob.model.set_input_defaults('individual_scorer.idx_ev', 0.0)
+    prob.model.set_input_defaults('individual_scorer.idx_cn', 0.0)
+
+    # =========================
+    # VARIÁVEIS DE DESIGN
+    # =========================
+
+    if root_af.lower() == "random":
+        prob.model.add_design_var('individual_scorer.idx_asa_root', lower=0, upper=len(LISTA_ASA)-1)
+
+    if tip_af.lower() == "random":
+        prob.model.add_design_var('individual_scorer.idx_asa_tip', lower=0, upper=len(LISTA_ASA)-1)
+
+    if eh_af.lower() == "random":
+        prob.model.add_design_var('individual_scorer.idx_eh', lower=0, upper=len(LISTA_EH)-1)
+
+    if ev_af.lower() == "random":
+        prob.model.add_design_var('individual_scorer.idx_ev', lower=0, upper=len(LISTA_EV)-1)
+
+    if cn_af.lower() == "random":
+        prob.model.add_design_var('individual_scorer.idx_cn', lower=0, upper=len(LISTA_EV)-1)
+
+    # Aqui o MDO fica sabendo:
+    # - quais variáveis ele pode mexer
+    # - quais os limites físicos de cada uma
+    # Os limites vêm TODOS do variables.py
+    for var_name, bounds in DESIGN_VARIABLES.items():
+        prob.model.add_design_var(
+            var_name,
+            lower=bounds['lower'],
+            upper=bounds['upper']
+        )
+
+    # =========================
+    # FUNÇÃO OBJETIVO
+    # =========================
+
+    # O objetivo é maximizar o score do indivíduo
+    # OpenMDAO sempre minimiza, então usamos scaler negativo
+    prob.model.add_objective(
+        'individual_scorer.score',
+        scaler=-1.0
+    )
+
+    # =========================
+    # RESTRIÇÕES
+    # =========================
 
-prob = om.Problem()
+    # Relação de aspecto mínima da asa
+    prob.model.add_constraint(
+        'individual_scorer.ar',
+        lower=GEOMETRIC_LIMITS['ar'][0]
+    )
 
-# =========================
-# SUBSISTEMA PRINCIPAL
-# =========================
+    # Relação de aspecto máxima do estabilizador horizontal
+    prob.model.add_constraint(
+        'individual_scorer.eh_ar',
+        upper=GEOMETRIC_LIMITS['eh_ar'][1]
+    )
 
-prob.model.add_subsystem(
-    'individual_scorer',
-    Individual(),
-    promotes_inputs=INDIVIDUAL_INPUTS
-)
+    # Volume de cauda horizontal
+    prob.model.add_constraint(
+        'individual_scorer.vht',
+        lower=GEOMETRIC_LIMITS['vht'][0],
+        upper=GEOMETRIC_LIMITS['vht'][1]
+    )
 
-# =========================
-# VALORES INICIAIS
-# =========================
+    # Volume de cauda vertical
+    prob.model.add_constraint(
+        'individual_scorer.vvt',
+        lower=GEOMETRIC_LIMITS['vvt'][0],
+        upper=GEOMETRIC_LIMITS['vvt'][1]
+    )
 
-# Define os valores iniciais de cada variável de design
-# Esses valores são o "primeiro indivíduo" da população
-for var_name, default_value in DEFAULT_VALUES.items():
-    prob.model.set_input_defaults(var_name, default_value)
+    # Ângulo de trimagem
+    # scaler = 0 evita penalização exagerada
+    prob.model.add_constraint(
+        'individual_scorer.a_trim',
+        lower=a_trim_min,
+        upper=a_trim_max,
+        scaler=0.0
+    )
+
+    # Margem estática
+    prob.model.add_constraint(
+        'individual_scorer.me',
+        lower=me_min,
+        upper=me_max
+    )
+
+    # Centro de gravidade não pode estar muito baixo
+    prob.model.add_constraint(
+        'individual_scorer.low_cg',
+        lower=GEOMETRIC_LIMITS['low_cg'][0]
+    )
+
+    # Distância mínima da empenagem horizontal ao eixo
+    prob.model.add_constraint(
+        'individual_scorer.eh_z_const',
+        lower=GEOMETRIC_LIMITS['eh_z_const'][0]
+    )
+
+    # Posição do CG percentual da corda média
+    prob.model.add_constraint(
+        'individual_scorer.x_cg_p',
+        lower=GEOMETRIC_LIMITS['x_cg_p'][0],
+        upper=GEOMETRIC_LIMITS['x_cg_p'][1],
+        scaler=0.0
+    )
 
-# Define os valores dos perfis (FORA do loop)
-prob.model.set_input_defaults('individual_scorer.idx_asa_root', 0.0)
-prob.model.set_input_defaults('individual_scorer.idx_asa_tip', 0.0)
-prob.model.set_input_defaults('individual_scorer.idx_eh', 0.0)
-prob.model.set_input_defaults('individual_scorer.idx_ev', 0.0)
-prob.model.set_input_defaults('individual_scorer.idx_cn', 0.0)
+    # # Ângulo mínimo de stall
+    # prob.model.add_constraint(
+    #     'individual_scorer.stall_constraint',
+    #     lower=0.0
+    # )
 
-# =========================
-# DRIVER DE OTIMIZAÇÃO
-# =========================
+    # # Garante que o Canard estole antes da asa (Segurança Canard)
+    # # Se stall_safety_margin > 0, o canard atinge o Cl_max dele primeiro.
+    # prob.model.add_constraint(
+    #     'individual_scorer.stall_safety_margin',
+    #     lower=0.02 # Margem de segurança de 2% de Cl
+    #)
 
-# Driver baseado em Algoritmo Genético Diferencial
-prob.driver = om.DifferentialEvolutionDriver()
+    # # Otimização de Sustentação: Garante que a asa não opere acima do Cl_max real
+    # # Isso substitui ou complementa o stall_constraint antigo
+    # prob.model.add_constraint(
+    #     'individual_scorer.cl_max_3d_wing',
+    #     upper=1.7
+    # )
 
-# Mostra no log as variáveis de design a cada geração
-prob.driver.options['debug_print'] = ['desvars']
+    return prob
 
-# Tamanho da população
-prob.driver.options['pop_size'] = 40
 
-# Parâmetros de penalização das restrições
-prob.driver.options['penalty_parameter'] = 20.0
-prob.driver.options['penalty_exponent'] = 1.0
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='MDO da aeronave')
+    parser.add_argument('--resume', metavar='DB',
+                        help='banco .db de uma execução interrompida para retomar do seu checkpoint')
+    args = parser.parse_args(argv)
 
-# Execução paralela (MPI)
-prob.driver.options['run_parallel'] = False
+    resume_path = None
+    if args.resume:
+        resume_path = args.resume if args.resume.endswith('.ckpt') else f'{args.resume}.ckpt'
+        if not os.path.exists(resume_path):
+            parser.error(f'checkpoint não encontrado: {resume_path}')
 
-# Número máximo de gerações
-prob.driver.options['max_gen'] = 999
+    prob = build_problem()
 
-# =========================
-# RECORDER (LOG DA OTIMIZAÇÃO)
-# =========================
+    # =========================
+    # DRIVER DE OTIMIZAÇÃO
+    # =========================
 
-# Garante que a pasta de logs exista
-log_dir = "log/evolutions"
-os.makedirs(log_dir, exist_ok=True)
+    # Driver baseado em Algoritmo Genético Diferencial
+    prob.driver = PoolDifferentialEvolutionDriver()
 
-# Timestamp no formato desejado: AAAA_MM_DD_HHMM
-start_time = datetime.now().strftime("%Y_%m_%d_%H%M")
+    # Mostra no log as variáveis de design a cada geração
+    prob.driver.options['debug_print'] = ['desvars']
 
-# nomedoprojeto_AAAA_MM_DD_HHMM.db
-log_filename = f"{PROJECT_NAME}_{start_time}.db"
+    # Tamanho da população
+    prob.driver.options['pop_size'] = 40
 
-log_path = os.path.join(log_dir, log_filename)
+    # Parâmetros de penalização das restrições
+    prob.driver.options['penalty_parameter'] = 20.0
+    prob.driver.options['penalty_exponent'] = 1.0
 
-prob.driver.add_recorder(
-    om.SqliteRecorder(log_path)
-)
+    # Execução paralela (MPI)
+    prob.driver.options['run_parallel'] = False
 
-# Define exatamente o que será salvo
-prob.driver.recording_options['includes'] = ['*']
-prob.driver.recording_options['record_objectives'] = True
-prob.driver.recording_options['record_constraints'] = True
-prob.driver.recording_options['record_desvars'] = True
+    # Execução paralela local: processos que avaliam a população de cada geração
+    prob.driver.options['pool_workers'] = N_WORKERS
+    prob.driver.options['problem_factory'] = build_problem
 
-# Arquivo de log em texto
-log_filename_txt = f"{PROJECT_NAME}_{start_time}.txt"
-log_path_txt = os.path.join(log_dir, log_filename_txt)
+    # Modo surrogate: só a fração mais promissora dos filhos (segundo um modelo RBF) é simulada
+    prob.driver.options['surrogate'] = SURROGATE
+    prob.driver.options['surrogate_fraction'] = SURROGATE_FRACTION
+    prob.driver.options['surrogate_min_samples'] = SURROGATE_MIN_SAMPLES
+    # Ao retomar, o modelo é treinado com as avaliações já gravadas na execução anterior
+    if resume_path and SURROGATE_DB is None:
+        prob.driver.options['surrogate_db'] = resume_path[:-len('.ckpt')]
+    else:
+        prob.driver.options['surrogate_db'] = SURROGATE_DB
 
-# =========================
-# VARIÁVEIS DE DESIGN
-# =========================
+    # Número máximo de gerações
+    prob.driver.options['max_gen'] = 999
 
-if root_af.lower() == "random":
-    prob.model.add_design_var('individual_scorer.idx_asa_root', lower=0, upper=len(LISTA_ASA)-1)
+    # =========================
+    # RECORDER (LOG DA OTIMIZAÇÃO)
+    # =========================
 
-if tip_af.lower() == "random":
-    prob.model.add_design_var('individual_scorer.idx_asa_tip', lower=0, upper=len(LISTA_ASA)-1)
+    # Garante que a pasta de logs exista
+    log_dir = "log/evolutions"
+    os.makedirs(log_dir, exist_ok=True)
 
-if eh_af.lower() == "random":
-    prob.model.add_design_var('individual_scorer.idx_eh', lower=0, upper=len(LISTA_EH)-1)
+    # Timestamp no formato desejado: AAAA_MM_DD_HHMM
+    start_time = datetime.now().strftime("%Y_%m_%d_%H%M")
 
-if ev_af.lower() == "random":
-    prob.model.add_design_var('individual_scorer.idx_ev', lower=0, upper=len(LISTA_EV)-1)
+    # nomedoprojeto_AAAA_MM_DD_HHMM.db
+    log_filename = f"{PROJECT_NAME}_{start_time}.db"
 
-if cn_af.lower() == "random":
-    prob.model.add_design_var('individual_scorer.idx_cn', lower=0, upper=len(LISTA_EV)-1)
+    log_path = os.path.join(log_dir, log_filename)
 
-# Aqui o MDO fica sabendo:
-# - quais variáveis ele pode mexer
-# - quais os limites físicos de cada uma
-# Os limites vêm TODOS do variables.py
-for var_name, bounds in DESIGN_VARIABLES.items():
-    prob.model.add_design_var(
-        var_name,
-        lower=bounds['lower'],
-        upper=bounds['upper']
+    prob.driver.add_recorder(
+        om.SqliteRecorder(log_path)
     )
 
-# =========================
-# FUNÇÃO OBJETIVO
-# =========================
-
-# O objetivo é maximizar o score do indivíduo
-# OpenMDAO sempre minimiza, então usamos scaler negativo
-prob.model.add_objective(
-    'individual_scorer.score',
-    scaler=-1.0
-)
-
-# =========================
-# RESTRIÇÕES
-# =========================
-
-# Relação de aspecto mínima da asa
-prob.model.add_constraint(
-    'individual_scorer.ar',
-    lower=5.0
-)
-
-# Relação de aspecto máxima do estabilizador horizontal
-prob.model.add_constraint(
-    'individual_scorer.eh_ar',
-    upper=4.8
-)
-
-# Volume de cauda horizontal
-prob.model.add_constraint(
-    'individual_scorer.vht',
-    lower=vht_min,
-    upper=vht_max
-)
-
-# Volume de cauda vertical
-prob.model.add_constraint(
-    'individual_scorer.vvt',
-    lower=vvt_min,
-    upper=vvt_max
-)
-
-# Ângulo de trimagem
-# scaler = 0 evita penalização exagerada
-prob.model.add_constraint(
-    'individual_scorer.a_trim',
-    lower=a_trim_min,
-    upper=a_trim_max,
-    scaler=0.0
-)
-
-# Margem estática
-prob.model.add_constraint(
-    'individual_scorer.me',
-    lower=me_min,
-    upper=me_max
-)
-
-# Centro de gravidade não pode estar muito baixo
-prob.model.add_constraint(
-    'individual_scorer.low_cg',
-    lower=-0.03
-)
-
-# Distância mínima da empenagem horizontal ao eixo
-prob.model.add_constraint(
-    'individual_scorer.eh_z_const',
-    lower=0.05
-)
-
-# Posição do CG percentual da corda média
-prob.model.add_constraint(
-    'individual_scorer.x_cg_p',
-    lower=0.25,
-    upper=0.34,
-    scaler=0.0
-)
-
-# # Ângulo mínimo de stall
-# prob.model.add_constraint(
-#     'individual_scorer.stall_constraint',
-#     lower=0.0
-# )
-
-# # Garante que o Canard estole antes da asa (Segurança Canard)
-# # Se stall_safety_margin > 0, o canard atinge o Cl_max dele primeiro.
-# prob.model.add_constraint(
-#     'individual_scorer.stall_safety_margin',
-#     lower=0.02 # Margem de segurança de 2% de Cl
-#)
-
-# # Otimização de Sustentação: Garante que a asa não opere acima do Cl_max real
-# # Isso substitui ou complementa o stall_constraint antigo
-# prob.model.add_constraint(
-#     'individual_scorer.cl_max_3d_wing',
-#     upper=1.7
-# )
-
-# =========================
-# SETUP E EXECUÇÃO
-# =========================
-
-# Prepara o modelo (checagem de conexões)
-print("\n--- INICIANDO SETUP ---")
-prob.setup()
-
-# Roda o MDO com log em arquivo txt
-print("\n--- SETUP CONCLUÍDO. INICIANDO OTIMIZAÇÃO ---\n")
-original_stdout = sys.stdout
-with open(log_path_txt, 'w', encoding='utf-8') as f:
-    sys.stdout = f
-    prob.run_driver()
-sys.stdout = original_stdout
\ No newline at end of file
+    # Checkpoint do estado do DE ao lado do .db, e retomada de uma execução anterior
+    prob.driver.options['checkpoint_path'] = f'{log_path}.ckpt'
+    prob.driver.options['checkpoint_every'] = CHECKPOINT_EVERY
+    prob.driver.options['resume_from'] = resume_path
+
+    # Define exatamente o que será salvo
+    prob.driver.recording_options['includes'] = ['*']
+    prob.driver.recording_options['record_objectives'] = True
+    prob.driver.recording_options['record_constraints'] = True
+    prob.driver.recording_options['record_desvars'] = True
+
+    # Arquivo de log em texto
+    log_filename_txt = f"{PROJECT_NAME}_{start_time}.txt"
+    log_path_txt = os.path.join(log_dir, log_filename_txt)
+
+    # Registro JSON de cada avaliação (variáveis de design e resultados)
+    if EVALUATION_LOG:
+        Individual.evaluation_log = EvaluationLog(os.path.join(log_dir, f"{PROJECT_NAME}_{start_time}.jsonl"))
+
+    # =========================
+    # SETUP E EXECUÇÃO
+    # =========================
+
+    # Prepara o modelo (checagem de conexões)
+    print("\n--- INICIANDO SETUP ---")
+    prob.setup()
+
+    # Roda o MDO com log em arquivo txt
+    print("\n--- SETUP CONCLUÍDO. INICIANDO OTIMIZAÇÃO ---\n")
+    original_stdout = sys.stdout
+    with open(log_path_txt, 'w', encoding='utf-8') as f:
+        sys.stdout = f
+        configure_logging(LOG_LEVEL, stream=f)
+        try:
+            prob.run_driver()
+        finally:
+            sys.stdout = original_stdout
+            configure_logging(LOG_LEVEL)
+            if Individual.evaluation_log is not None:
+                Individual.evaluation_log.close()
+
+    # Relatório de tempos por etapa (p50/p95) e chamadas do AVL por indivíduo
+    report = Individual.timing_summary.report()
+    print(report)
+    with open(log_path_txt, 'a', encoding='utf-8') as f:
+        f.write('\n' + report + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -237,6 +237,135 @@ def mtow(p, t, v, m, s, clc, clmax, cdc, cdt, pot, g= 9.81, mu= 0.03, n= 1.2, ga
     return result
 
 
+##### MODELO VETORIZADO DE DECOLAGEM #####
+
+# Quadratura de Gauss-Legendre de ordem fixa no intervalo [0, 1] para a corrida no solo
+GL_ORDER= 32
+gl_u, gl_w= np.polynomial.legendre.leggauss(GL_ORDER)
+gl_u= (gl_u + 1)/2
+gl_w= gl_w/2
+
+rho_ref= rho(p=1013.25, t=15)
+
+def tracd_np(p, t, v, pot):
+    #Tração disponível vetorizada em v (mesmas curvas de tracd, com a densidade de referência calculada uma vez)
+    if np.any(np.asarray(pot) < 600) or np.any(np.asarray(pot) > 650):
+        raise ValueError(f'Potência fora da faixa das curvas de tração (600 a 650 W): {pot}')
+
+    poly= 0.6374625901805*v-0.39434159385213*v**2+0.028296433071339*v**3-0.00068805475237905*v**4
+    trac600= (45.384+poly)*(rho(p,t)/rho_ref)
+    trac650= (40.691396530109+poly)*(rho(p,t)/rho_ref)
+
+    return (trac600*(650-pot) + trac650*(pot-600))/50
+
+def d_decol_np(p, t, v, m, s, clc, clmax, cdc, cdt, pot, g= 9.81, mu= 0.03, n= 1.2):
+    """
+    Distância total de decolagem (solo + rotação + transição + subida), vetorizada.
+
+    Aceita escalares ou arrays compatíveis por broadcasting em m, s, clc, clmax, cdc, cdt,
+    de modo que várias massas e vários aviões são avaliados em uma única chamada. A corrida
+    no solo é integrada com Gauss-Legendre de ordem GL_ORDER sobre [0, v_decol] e o ângulo
+    de transição usa a solução fechada de f_g_tr. Se a aceleração ficar nula ou negativa
+    antes de v_decol, o avião não decola e a distância é infinita.
+    """
+    m, s, clc, clmax, cdc, cdt= np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in (m, s, clc, clmax, cdc, cdt)])
+    dens= rho(p, t)
+
+    v_est= np.sqrt(np.abs((2*m*g)/(dens*s*clmax)))
+    v_decol= 1.2*v_est
+
+    # Corrida no solo: o atrito atua em toda a corrida, pois v <= 1.2*v_estol até a decolagem
+    vk= v_decol[..., None]*gl_u
+    qk= dens*vk**2/2
+    acel= (tracd_np(p, t, vk, pot) - qk*s[..., None]*cdc[..., None] - mu*(m[..., None]*g - qk*s[..., None]*clc[..., None]))/m[..., None]
+    dist_solo= np.where(np.all(acel > 0, axis=-1), v_decol*np.sum(gl_w*vk/np.where(acel > 0, acel, 1.0), axis=-1), np.inf)
+
+    dist_rot= v_decol/3
+
+    # Transição e subida
+    r_t= (1.15*v_est)**2/(g*(n-1))
+    gamma_cl= (tracd_np(p, t, v_est, pot) - dens*v_est**2/2*s*cdt)/(m*g)
+    h_t= r_t*(1-np.cos(gamma_cl))
+    gamma_tr= np.arccos(np.clip(1 - h_decol/r_t, -1.0, 1.0))
+
+    climbs= h_t < h_decol
+    dist_trans= np.where(climbs, r_t*np.sin(gamma_cl), r_t*np.sin(gamma_tr))
+    dist_sub= np.where(climbs, (h_decol-h_t)/np.tan(np.where(climbs, gamma_cl, 1.0)), 0.0)
+
+    return dist_solo + dist_rot + dist_trans + dist_sub
+
+def mtow_np(p, t, v, m, s, clc, clmax, cdc, cdt, pot, g= 9.81, mu= 0.03, n= 1.2, gamma= 0, m_low= 5, m_high= 30, xtol= 2e-12, rtol= 4*np.finfo(float).eps, maxiter= 100, levels= None):
+    """
+    MTOW vetorizado: mesma raiz de f_mtow que mtow() encontra por bissecção em [5, 30] kg.
+
+    s, clc, clmax, cdc, cdt podem ser arrays (um valor por avião) para avaliar uma população
+    inteira de uma vez. A bissecção é a mesma do root_scalar(method='bisect'): mesmos pontos
+    médios, mesmo critério de parada e mesmos xtol e rtol padrão. Quando f_mtow tem mais de
+    uma raiz em [m_low, m_high], a escolhida é a mesma do mtow(), e não a de menor massa.
+
+    Para não pagar uma chamada de d_decol_np por nível, cada chamada avalia de uma vez os
+    2**levels - 1 pontos médios possíveis dos próximos levels níveis, e o caminho da
+    bissecção é percorrido depois com os sinais já calculados. Isso compensa com poucos
+    aviões, em que o custo de cada chamada é fixo; com populações grandes o trabalho extra
+    domina. Sem levels, 4 níveis por chamada para um avião e 1 a partir de 1000.
+
+    Para entradas escalares devolve um float e levanta ValueError se f_mtow não troca de sinal
+    entre m_low e m_high, como o root_scalar. Para arrays, esses aviões recebem nan.
+    """
+    scalar= all(np.ndim(x) == 0 for x in (s, clc, clmax, cdc, cdt))
+    s, clc, clmax, cdc, cdt= [np.atleast_1d(x).astype(float) for x in np.broadcast_arrays(s, clc, clmax, cdc, cdt)]
+    rows= np.arange(len(s))
+    if levels is None:
+        levels= max(1, 4 - int(np.log10(len(s))))
+
+    def f(mass):
+        # Sem decolagem a distância é infinita (ou indefinida): f negativo
+        f_m= c_pista - d_decol_np(p, t, v, mass, s[:, None], clc[:, None], clmax[:, None], cdc[:, None], cdt[:, None], pot, g, mu, n)
+        return np.where(np.isnan(f_m), -np.inf, f_m)
+
+    f_ab= f(np.tile([float(m_low), float(m_high)], (len(s), 1)))
+    f_a, f_b= f_ab[:, 0], f_ab[:, 1]
+    found= f_a*f_b <= 0
+
+    # Raiz em um dos extremos: o bisect devolve o extremo sem iterar
+    result= np.where(f_a == 0, float(m_low), np.where(f_b == 0, float(m_high), np.nan))
+    done= ~found | (f_a == 0) | (f_b == 0)
+
+    xa= np.full(len(s), float(m_low))
+    dm= float(m_high - m_low)
+    it= 0
+    while it < maxiter and not np.all(done):
+        k= min(levels, maxiter - it)
+
+        # Pontos médios de cada nível para todos os caminhos possíveis: no nó i do nível j,
+        # o filho 2i mantém xa e o filho 2i+1 passa xa para o ponto médio
+        starts= xa[:, None]
+        steps, points= [], []
+        for _ in range(k):
+            dm*= .5
+            xm= starts + dm
+            steps.append(dm); points.append(xm)
+            starts= np.stack([starts, xm], axis=-1).reshape(len(s), -1)
+        f_points= np.split(f(np.concatenate(points, axis=1)), np.cumsum([x.shape[1] for x in points])[:-1], axis=1)
+
+        node= np.zeros(len(s), dtype=int)
+        for step, xm, f_m in zip(steps, points, f_points):
+            xm, f_m= xm[rows, node], f_m[rows, node]
+            accept= f_m*f_a >= 0
+            stop= ~done & ((f_m == 0) | (abs(step) < xtol + rtol*np.abs(xm)))
+            result= np.where(stop, xm, result)
+            done= done | stop
+            xa= np.where(accept, xm, xa)
+            node= 2*node + accept
+        it+= k
+
+    if scalar:
+        if not found[0]:
+            raise ValueError('f(a) and f(b) must have different signs')
+        return float(result[0])
+    return result
+
+
 #def mtow():
 
 
@@ -255,4 +384,6 @@ if __name__ == '__main__':
     #print(d_sub(1013, 26, 10, 0.8, 2.04, 0.2))
     #print(d_decol(1013, 26, 10, 10.6, 0.8, 1.2, 2.04, 0.2, 0.3))
     print(mtow(1013, 26, 10, 20, 0.8, 1.2, 2.04, 0.2, 0.3, 601))
+    print(mtow_np(1013, 26, 10, 20, 0.8, 1.2, 2.04, 0.2, 0.3, 601))
+    print(mtow_np(1013, 26, 10, 20, np.array([0.7, 0.8, 0.9]), 1.2, 2.04, 0.2, 0.3, 601))
 
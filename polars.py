@@ -0,0 +1,145 @@
+"""
+Polares dos perfis em função do número de Reynolds.
+
+Cada pasta de perfil em airfoils/ traz as polares do XFOIL em Re2e5.csv ... Re5e5.csv
+(colunas alpha, cl, cd, cm). O PolarStore lê cada perfil uma única vez para arrays
+NumPy e o Polar interpola, para vários pontos de uma vez:
+
+- clmax(re): cl máximo de cada Reynolds, linear em Re
+- cl(re, alpha) e cd(re, alpha): bilinear em (Re, alfa)
+
+Fora da faixa de Reynolds das polares os valores ficam nos extremos (sem extrapolação).
+"""
+from pathlib import Path
+
+import numpy as np
+
+
+def mu_sutherland(t):
+    '''
+    Viscosidade dinâmica do ar [Pa.s] pela lei de Sutherland, t em graus Celsius
+    '''
+    t_k = t + 273.15
+    return 1.716e-5*(t_k/273.15)**1.5*(273.15 + 110.4)/(t_k + 110.4)
+
+
+def reynolds(rho, v, chord, t):
+    '''
+    Número de Reynolds de cada corda (escalar ou array) na velocidade v
+    '''
+    return rho*v*np.asarray(chord, dtype=float)/mu_sutherland(t)
+
+
+def read_polar_csv(path):
+    '''
+    Lê um CSV de polar (cabeçalho alpha,cl,cd,cm com vírgula final e linhas em branco) -> (n, 4)
+    '''
+    rows = []
+    with open(path, 'r') as f:
+        next(f, None)
+        for line in f:
+            values = [v for v in line.strip().split(',') if v.strip()]
+            if len(values) >= 4:
+                try:
+                    rows.append([float(v) for v in values[:4]])
+                except ValueError:
+                    continue
+    data = np.array(rows).reshape(-1, 4)
+    return data[np.argsort(data[:, 0])]
+
+
+class Polar:
+    """
+    Polares de um perfil em vários Reynolds.
+
+    - re: Reynolds disponíveis (crescentes)
+    - curves: para cada Re, array (n, 4) de alpha, cl, cd, cm
+    - cl_max / alpha_cl_max: máximo de cada curva
+    """
+
+    def __init__(self, curves):
+        self.re = np.array(sorted(curves))
+        self.curves = [curves[re] for re in self.re]
+        self.cl_max = np.array([curve[:, 1].max() for curve in self.curves])
+        self.alpha_cl_max = np.array([curve[np.argmax(curve[:, 1]), 0] for curve in self.curves])
+
+    def _re_weights(self, re):
+        # Índice da curva inferior e peso da superior para cada Reynolds
+        re = np.clip(np.asarray(re, dtype=float), self.re[0], self.re[-1])
+        if len(self.re) == 1:
+            return np.zeros(re.shape, dtype=int), np.zeros(re.shape)
+        i = np.clip(np.searchsorted(self.re, re, side='right') - 1, 0, len(self.re) - 2)
+        w = (re - self.re[i])/(self.re[i + 1] - self.re[i])
+        return i, w
+
+    def clmax(self, re):
+        if len(self.re) == 1:
+            return np.full(np.shape(re), self.cl_max[0])
+        return np.interp(re, self.re, self.cl_max)
+
+    def _bilinear(self, column, re, alpha):
+        re, alpha = np.broadcast_arrays(np.asarray(re, dtype=float), np.asarray(alpha, dtype=float))
+        # Interpolação em alfa em todas as curvas e depois em Re entre as duas vizinhas
+        by_curve = np.array([np.interp(alpha, curve[:, 0], curve[:, column]) for curve in self.curves])
+        i, w = self._re_weights(re)
+        lower = np.take_along_axis(by_curve, i[None, ...], axis=0)[0]
+        upper = np.take_along_axis(by_curve, np.minimum(i + 1, len(self.re) - 1)[None, ...], axis=0)[0]
+        return (1 - w)*lower + w*upper
+
+    def cl(self, re, alpha):
+        return self._bilinear(1, re, alpha)
+
+    def cd(self, re, alpha):
+        return self._bilinear(2, re, alpha)
+
+
+class PolarStore:
+    """
+    Cache das polares por pasta de perfil: cada pasta é lida uma única vez por processo.
+    """
+
+    def __init__(self):
+        self._polars = {}
+
+    def folder(self, airfoil_data):
+        # Pasta do perfil a partir do dicionário do catálogo (dat_path aponta para o geometry.dat)
+        return Path(str(airfoil_data['dat_path']).replace('\\', '/')).parent
+
+    def get(self, airfoil_data):
+        '''
+        Polar do perfil, ou None se o perfil não tiver nenhum CSV de polar
+        '''
+        if not airfoil_data:
+            return None
+        folder = self.folder(airfoil_data)
+        if folder not in self._polars:
+            curves = {}
+            for path in folder.glob('Re*.csv'):
+                try:
+                    re = float(path.stem[2:])
+                    curve = read_polar_csv(path)
+                except (ValueError, OSError):
+                    continue
+                if len(curve) >= 2:
+                    curves[re] = curve
+            self._polars[folder] = Polar(curves) if curves else None
+        return self._polars[folder]
+
+
+polar_store = PolarStore()
+
+
+##### TESTES #####
+
+if __name__ == '__main__':
+    dados_root = {'name': 'MIN1112', 'dat_path': 'airfoils/assymmetric/MIN1112/geometry.dat'}
+    polar = polar_store.get(dados_root)
+    print('Reynolds:', polar.re)
+    print('cl_max por Reynolds:', polar.cl_max)
+
+    chords = np.linspace(0.15, 0.5, 8)
+    re = reynolds(1.1, 10, chords, 25)
+    print('Re das cordas:', np.round(re))
+    print('cl_max interpolado:', np.round(polar.clmax(re), 3))
+    print('cl(Re, 5 graus):', np.round(polar.cl(re, 5.0), 3))
+    print('cd(Re, 5 graus):', np.round(polar.cd(re, 5.0), 4))
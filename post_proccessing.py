@@ -1,89 +1,76 @@
-import openmdao.api as om
-from stability import *
+from recorder_reader import RecorderReader, FEASIBILITY, DEFAULT_COLUMNS, SCORE
 
 np=1
+db_path='./log/evolutions/banana_convencional_2026_02_12_1646.db'
+
+# Restrições do filtro, nome -> (mínimo, máximo)
+bounds= {
+    **FEASIBILITY,
+    #'individual_scorer.ar': (5, None),
+    #'individual_scorer.vht': (None, 0.8),
+    #'individual_scorer.cp': (12.900, None),
+    #'individual_scorer.g_const': (2.8, 2.9),
+    SCORE: (150.00, None),
+}
+
 proc_case=[]
 
 if (np > 1):
     for p in range(np):
 
-        crp= om.CaseReader('./log/evolutions/banana_convencional_2026_02_12_1646.db'+str(p))
-        driver_cases = crp.list_cases('driver')
-        cases = crp.get_cases()
-        proc_case.append(cases)
+        with RecorderReader(db_path+str(p)) as reader:
+            proc_case.append(reader.select(DEFAULT_COLUMNS, bounds, last=19900).sort_index())
 
 else:
-    crp= om.CaseReader('./log/evolutions/banana_convencional_2026_02_12_1646.db')
-    driver_cases = crp.list_cases('driver')
-    cases = crp.get_cases()
-    proc_case.append(cases)
+    with RecorderReader(db_path) as reader:
+        proc_case.append(reader.select(DEFAULT_COLUMNS, bounds, last=19900).sort_index())
 
 for proc_n in range(len(proc_case)):
 
-    proc_case[proc_n]= proc_case[proc_n][-19900:]
-
+    for counter, case in proc_case[proc_n].iterrows():
 
-    for case in proc_case[proc_n]:
+        print('-------------- PROTOTIPO:', case['case'][-4:]+'-'+str(proc_n)+' --------------\n')
+        print(
+            ' Variaveis de design: (',
+              ' w_bt= ',case['w_bt'],','
+              ' w_baf= ',case['w_baf'],','
+              ' w_cr= ',case['w_cr'],','
+              ' w_ci= ',case['w_ci'],','
+              ' w_ct= ',case['w_ct'],','
+              ' w_z= ',case['w_z'],','
+              ' w_inc= ',case['w_inc'],','
+              ' w_wo= ',case['w_wo'],','
+              ' w_d= ',case['w_d'],','
+              ' eh_b= ',case['eh_b'],','
+              ' eh_cr= ',case['eh_cr'],','
+              ' eh_ct= ',case['eh_ct'],','
+              ' eh_inc= ',case['eh_inc'],','
+              ' ev_b= ',case['ev_b'],','
+              ' ev_ct= ',case['ev_ct'],','
+              ' eh_x= ',case['eh_x'],','
+              ' eh_z= ',case['eh_z'],','
+              ' motor_x= ',case['motor_x'],','
+              #'pot= ',case['pot'],','
+              ')'
+              , sep=''
+              )
 
-        if (
-            #True
-            (case.outputs['individual_scorer.a_trim'] <= a_trim_max)
-            and (case.outputs['individual_scorer.a_trim'] >= a_trim_min)
-            and (case.outputs['individual_scorer.x_cg_p'] <=0.40) 
-            and (case.outputs['individual_scorer.x_cg_p'] >= 0.25) 
-            and (case.outputs['individual_scorer.me'] <= me_max)
-            and (case.outputs['individual_scorer.me'] >= me_min)
-            #and (case.outputs['individual_scorer.ar'] >= 5)
-            #and (case.outputs['individual_scorer.vht'] <= 0.8)
-            and (case.outputs['individual_scorer.vvt'] >= vvt_min)
-            #and (case.outputs['individual_scorer.cp'] >= 12.900)
-            #and (case.outputs['individual_scorer.g_const'] <= 2.9)
-            #and (case.outputs['individual_scorer.g_const'] >= 2.8)
-            and (case.outputs['individual_scorer.score'] >= 150.00)
-            ):
+        print(
+            '\n Objetivos\n',
+              '     Pontuação da competição =', case[SCORE]
+              )
 
-            print('-------------- PROTOTIPO:', case.name[-4:]+'-'+str(proc_n)+' --------------\n')
-            print(
-                ' Variaveis de design: (',
-                  ' w_bt= ',float(case.outputs['w_bt']),','
-                  ' w_baf= ',float(case.outputs['w_baf']),','
-                  ' w_cr= ',float(case.outputs['w_cr']),','
-                  ' w_ci= ',float(case.outputs['w_ci']),','
-                  ' w_ct= ',float(case.outputs['w_ct']),','
-                  ' w_z= ',float(case.outputs['w_z']),','
-                  ' w_inc= ',float(case.outputs['w_inc']),','
-                  ' w_wo= ',float(case.outputs['w_wo']),','
-                  ' w_d= ',float(case.outputs['w_d']),','
-                  ' eh_b= ',float(case.outputs['eh_b']),','
-                  ' eh_cr= ',float(case.outputs['eh_cr']),','
-                  ' eh_ct= ',float(case.outputs['eh_ct']),','
-                  ' eh_inc= ',float(case.outputs['eh_inc']),','
-                  ' ev_b= ',float(case.outputs['ev_b']),','
-                  ' ev_ct= ',float(case.outputs['ev_ct']),','
-                  ' eh_x= ',float(case.outputs['eh_x']),','
-                  ' eh_z= ',float(case.outputs['eh_z']),','
-                  ' motor_x= ',float(case.outputs['motor_x']),','
-                  #'pot= ',float(case.outputs['pot']),','
-                  ')'
-                  , sep=''
-                  )
-            
-            print(
-                '\n Objetivos\n',
-                  '     Pontuação da competição =', float(case.outputs['individual_scorer.score'])
-                  )
-            
-            print(
-                '\n Restricoes\n',
-                  #'     Altura=', float(case.outputs['individual_scorer.h_const']),'\n',
-                  '     Gap do EH=', float(case.outputs['individual_scorer.eh_z_const']),'\n',
-                  '     Gap do CG=', float(case.outputs['individual_scorer.low_cg']),'\n',
-                  '     VHT=', float(case.outputs['individual_scorer.vht']),'\n',
-                  '     VVT=', float(case.outputs['individual_scorer.vvt']),'\n',
-                  '     AR=', float(case.outputs['individual_scorer.ar']),'\n',
-                  '     AR do EH=', float(case.outputs['individual_scorer.eh_ar']),'\n',
-                  #'     Cm0=', float(case.outputs['individual_scorer.cm0']),'\n',
-                  '     CG em=', float(case.outputs['individual_scorer.x_cg_p']),'\n',
-                  '     Angulo de trimagem=', float(case.outputs['individual_scorer.a_trim']),'\n',
-                  '     Margem Estatica=', float(case.outputs['individual_scorer.me']),'\n'
-                  )
\ No newline at end of file
+        print(
+            '\n Restricoes\n',
+              #'     Altura=', case['individual_scorer.h_const'],'\n',
+              '     Gap do EH=', case['individual_scorer.eh_z_const'],'\n',
+              '     Gap do CG=', case['individual_scorer.low_cg'],'\n',
+              '     VHT=', case['individual_scorer.vht'],'\n',
+              '     VVT=', case['individual_scorer.vvt'],'\n',
+              '     AR=', case['individual_scorer.ar'],'\n',
+              '     AR do EH=', case['individual_scorer.eh_ar'],'\n',
+              #'     Cm0=', case['individual_scorer.cm0'],'\n',
+              '     CG em=', case['individual_scorer.x_cg_p'],'\n',
+              '     Angulo de trimagem=', case['individual_scorer.a_trim'],'\n',
+              '     Margem Estatica=', case['individual_scorer.me'],'\n'
+              )
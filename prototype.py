@@ -239,7 +239,7 @@ class Prototype:
         # ====================================================
         self.s_ref = s_ref(w_cr, w_ci, w_baf, w_ct, w_bt)
         self.c_med = c_med(self.s_ref, w_bt)
-        self.mac = mac(0, w_bt, w_baf, w_cr, w_ct)
+        self.mac = mac_exact(w_bt, w_baf, w_cr, w_ct)
         self.ref_span = ref_span(w_baf, self.mac, w_cr, w_bt)
 
         self.svt = svt(self.ev_cr, self.ev_ct, ev_b)
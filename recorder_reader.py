@@ -0,0 +1,265 @@
+"""
+Leitura direta dos bancos do SqliteRecorder (log/evolutions/*.db).
+
+O om.CaseReader monta um objeto Case com todas as variáveis gravadas para cada iteração.
+Com recording_options['includes'] = ['*'] isso ocupa gigabytes e leva minutos em uma
+campanha longa. Aqui a tabela driver_iterations é lida direto pelo sqlite3:
+
+- só as colunas pedidas (variáveis de design, score, restrições) são extraídas, com
+  json_extract no próprio SQLite sempre que possível
+- as iterações são lidas em blocos de chunk_size linhas, cada bloco vira um DataFrame
+- filtros de viabilidade e ranking (top-N) são aplicados bloco a bloco, então a memória
+  fica limitada ao tamanho do bloco mais os indivíduos que passaram no filtro
+
+Os nomes aceitos são os mesmos do CaseReader: promovidos ('w_bt') ou absolutos
+('individual_scorer.score'). Todas as variáveis lidas devem ser escalares.
+"""
+import json
+import pickle
+import sqlite3
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from stability import a_trim_min, a_trim_max, me_min, me_max, vvt_min
+from variables import DESIGN_VARIABLES
+
+CHUNK_SIZE = 5000
+
+SCORE = 'individual_scorer.score'
+
+# Restrições do pós-processamento: nome -> (mínimo, máximo), None = sem limite
+FEASIBILITY = {
+    'individual_scorer.a_trim': (a_trim_min, a_trim_max),
+    'individual_scorer.x_cg_p': (0.25, 0.40),
+    'individual_scorer.me': (me_min, me_max),
+    'individual_scorer.vvt': (vvt_min, None),
+}
+
+# Saídas do indivíduo impressas no relatório de cada protótipo
+CONSTRAINT_COLUMNS = [
+    'individual_scorer.eh_z_const',
+    'individual_scorer.low_cg',
+    'individual_scorer.vht',
+    'individual_scorer.vvt',
+    'individual_scorer.ar',
+    'individual_scorer.eh_ar',
+    'individual_scorer.x_cg_p',
+    'individual_scorer.a_trim',
+    'individual_scorer.me',
+]
+
+DEFAULT_COLUMNS = list(DESIGN_VARIABLES) + [SCORE] + CONSTRAINT_COLUMNS
+
+
+def decode(value):
+    '''
+    Decodifica um campo gravado pelo SqliteRecorder: texto JSON ou blob (zlib e/ou pickle,
+    conforme a versão do formato)
+    '''
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return json.loads(value)
+    try:
+        value = zlib.decompress(value)
+    except zlib.error:
+        pass
+    try:
+        return json.loads(value.decode('ascii'))
+    except (UnicodeDecodeError, ValueError):
+        return pickle.loads(value)
+
+
+def _scalar(value):
+    if value is None:
+        return np.nan
+    value = np.ravel(value)
+    return float(value[0]) if len(value) else np.nan
+
+
+def feasible_mask(frame, bounds=FEASIBILITY):
+    '''
+    Máscara booleana das linhas do DataFrame que respeitam todos os limites (vetorizado)
+    '''
+    mask = np.ones(len(frame), dtype=bool)
+    for name, (lower, upper) in bounds.items():
+        values = frame[name].to_numpy(dtype=float)
+        if lower is not None:
+            mask &= values >= lower
+        if upper is not None:
+            mask &= values <= upper
+    return mask
+
+
+class RecorderReader:
+    """
+    Leitor em blocos da tabela driver_iterations de um banco do SqliteRecorder.
+
+    - resolve(names): chave gravada de cada nome promovido ou absoluto
+    - iter_frames(columns): DataFrames de chunk_size iterações com as colunas pedidas
+    - read(columns): todas as iterações (ou só as últimas) em um único DataFrame
+    - select(...): iterações viáveis, opcionalmente só as top-N por uma coluna
+    """
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+        # Somente leitura: o banco pode estar sendo escrito por uma otimização em andamento
+        self.conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        self._keys = {}
+        self._load_metadata()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _load_metadata(self):
+        cursor = self.conn.execute('SELECT * FROM metadata')
+        row = cursor.fetchone()
+        fields = dict(zip([d[0] for d in cursor.description], row)) if row else {}
+        self.format_version = fields.get('format_version')
+
+        def field(name):
+            try:
+                return decode(fields.get(name)) or {}
+            except Exception:
+                return {}
+
+        self.abs2prom = field('abs2prom')
+        self.prom2abs = field('prom2abs')
+        self.conns = field('conns')
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM driver_iterations').fetchone()[0]
+
+    def recorded_names(self):
+        '''
+        Nomes gravados nas saídas da última iteração
+        '''
+        row = self.conn.execute('SELECT outputs FROM driver_iterations ORDER BY id DESC LIMIT 1').fetchone()
+        if row is None:
+            return set()
+        outputs = decode(row[0])
+        return set(outputs.dtype.names if hasattr(outputs, 'dtype') else outputs)
+
+    def resolve(self, names):
+        '''
+        Chave gravada de cada nome: o próprio nome absoluto, a saída promovida, ou a fonte
+        (p.ex. _auto_ivc.v0) da entrada promovida
+        '''
+        missing = [name for name in names if name not in self._keys]
+        if missing:
+            recorded = self.recorded_names()
+            outputs_prom = self.prom2abs.get('output', {})
+            inputs_prom = self.prom2abs.get('input', {})
+            prom_of_output = self.abs2prom.get('output', {})
+
+            for name in missing:
+                candidates = [name] + list(outputs_prom.get(name, []))
+                candidates += [self.conns.get(abs_name) for abs_name in inputs_prom.get(name, [])]
+                candidates += [abs_name for abs_name, prom in prom_of_output.items() if prom == name]
+                key = next((c for c in candidates if c in recorded), None)
+                if key is None:
+                    raise KeyError(f"A variável '{name}' não foi gravada em {self.path}")
+                self._keys[name] = key
+        return {name: self._keys[name] for name in names}
+
+    def _first_id(self, last):
+        # Menor id das últimas `last` iterações (0 = todas)
+        if not last:
+            return 0
+        row = self.conn.execute('SELECT id FROM driver_iterations ORDER BY id DESC LIMIT 1 OFFSET ?',
+                                (last - 1,)).fetchone()
+        return row[0] - 1 if row else 0
+
+    def _query_chunk(self, keys, after):
+        # Extração no SQLite: '$."nome"[0]' devolve o primeiro elemento do array já como número
+        projections = ', '.join(f'json_extract(outputs, ?)' for _ in keys)
+        paths = ['$."{}"[0]'.format(key) for key in keys]
+        sql = (f'SELECT id, counter, iteration_coordinate, {projections} FROM driver_iterations '
+               f'WHERE id > ? ORDER BY id LIMIT ?')
+        return self.conn.execute(sql, paths + [after, self.chunk_size]).fetchall()
+
+    def _decode_chunk(self, keys, after):
+        # Caminho lento: blobs de formatos antigos ou JSON com NaN/Infinity, que o SQLite rejeita
+        rows = self.conn.execute('SELECT id, counter, iteration_coordinate, outputs FROM driver_iterations '
+                                 'WHERE id > ? ORDER BY id LIMIT ?', (after, self.chunk_size)).fetchall()
+        decoded = []
+        for row_id, counter, coord, outputs in rows:
+            outputs = decode(outputs)
+            values = [_scalar(outputs[key]) if key in (outputs.dtype.names if hasattr(outputs, 'dtype')
+                                                       else outputs) else np.nan for key in keys]
+            decoded.append((row_id, counter, coord, *values))
+        return decoded
+
+    def iter_frames(self, columns=DEFAULT_COLUMNS, last=None):
+        '''
+        Gera DataFrames de até chunk_size iterações (índice = counter da iteração) com as
+        colunas pedidas e a coluna 'case' (iteration_coordinate)
+        '''
+        keys = list(self.resolve(columns).values())
+        after = self._first_id(last)
+        use_sql = True
+        while True:
+            rows = None
+            if use_sql:
+                try:
+                    rows = self._query_chunk(keys, after)
+                except sqlite3.OperationalError:
+                    use_sql = False
+            if rows is None:
+                rows = self._decode_chunk(keys, after)
+            if not rows:
+                return
+
+            after = rows[-1][0]
+            frame = pd.DataFrame.from_records(rows, columns=['id', 'counter', 'case'] + list(columns))
+            frame[list(columns)] = frame[list(columns)].astype(float)
+            yield frame.drop(columns='id').set_index('counter')
+
+    def read(self, columns=DEFAULT_COLUMNS, last=None):
+        frames = list(self.iter_frames(columns, last))
+        if not frames:
+            return pd.DataFrame(columns=['case'] + list(columns))
+        return pd.concat(frames)
+
+    def select(self, columns=DEFAULT_COLUMNS, bounds=FEASIBILITY, top=None, sort_by=SCORE,
+               ascending=False, last=None):
+        '''
+        Iterações que respeitam bounds, ordenadas por sort_by. Com top, só as top-N são
+        mantidas entre os blocos, o que limita a memória em campanhas longas.
+        '''
+        columns = list(dict.fromkeys(list(columns) + list(bounds) + [sort_by]))
+        selected = []
+        for frame in self.iter_frames(columns, last):
+            frame = frame[feasible_mask(frame, bounds)]
+            if top is not None:
+                selected = [pd.concat(selected + [frame]).sort_values(sort_by, ascending=ascending).head(top)]
+            else:
+                selected.append(frame)
+
+        if not selected:
+            return pd.DataFrame(columns=['case'] + columns)
+        return pd.concat(selected).sort_values(sort_by, ascending=ascending)
+
+
+##### TESTES #####
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    path = sys.argv[1] if len(sys.argv) > 1 else './log/evolutions/banana_convencional_2026_02_12_1646.db'
+    start = time.perf_counter()
+    with RecorderReader(path) as reader:
+        print('Iterações gravadas:', len(reader))
+        best = reader.select(bounds={**FEASIBILITY, SCORE: (150.0, None)}, top=10)
+    print(best)
+    print(f'Tempo: {time.perf_counter() - start:.2f} s')
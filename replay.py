@@ -0,0 +1,97 @@
+"""
+Arquivo de replay dos resultados do AVL.
+
+Com REPLAY_RECORD, cada dicionário devolvido por Session.get_results() é gravado por
+caso, com a mesma chave do avl_cache (hash da geometria + parâmetros do caso). O backend
+'replay' do Simulator lê esses resultados em vez de abrir o AVL, então o pipeline
+Individual -> Simulator -> mtow roda (e pode ser medido) em qualquer máquina, sem o
+executável, com resultados idênticos aos gravados.
+
+O arquivo é uma pasta de fragmentos JSON-lines comprimidos com gzip, um por processo
+que gravou, o que dispensa travas entre workers paralelos. Um fragmento truncado (processo
+interrompido) é lido até a última linha completa.
+"""
+import glob
+import gzip
+import json
+import os
+import zlib
+from multiprocessing import util
+
+from variables import REPLAY_ARCHIVE
+
+
+class ReplayArchive:
+    """
+    Resultados gravados do AVL por chave de caso.
+
+    - get(key): resultado do caso (KeyError se não foi gravado)
+    - record(key, results): grava o caso no fragmento deste processo
+    """
+
+    def __init__(self, path=REPLAY_ARCHIVE):
+        self.path = path
+        self._entries = None
+        self._writer = None
+
+    def _load(self):
+        entries = {}
+        for shard in sorted(glob.glob(os.path.join(self.path, '*.jsonl.gz'))):
+            try:
+                with gzip.open(shard, 'rt', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            break
+                        entries[entry['key']] = entry['results']
+            except (EOFError, OSError, zlib.error):
+                continue
+        return entries
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        try:
+            return self.entries[key]
+        except KeyError:
+            raise KeyError(f'Caso {key[:12]} não gravado em {self.path} (rode com REPLAY_RECORD = True e o AVL)') from None
+
+    def record(self, key, results):
+        if key in self.entries:
+            return
+        if self._writer is None:
+            os.makedirs(self.path, exist_ok=True)
+            shard = os.path.join(self.path, f'{os.getpid()}.jsonl.gz')
+            self._writer = gzip.open(shard, 'at', encoding='utf-8')
+        self._writer.write(json.dumps({'key': key, 'results': results}) + '\n')
+        self.entries[key] = results
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+_archive = None
+
+def get_archive():
+    '''
+    Arquivo de replay compartilhado pelo processo (fechado na saída do processo,
+    inclusive nos workers do pool, que não rodam o atexit)
+    '''
+    global _archive
+    if _archive is None:
+        _archive = ReplayArchive()
+        util.Finalize(_archive, _archive.close, exitpriority=20)
+    return _archive
@@ -0,0 +1,160 @@
+"""
+Pasta de rascunho dos arquivos temporários do AVL.
+
+A cada sessão o avlwrapper (e o AVLWorker do backend 'avl_pipe') cria, lê e apaga
+arquivos de geometria, casos e saídas em uma pasta temporária. Em uma campanha com
+vários workers são milhares de arquivos pequenos por minuto, então:
+
+- a raiz fica em memória (/dev/shm) quando disponível, ou em SCRATCH_ROOT
+- cada execução tem a sua pasta (minerva_avl_<pid>_...) e cada worker uma subpasta
+  própria, usada como tempfile.tempdir: workers nunca leem as saídas uns dos outros
+- as pastas são apagadas no fim da execução e de cada worker
+- pastas de execuções que terminaram sem limpar (processo dono morto, testado pelo sinal 0
+  no POSIX e pelo OpenProcess no Windows) são apagadas na próxima execução, e sem SCRATCH_MIN_FREE_MB livres na raiz a pasta temporária do
+  sistema é usada no lugar
+"""
+import glob
+import os
+import re
+import shutil
+import tempfile
+import time
+from multiprocessing import util
+
+from mdo_logging import get_logger
+from variables import SCRATCH_ROOT, SCRATCH_MIN_FREE_MB, SCRATCH_STALE_HOURS
+
+PREFIX = 'minerva_avl_'
+
+# Constantes da API do Windows usadas por _pid_alive_windows
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+ERROR_ACCESS_DENIED = 5
+STILL_ACTIVE = 259
+
+logger = get_logger('scratch')
+
+
+def default_root():
+    '''
+    Raiz das pastas de rascunho: SCRATCH_ROOT, /dev/shm ou a pasta temporária do sistema
+    '''
+    if SCRATCH_ROOT:
+        return SCRATCH_ROOT
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+
+def _pid_alive_windows(pid):
+    # OpenProcess falha com ERROR_INVALID_PARAMETER se o pid não existe; um processo que já
+    # terminou mas ainda tem handles abertos devolve um código de saída diferente de STILL_ACTIVE
+    import ctypes
+    from ctypes import wintypes
+
+    kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    kernel32.OpenProcess.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
+    kernel32.OpenProcess.restype = wintypes.HANDLE
+    kernel32.GetExitCodeProcess.argtypes = (wintypes.HANDLE, ctypes.POINTER(wintypes.DWORD))
+    kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+    handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+    if not handle:
+        return ctypes.get_last_error() == ERROR_ACCESS_DENIED
+    try:
+        code = wintypes.DWORD()
+        if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+            return None
+        return code.value == STILL_ACTIVE
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def _pid_alive(pid):
+    '''
+    True/False se o processo pid está vivo, ou None se não há como saber neste sistema
+    '''
+    if os.name == 'nt':
+        try:
+            return _pid_alive_windows(pid)
+        except (ImportError, OSError, AttributeError):
+            return None
+    if os.name != 'posix':
+        return None
+    # No POSIX o sinal 0 testa o processo sem afetá-lo
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def purge_stale(root, max_age_hours=SCRATCH_STALE_HOURS):
+    '''
+    Apaga as pastas de execuções que não limparam a própria pasta e devolve quantas
+    foram apagadas. Com o pid do dono no nome, só se o processo dono morreu (uma
+    campanha viva nunca perde a pasta, por mais longa que seja); sem pid legível, ou
+    em um sistema em que não há como testar o processo, quando a pasta está parada há
+    mais de max_age_hours
+    '''
+    removed = 0
+    for path in glob.glob(os.path.join(glob.escape(root), PREFIX + '*')):
+        match = re.match(re.escape(PREFIX) + r'(\d+)_', os.path.basename(path))
+        alive = _pid_alive(int(match.group(1))) if match else None
+        if alive is not None:
+            stale = not alive
+        else:
+            try:
+                stale = time.time() - os.path.getmtime(path) > max_age_hours*3600
+            except OSError:
+                continue
+        if stale:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+def create_run_dir(root=None):
+    '''
+    Cria a pasta de rascunho de uma execução, depois de apagar as pastas abandonadas
+    '''
+    root = root or default_root()
+    os.makedirs(root, exist_ok=True)
+    removed = purge_stale(root)
+    if removed:
+        logger.info('🧹 %d pasta(s) temporária(s) abandonada(s) apagada(s) em %s', removed, root)
+
+    free_mb = shutil.disk_usage(root).free/2**20
+    if free_mb < SCRATCH_MIN_FREE_MB and root != tempfile.gettempdir():
+        logger.warning('⚠️ Só %.0f MB livres em %s: usando %s', free_mb, root, tempfile.gettempdir())
+        return create_run_dir(tempfile.gettempdir())
+
+    return tempfile.mkdtemp(prefix=f'{PREFIX}{os.getpid()}_', dir=root)
+
+
+def use_worker_dir(run_dir):
+    '''
+    Cria a subpasta do processo atual, passa a usá-la como tempfile.tempdir e a apaga
+    quando o processo termina. Devolve o caminho da subpasta
+    '''
+    path = os.path.join(run_dir, f'worker_{os.getpid()}')
+    os.makedirs(path, exist_ok=True)
+    tempfile.tempdir = path
+    util.Finalize(None, shutil.rmtree, args=(path,), kwargs={'ignore_errors': True}, exitpriority=10)
+    return path
+
+
+def remove_run_dir(run_dir):
+    shutil.rmtree(run_dir, ignore_errors=True)
+
+
+##### TESTES #####
+
+if __name__ == '__main__':
+    root = default_root()
+    run_dir = create_run_dir(root)
+    worker = use_worker_dir(run_dir)
+    print('Raiz:', root)
+    print('Pasta do worker:', worker, '| mkdtemp ->', tempfile.mkdtemp())
+    remove_run_dir(run_dir)
+    print('Apagada:', not os.path.exists(run_dir))
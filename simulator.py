@@ -1,5 +1,9 @@
+import copy
 import json
+import hashlib
+import logging
 from avlwrapper import *
+from avlwrapper import default_config
 from prototype import *
 from performance import *
 from stability import *
@@ -7,6 +11,44 @@ import numpy as np
 import pandas as pd
 import time
 from competition_score import compute_competition_score
+from mdo_logging import get_logger
+from timing import StageTimer
+from avl_cache import get_cache, geometry_text, case_key
+from replay import get_archive
+from avl_worker import get_worker
+from vlm import VLMSolver
+from superposition import SuperpositionModel, UNIT_ALPHA, UNIT_ELEVATOR
+from polars import polar_store, reynolds
+from variables import AVL_BATCH, AVL_MAX_CASES, STALL_SEARCH, STALL_TOL, AVL_CACHE, AERO_BACKEND, POLAR_STALL, REPLAY_RECORD, AVL_OUTPUT_PROFILE, TRIM_ESTIMATE
+
+# Ângulos da varredura de estol: de 2 em 2 graus até 11 e de 1 em 1 grau de 12 a 30
+STALL_ALPHAS = list(range(5, 12, 2)) + list(range(12, 31, 1))
+
+# Blocos de saída do AVL lidos pelo Simulator em cada tipo de caso (perfil 'lean')
+OUTPUT_PROFILES = {
+    'alpha': ('Totals', 'StabilityDerivatives', 'StripForces'),   # alfa 0: coeficientes, Cma/Cnb e estol
+    'stall': ('Totals', 'StripForces'),                           # varredura de estol: CL e cl das faixas
+    'trim': ('Totals', 'StabilityDerivatives', 'StripForces'),    # trimado: alfa, Xnp e restrição de estol
+    'ge': ('Totals',),                                            # efeito solo: CL e CD
+    'superposition': ('Totals', 'StripForces'),                   # soluções unitárias: CL, Cm e cl das faixas
+}
+
+logger = get_logger('simulator')
+
+_session_configs = {}
+
+def session_config(outputs):
+    '''
+    Configuração do avlwrapper que grava só os blocos de saída pedidos (seção [output]
+    do config.cfg), montada uma vez por conjunto de blocos
+    '''
+    key = frozenset(outputs)
+    if key not in _session_configs:
+        default_config.settings     # Lê o config.cfg antes da cópia
+        config = copy.deepcopy(default_config)
+        config['output'] = {name.lower(): 'yes' for name in key}
+        _session_configs[key] = config
+    return _session_configs[key]
 
 
 class Simulator():
@@ -19,8 +61,23 @@ class Simulator():
     - Cálculo de MTOW, carga paga e pontuação de voo da competição
     """
 
-    def __init__(self, prototype, p=905.5, t=25, v=10, mach=0.0):
+    def __init__(self, prototype, p=905.5, t=25, v=10, mach=0.0, batch=AVL_BATCH, stall_search=STALL_SEARCH, stall_tol=STALL_TOL, cache=AVL_CACHE, backend=AERO_BACKEND, polar_stall=POLAR_STALL, timer=None, record_replay=REPLAY_RECORD, output_profile=AVL_OUTPUT_PROFILE, trim_estimate=TRIM_ESTIMATE):
         self.prototype = prototype
+        self.timer = timer if timer is not None else StageTimer()   # Tempo de cada etapa do scorer
+        self.polar_stall = polar_stall  # Se True, o cl máximo de cada faixa vem das polares no Reynolds local
+        self.strip_clmaxes = {}
+        self.backend = backend      # 'avl' (executável), 'vlm' (solver em NumPy no próprio processo) ou 'replay' (resultados gravados)
+        self.record_replay = record_replay  # Se True, grava os resultados do AVL no arquivo de replay
+        self.output_profile = output_profile    # 'lean' (só as saídas usadas em cada caso) ou 'full' (todas)
+        self.cache = get_cache() if cache else None     # Cache persistente de resultados do AVL (None ignora o cache)
+        self.geometry_hashes = {}
+        self.vlm_solvers = {}       # Solver VLM (matriz fatorada) de cada geometria, com e sem efeito solo
+        self.batch = batch          # Se True, todos os casos de voo livre rodam em uma única sessão do AVL
+        self.stall_search = stall_search    # 'sweep', 'secant' ou 'superposition'
+        self.superposition = None   # SuperpositionModel do indivíduo (busca 'superposition')
+        self.trim_estimate = trim_estimate  # Se True, sem o caso trimado na sessão única a trimagem sai dos casos de alfa já simulados
+        self.trim_estimated = False
+        self.stall_tol = stall_tol
         self.p = p
         self.t = t
         self.v = v
@@ -31,7 +88,10 @@ class Simulator():
         self.cd = {}
         self.cm = {}
         self.cma = {}
+        self.cla = {}
         self.cnb = {}
+        self.strip_cls = {}         # cl das faixas de cada superfície em cada alfa sem estol (voo trimado pelo profundor)
+        self.margins = {}           # Margem de estol (max cl - clmax das faixas) em cada alfa simulado
         self.cl_ge = {}
         self.cd_ge = {}
         self.a_trim = -20
@@ -40,146 +100,517 @@ class Simulator():
         self.cp = 0
         self.stall_constraint = None
         self.competition_score = 0
+        self.n_avl_calls = 0        # Número de sessões (processos) do AVL abertas por este indivíduo
+        self.n_avl_cases = 0        # Número de casos resolvidos pelo AVL nessas sessões
+        self.stall_avl_calls = 0    # Sessões do AVL gastas na busca do ângulo de estol
 
     ###########################################################################
     # MÉTODOS DE CHECAGEM DE ESTOL
     ###########################################################################
-    def check_stall(self, results):
-        limits = {
-            'Wing': [self.prototype.af_root_data['cl_max'] if hasattr(self.prototype, 'af_root_data') else 1.2, self.prototype.w_bt],
-            'Eh': [self.prototype.af_eh_data['cl_max'] if hasattr(self.prototype, 'af_eh_data') else 1.2, self.prototype.eh_b],
-            'Canard': [self.prototype.af_canard_data['cl_max'] if hasattr(self.prototype, 'af_canard_data') else 1.2, self.prototype.cn_b]
-        }
-
-        for surf_name, (cl_limit, max_span) in limits.items():
-            for surf_name in results['a']['StripForces']:
-
-                if surf_name == 'Wing':
-                    stall= False
-                    b_stall=0
-                    for panel_n in range(int(len(results['a']['StripForces']['Wing']['Yle'])/2)):
-                        if results['a']['StripForces']['Wing']['Yle'][panel_n] <= self.prototype.w_baf/2:
-                            clmax= self.prototype.w_root_clmax
-                            if results['a']['StripForces']['Wing']['cl'][panel_n] >= clmax:
-                                stall= True
-                                b_stall= results['a']['StripForces']['Wing']['Yle'][panel_n] / (self.prototype.w_bt/2) #b_stall é o ponto de estol em % da envergadur
-                                return True, surf_name, b_stall
-
-                            else:
-                                stall= False
-
-                        else:
-                            af_len= (self.prototype.w_bt - self.prototype.w_baf)/2
-                            af_len_perc= (results['a']['StripForces']['Wing']['Yle'][panel_n] - (self.prototype.w_baf/2))/af_len
-                            clmax= (af_len_perc)*self.prototype.w_tip_clmax + (1-af_len_perc)*self.prototype.w_root_clmax           # Interpolando os clmáx na região afilada
-                            if results['a']['StripForces']['Wing']['cl'][panel_n] >= clmax:
-                                stall= True
-                                b_stall= results['a']['StripForces']['Wing']['Yle'][panel_n] / (self.prototype.w_bt/2) #b_stall é o ponto de estol em % da envergadura
-                                
-                                return True, surf_name, b_stall
-
-                            else:
-                                stall= False
-
-                    #return True, surf_name, b_stall
-                
-                else:
-                    cls = results['a']['StripForces'][surf_name]['cl']
-                    max_cl_3d = max(cls)
-                    if max_cl_3d >= cl_limit:
-                        # Encontra a posição y do estol para o print do run_a
-                        idx = np.argmax(cls)
-                        y_stall = results['a']['StripForces'][surf_name]['Yle'][idx]
-                        perc_stall = (y_stall / (max_span/2)) * 100
-                        return True, surf_name, perc_stall 
-
-        return False, 0.0, 0.0
+    def stall_evaluation(self, results, case_name='a'):
+        """
+        Avalia o estol de um caso em uma passada sobre os arrays de StripForces.
+
+        Devolve (estol, superfície, posição, margens), com margens = {superfície: clmax - cl}
+        em todas as faixas (negativa onde há estol). A detecção segue check_stall: superfícies
+        na ordem dos resultados, só a primeira metade das faixas da asa (a metade direita),
+        primeira faixa estolada da asa com a posição como fração da semienvergadura, e nas
+        demais superfícies a faixa de maior cl acima do limite (1.2 sem polares), com a
+        posição em % da semienvergadura da asa.
+        """
+        semi_span = self.prototype.w_bt/2
+        margins = {}
+        stall = (False, 0.0, 0.0)
+
+        for surf_name, forces in results[case_name]['StripForces'].items():
+            y = np.asarray(forces['Yle'], dtype=float)
+            cl = np.asarray(forces['cl'], dtype=float)
+
+            margins[surf_name] = self.strip_clmax(surf_name, forces) - cl
+            if stall[0]:
+                continue
+
+            if surf_name == 'Wing':
+                stalled = np.flatnonzero(margins[surf_name][:len(y)//2] <= 0)
+                if len(stalled):
+                    stall = (True, surf_name, y[stalled[0]]/semi_span)
+            else:
+                idx = int(np.argmin(margins[surf_name]))
+                if margins[surf_name][idx] <= 0:
+                    stall = (True, surf_name, y[idx]/semi_span*100)
+
+        return stall + (margins,)
+
+    def check_stall(self, results, case_name='a'):
+        # (estol, superfície, posição) do caso
+        return self.stall_evaluation(results, case_name)[:3]
+
+    def stall_margin(self, results, case_name='a'):
+        """
+        Maior diferença cl - clmax entre as faixas verificadas por check_stall (metade
+        direita da asa e todas as faixas das demais superfícies). Positiva (ou zero) quando há estol.
+        """
+        return self.overshoot(self.stall_evaluation(results, case_name)[3])
+
+    @staticmethod
+    def overshoot(margins):
+        # Maior cl - clmax nas faixas verificadas a partir das margens de stall_evaluation
+        return float(max(-np.min(m[:len(m)//2] if surf_name == 'Wing' else m) for surf_name, m in margins.items()))
+
+    def strip_clmax(self, surf_name, forces):
+        """
+        cl máximo de cada faixa da superfície, calculado uma vez por indivíduo.
+
+        Com polar_stall, vem das polares do perfil no Reynolds local (corda da faixa, self.v
+        e self.rho). Senão, ou quando falta a polar de algum perfil da superfície, vem do
+        cl_max do resumo: raiz/ponta na asa e 1.2 nas demais superfícies, como no check_stall
+        original. Na asa a raiz vale até w_baf/2 e depois há interpolação linear até a ponta.
+        """
+        key = (surf_name, len(forces['Yle']))
+        if key in self.strip_clmaxes:
+            return self.strip_clmaxes[key]
+
+        prototype = self.prototype
+        y = np.abs(np.asarray(forces['Yle'], dtype=float))
+        af_len_perc = np.maximum(y - prototype.w_baf/2, 0)/((prototype.w_bt - prototype.w_baf)/2)
+
+        root_polar = tip_polar = None
+        if self.polar_stall:
+            # O EV usa o perfil do EH na geometria do Prototype
+            airfoils = {
+                'Wing': (prototype.root_af, prototype.tip_af),
+                'Horizontal_Stabilizer': (prototype.eh_af, prototype.eh_af),
+                'Vertical_Stabilizer': (prototype.eh_af, prototype.eh_af),
+                'Canard': (prototype.cn_af, prototype.cn_af),
+            }.get(surf_name, (None, None))
+            root_polar, tip_polar = (polar_store.get(af) for af in airfoils)
+
+        if root_polar is not None and tip_polar is not None:
+            re = reynolds(self.rho, self.v, forces['Chord'], self.t)
+            clmax = root_polar.clmax(re)
+            if surf_name == 'Wing':
+                af_len_perc = np.minimum(af_len_perc, 1)
+                clmax = af_len_perc*tip_polar.clmax(re) + (1 - af_len_perc)*clmax
+        elif surf_name == 'Wing':
+            clmax = af_len_perc*prototype.w_tip_clmax + (1 - af_len_perc)*prototype.w_root_clmax
+        else:
+            clmax = np.full(len(y), 1.2)
+
+        self.strip_clmaxes[key] = clmax
+        return clmax
 
     ###########################################################################
     # MÉTODOS DE SIMULAÇÃO
     ###########################################################################
-    def run_a(self, a=0):
-        a_case = Case(
-            name='a',
-            alpha=a,
-            density=self.rho,
-            Mach=self.mach,
-            velocity=self.v,
-            X_cg=self.prototype.x_cg,
-            Z_cg=self.prototype.z_cg,
-            elevator=Parameter(name='elevator', constraint='Cm', value=0.0)
-        )
-        session = Session(geometry=self.prototype.geometry, cases=[a_case])
-        a_results = session.get_results()
+    def make_case(self, spec):
+        """
+        Converte a descrição de um caso (dicionário) em um Case do avlwrapper.
+
+        - name: nome do caso nos resultados
+        - alpha: ângulo de ataque em graus ou 'Cm' (alfa ajustado para Cm=0)
+        - elevator: None (sem deflexão), 'Cm' (profundor ajustado para Cm=0) ou a deflexão em graus
+        - flight: se True, inclui densidade, Mach e velocidade da simulação
+        - profile: tipo do caso em OUTPUT_PROFILES, que define as saídas pedidas ao AVL
+        """
+        kwargs = {'X_cg': self.prototype.x_cg, 'Z_cg': self.prototype.z_cg}
+
+        if isinstance(spec['alpha'], str):
+            kwargs['alpha'] = Parameter(name='alpha', constraint=spec['alpha'], value=0.0)
+        else:
+            kwargs['alpha'] = spec['alpha']
+
+        if isinstance(spec.get('elevator'), str):
+            kwargs['elevator'] = Parameter(name='elevator', constraint=spec['elevator'], value=0.0)
+        elif spec.get('elevator') is not None:
+            kwargs['elevator'] = Parameter(name='elevator', constraint='elevator', value=spec['elevator'])
+
+        if spec.get('flight', True):
+            kwargs.update(density=self.rho, Mach=self.mach, velocity=self.v)
+
+        return Case(name=spec['name'], **kwargs)
+
+    def alpha_spec(self, a, name='a'):
+        # Caso de voo livre em alfa fixo com o profundor trimando a aeronave
+        return {'name': name, 'alpha': a, 'elevator': 'Cm', 'flight': True, 'profile': 'alpha' if a == 0 else 'stall'}
+
+    def trim_spec(self):
+        # Caso trimado: alfa ajustado para Cm=0 sem deflexão do profundor
+        return {'name': 'trimmed', 'alpha': 'Cm', 'elevator': None, 'flight': False, 'profile': 'trim'}
+
+    def required_outputs(self, spec):
+        # Blocos de saída do caso (None = todos os que o backend produz)
+        if self.output_profile == 'full':
+            return None
+        return OUTPUT_PROFILES.get(spec.get('profile'))
+
+    def prune_outputs(self, results, specs):
+        # Descarta dos resultados os blocos que o caso não usa (menos dados no cache e no replay)
+        for spec in specs:
+            required = self.required_outputs(spec)
+            if required is not None and spec['name'] in results:
+                results[spec['name']] = {block: value for block, value in results[spec['name']].items()
+                                         if block in required}
+        return results
+
+    def run_cases(self, specs, ground_effect=False):
+        """
+        Roda uma lista de casos sobre a geometria do protótipo e devolve o dicionário
+        de resultados indexado pelo nome de cada caso.
+
+        Casos já presentes no cache (com todos os blocos de saída do seu perfil) são lidos
+        dele; no perfil 'full' o cache não é lido. Os demais vão para a mesma sessão
+        do AVL (um processo, uma escrita de geometria, uma leitura de saída), dividindo
+        em mais sessões apenas quando a lista passa de AVL_MAX_CASES (com 'avl_pipe', o
+        mesmo processo do AVL atende todas as sessões). Com o backend 'vlm' todos os casos
+        pendentes são resolvidos de uma vez no próprio processo.
+        """
+        geometry = self.prototype.get_geometry(ground_effect=ground_effect)
+        results = {}
+        pending = specs
+        keys = {}
+
+        if self.cache is not None and self.output_profile != 'full':
+            geometry_hash = self.geometry_hash(geometry, ground_effect)
+            if geometry_hash is not None:
+                pending = []
+                for spec in specs:
+                    keys[spec['name']] = case_key(geometry_hash, self.case_params(spec))
+                    cached = self.cache.get(keys[spec['name']])
+                    if cached is None or not all(block in cached for block in self.required_outputs(spec) or ()):
+                        pending.append(spec)
+                    else:
+                        results[spec['name']] = cached
+
+        max_cases = AVL_MAX_CASES if self.backend in ('avl', 'avl_pipe') else max(len(pending), 1)
+        for i in range(0, len(pending), max_cases):
+            chunk = pending[i:i + max_cases]
+            session_results = self.solve_cases(geometry, chunk, ground_effect)
+            self.n_avl_calls += 1
+            self.n_avl_cases += len(chunk)
+
+            for spec in chunk:
+                if spec['name'] in keys and spec['name'] in session_results:
+                    self.cache.put(keys[spec['name']], session_results[spec['name']])
+            results.update(session_results)
+
+        return results
+
+    def solve_cases(self, geometry, specs, ground_effect=False):
+        # Uma sessão do AVL, uma resolução do VLM ou a leitura dos resultados gravados para a lista de casos
+        if self.backend == 'vlm':
+            cases = [{'name': spec['name'], 'alpha': spec['alpha'], 'elevator': spec.get('elevator')} for spec in specs]
+            return self.vlm_solver(geometry, ground_effect).run_cases(cases)
+        if self.backend == 'replay':
+            archive = get_archive()
+            return {spec['name']: archive.get(self.result_key(geometry, spec, ground_effect)) for spec in specs}
+        if self.backend not in ('avl', 'avl_pipe'):
+            raise ValueError(f"Backend aerodinâmico '{self.backend}' desconhecido.")
+
+        cases = [self.make_case(spec) for spec in specs]
+        outputs = [self.required_outputs(spec) for spec in specs]
+        if self.backend == 'avl_pipe':
+            results = get_worker().run(geometry, cases, outputs)
+        else:
+            # Uma sessão grava as mesmas saídas para todos os casos: a união dos perfis
+            kwargs = {}
+            if None not in outputs:
+                kwargs['config'] = session_config(set().union(*outputs))
+            session = Session(geometry=geometry, cases=cases, **kwargs)
+            results = self.prune_outputs(session.get_results(), specs)
+
+        if self.record_replay:
+            archive = get_archive()
+            for spec in specs:
+                if spec['name'] in results:
+                    archive.record(self.result_key(geometry, spec, ground_effect), results[spec['name']])
+        return results
+
+    def result_key(self, geometry, spec, ground_effect):
+        # Chave do caso no cache e no arquivo de replay
+        return case_key(self.geometry_hash(geometry, ground_effect), self.case_params(spec))
+
+    def vlm_solver(self, geometry, ground_effect):
+        # A geometria não muda entre os casos do indivíduo: a matriz é montada e fatorada uma vez
+        if ground_effect not in self.vlm_solvers:
+            self.vlm_solvers[ground_effect] = VLMSolver(geometry)
+        return self.vlm_solvers[ground_effect]
+
+    def case_params(self, spec):
+        # Tudo o que define o caso no AVL, exceto o nome
+        params = {key: value for key, value in spec.items() if key not in ('name', 'profile')}
+        params.update(x_cg=self.prototype.x_cg, z_cg=self.prototype.z_cg)
+        # O AVL persistente e o replay devolvem resultados do AVL: mesma chave dos casos do AVL
+        if self.backend not in ('avl', 'avl_pipe', 'replay'):
+            params['backend'] = self.backend
+        if spec.get('flight', True):
+            params.update(rho=self.rho, mach=self.mach, v=self.v)
+        return params
+
+    def geometry_hash(self, geometry, ground_effect):
+        # Hash do texto da geometria do AVL, calculado uma vez por geometria do indivíduo
+        if ground_effect not in self.geometry_hashes:
+            text = geometry_text(geometry)
+            self.geometry_hashes[ground_effect] = None if text is None else hashlib.sha256(text.encode('utf-8')).hexdigest()
+        return self.geometry_hashes[ground_effect]
+
+    def run_batch(self):
+        """
+        Roda em uma única sessão todos os casos de voo livre do indivíduo: alfa 0,
+        todos os ângulos da varredura de estol e o caso trimado.
+
+        Os resultados são consumidos por run_a, run_stall e run_trim, que fazem a
+        checagem de estol na mesma ordem da simulação caso a caso.
+        """
+        logger.info('⌛Simulando todos os casos de voo livre em uma única sessão')
+        # Na busca 'secant' os ângulos dependem das margens anteriores e ficam fora da sessão única
+        alphas = [0] + STALL_ALPHAS if self.stall_search == 'sweep' else [0]
+        specs = [self.alpha_spec(a, self.alpha_name(a)) for a in alphas]
+        # Na superposição o estol e a trimagem saem das soluções unitárias, sem o caso trimado.
+        # Nos demais modos o caso trimado vai na sessão única, sem custo de outro processo
+        if self.stall_search == 'superposition':
+            specs += self.superposition_specs()
+        else:
+            specs.append(self.trim_spec())
+        return self.run_cases(specs)
+
+    @staticmethod
+    def alpha_name(a):
+        # Nome do caso de alfa fixo dentro de uma sessão com vários casos
+        return f'a{a}'
+
+    def run_a(self, a=0, results=None):
+        # Sem resultados prontos roda um caso isolado, senão lê o caso de alfa 'a' da sessão única
+        if results is None:
+            case_name = 'a'
+            a_results = self.run_cases([self.alpha_spec(a, case_name)])
+        else:
+            case_name = self.alpha_name(a)
+            a_results = results
         self.last_results = a_results
 
+        stall, surf_stall, b_stall = False, 0.0, 0.0
         try:
-            stall, surf_stall, b_stall = self.check_stall(a_results) # <--- Recebe o b_stall
+            stall, surf_stall, b_stall, margins = self.stall_evaluation(a_results, case_name) # <--- Recebe o b_stall
+            self.margins[a] = self.overshoot(margins)
             if not stall:
-                self.deflex[a] = a_results['a']['Totals']['elevator']
-                self.cl[a] = a_results['a']['Totals']['CLtot']
-                print(f"    ✈️ CL Voo Livre (alpha={a}): {self.cl[a]:.4f}")
-                self.cd[a] = a_results['a']['Totals']['CDtot']
-                self.cm[a] = a_results['a']['Totals']['Cmtot']
-                self.cma[a] = a_results['a']['StabilityDerivatives']['Cma']
-                self.cnb[a] = a_results['a']['StabilityDerivatives']['Cnb']
+                self.deflex[a] = a_results[case_name]['Totals']['elevator']
+                self.cl[a] = a_results[case_name]['Totals']['CLtot']
+                logger.info('    ✈️ CL Voo Livre (alpha=%s): %.4f', a, self.cl[a])
+                self.cd[a] = a_results[case_name]['Totals']['CDtot']
+                self.cm[a] = a_results[case_name]['Totals']['Cmtot']
+                # Os casos da varredura de estol não pedem as derivadas ao AVL (perfil 'stall')
+                derivatives = a_results[case_name].get('StabilityDerivatives')
+                if derivatives is not None:
+                    self.cma[a] = derivatives['Cma']
+                    self.cla[a] = derivatives['CLa']
+                    self.cnb[a] = derivatives['Cnb']
+                self.strip_forces = a_results[case_name]['StripForces']
+                self.strip_cls[a] = {surf: np.asarray(forces['cl'], dtype=float)
+                                     for surf, forces in self.strip_forces.items()}
             else:
                 raise RuntimeError(f"\nEstol detectado em alfa={a}")
             return a_results
         except Exception as e:
-            stall, surf_stall, b_stall = self.check_stall(a_results)
-            print(f'    ⚠️Estol em {surf_stall} na posição {b_stall:.1f}% da envergadura')
+            logger.info('    ⚠️Estol em %s na posição %.1f%% da envergadura', surf_stall, b_stall)
             raise e
 
     def run_ge(self):
-        print('⌛Calculando coeficientes em efeito solo')
-        ge_geometry = self.prototype.get_geometry(ground_effect=True)
-        a_case = Case(
-            name='a',
-            alpha=0,
-            density=self.rho,
-            Mach=self.mach,
-            velocity=self.v,
-            X_cg=self.prototype.x_cg,
-            Z_cg=self.prototype.z_cg
-        )
-        session = Session(geometry=ge_geometry, cases=[a_case])
-        a_results = session.get_results()
+        logger.info('⌛Calculando coeficientes em efeito solo')
+        ge_spec = {'name': 'a', 'alpha': 0, 'elevator': None, 'flight': True, 'profile': 'ge'}
+        a_results = self.run_cases([ge_spec], ground_effect=True)
         
         self.cl_ge[0] = a_results['a']['Totals']['CLtot']
-        print(f"    🛫 CL Efeito Solo: {self.cl_ge[0]:.4f}")
+        logger.info('    🛫 CL Efeito Solo: %.4f', self.cl_ge[0])
         self.cd_ge[0] = a_results['a']['Totals']['CDtot']
         return a_results
 
-    def run_stall(self):
-        for a in np.arange(5, 12, 2):
+    def run_stall(self, results=None):
+        if self.stall_search == 'secant':
+            return self.run_stall_secant()
+        if self.stall_search == 'superposition':
+            return self.run_stall_superposition(results)
+
+        calls = self.n_avl_calls
+        for a in STALL_ALPHAS[:4]:
             try:
-                self.run_a(a)
+                self.run_a(a, results)
             except:
                 self.a_stall = a - 2
                 self.clmax = self.cl[a - 2]
-                print(f'    ⚠️ Ângulo de estol entre {a-2} e {a} graus')
+                logger.info('    ⚠️ Ângulo de estol entre %s e %s graus', a - 2, a)
+                self.stall_avl_calls = self.n_avl_calls - calls
                 return False
-        for a in np.arange(12, 31, 1):
+        for a in STALL_ALPHAS[4:]:
             try:
-                self.run_a(a)
+                self.run_a(a, results)
             except:
                 self.a_stall = a - 1
                 self.clmax = self.cl[a - 1]
-                print(f'    ⚠️ Ângulo de estol entre {a-1} e {a} graus')
+                logger.info('    ⚠️ Ângulo de estol entre %s e %s graus', a - 1, a)
                 break
+        self.stall_avl_calls = self.n_avl_calls - calls
         #self.prototype.ALPHA_STALL_MIN_DEGREE = self.a_stall
         #self.stall_constraint = self.prototype.ALPHA_STALL_MIN_DEGREE
 
-    def run_trim(self):
-        trimmed = Case(
-            name='trimmed',
-            alpha=Parameter(name='alpha', constraint='Cm', value=0.0),
-            X_cg=self.prototype.x_cg,
-            Z_cg=self.prototype.z_cg
-        )
-        session = Session(geometry=self.prototype.geometry, cases=[trimmed])
-        trim_results = session.get_results()
+    def probe_alpha(self, a):
+        # Simula um alfa e devolve a margem de estol, com ou sem estol
+        try:
+            self.run_a(a)
+        except Exception:
+            if a not in self.margins:
+                raise
+        return self.margins[a]
+
+    def run_stall_secant(self, max_iter=20):
+        """
+        Encontra o primeiro alfa de estol por falsa posição (método de Illinois)
+        sobre a margem de estol, partindo do intervalo [0, 30] graus.
+
+        Como a margem é quase linear em alfa no VLM, o intervalo fecha em poucas
+        chamadas do AVL. O ângulo de estol é o maior alfa sem estol encontrado,
+        com erro menor que stall_tol, e stall_avl_calls guarda as sessões usadas.
+        """
+        calls = self.n_avl_calls
+        a_lo, m_lo = 0, self.margins[0]
+        a_hi = STALL_ALPHAS[-1]
+        m_hi = self.probe_alpha(a_hi)
+
+        if m_hi < 0:
+            self.stall_avl_calls = self.n_avl_calls - calls
+            logger.info('    ⚠️ Estol não encontrado até %s graus', a_hi)
+            return False
+
+        side = 0
+        for _ in range(max_iter):
+            if a_hi - a_lo <= self.stall_tol:
+                break
+            a = a_lo - m_lo*(a_hi - a_lo)/(m_hi - m_lo)
+            # Mantém o novo ponto a pelo menos meia tolerância dos extremos para o intervalo fechar
+            a = round(min(max(a, a_lo + self.stall_tol/2), a_hi - self.stall_tol/2), 3)
+            m = self.probe_alpha(a)
+            if m >= 0:
+                a_hi, m_hi = a, m
+                if side == 1:
+                    m_lo /= 2
+                side = 1
+            else:
+                a_lo, m_lo = a, m
+                if side == -1:
+                    m_hi /= 2
+                side = -1
+
+        self.a_stall = a_lo
+        self.clmax = self.cl[a_lo]
+        self.stall_avl_calls = self.n_avl_calls - calls
+        logger.info('    ⚠️ Ângulo de estol entre %.2f e %.2f graus (%d chamadas do AVL)', a_lo, a_hi, self.stall_avl_calls)
+
+    def superposition_specs(self):
+        # Soluções base, unitária em alfa e unitária no profundor, em voo livre
+        return [{'name': name, 'alpha': alpha, 'elevator': elevator, 'flight': True, 'profile': 'superposition'}
+                for name, alpha, elevator in [('sp_base', 0.0, 0.0), ('sp_alpha', UNIT_ALPHA, 0.0),
+                                              ('sp_elevator', 0.0, UNIT_ELEVATOR)]]
+
+    def superposition_model(self, results=None):
+        # Modelo do indivíduo, montado uma vez a partir da sessão única ou de uma sessão própria
+        if self.superposition is None:
+            specs = self.superposition_specs()
+            if results is None or any(spec['name'] not in results for spec in specs):
+                results = self.run_cases(specs)
+            self.superposition = SuperpositionModel(results['sp_base'], results['sp_alpha'], results['sp_elevator'])
+        return self.superposition
+
+    def superposition_clmaxes(self, model):
+        # cl máximo das faixas de cada superfície, com a geometria das faixas da solução base
+        return {surf: self.strip_clmax(surf, forces) for surf, forces in model.strip_forces.items()}
+
+    def run_stall_superposition(self, results=None):
+        """
+        Ângulo de estol e CL máximo pelo modelo de superposição: o primeiro alfa do voo
+        trimado em que alguma faixa verificada pelo check_stall atinge o cl máximo, em
+        forma fechada sobre as três soluções unitárias (sem varredura).
+        """
+        calls = self.n_avl_calls
+        model = self.superposition_model(results)
+        a_stall, surf_stall = model.stall_alpha(self.superposition_clmaxes(model), a_max=STALL_ALPHAS[-1])
+        self.stall_avl_calls = self.n_avl_calls - calls
+
+        if a_stall is None:
+            self.a_stall = STALL_ALPHAS[-1]
+            logger.info('    ⚠️ Estol não encontrado até %s graus', self.a_stall)
+        else:
+            self.a_stall = a_stall
+            logger.info('    ⚠️ Estol em %s a %.2f graus (superposição)', surf_stall, a_stall)
+        self.clmax = float(model.trimmed(self.a_stall)[0])
+        self.cl[self.a_stall] = self.clmax
+
+    def run_trim_superposition(self, results=None):
+        # Trimagem sem profundor, ponto neutro e restrição de estol trimado pelo modelo de superposição
+        model = self.superposition_model(results)
+        self.a_trim = float(model.trim_alpha())
+        self.xnp = float(model.neutral_point(self.prototype.x_cg, self.prototype.mac))
+        self.me = me(self.xnp, self.prototype.x_cg, self.prototype.mac)
+
+        clmaxes = self.superposition_clmaxes(model)
+        strip_cl = model.coefficients(self.a_trim, 0.0)[1]
+        self.stall_constraint = float(min(np.min(clmaxes[surf] - cl) for surf, cl in strip_cl.items()))
+
+    def estimate_trim(self):
+        """
+        Trimagem sem simulação, a partir dos casos de alfa já simulados (alfa 0 e
+        varredura de estol), todos trimados pelo profundor.
+
+        Como Cm(alfa, profundor) = 0 em cada caso, o alfa de trimagem sem profundor é o
+        zero da deflexão do profundor em função de alfa, interpolado linearmente entre os
+        dois alfas amostrados que o cercam. Nesse alfa o cl das faixas também é
+        interpolado (para a restrição de estol trimado) e Xnp = x_cg - mac Cma/CLa com as
+        derivadas do caso de alfa 0.
+
+        Devolve False, sem alterar nada, quando o zero fica fora da faixa amostrada ou a
+        deflexão troca de sinal mais de uma vez; run_trim então roda o caso trimado.
+        """
+        alphas = sorted(a for a in self.deflex if a in self.strip_cls)
+        if len(alphas) < 2 or 0 not in self.cma or not self.cla.get(0):
+            return False
+
+        deflex = np.array([self.deflex[a] for a in alphas], dtype=float)
+        zeros = np.flatnonzero(deflex == 0)
+        changes = np.flatnonzero(deflex[:-1]*deflex[1:] < 0)
+        if len(zeros) + len(changes) != 1:
+            return False
+
+        if len(zeros):
+            lo = hi = zeros[0]
+            t = 0.0
+        else:
+            lo, hi = changes[0], changes[0] + 1
+            t = deflex[lo]/(deflex[lo] - deflex[hi])
+        a_lo, a_hi = alphas[lo], alphas[hi]
+
+        self.a_trim = float(a_lo + t*(a_hi - a_lo))
+        self.xnp = self.prototype.x_cg - self.prototype.mac*self.cma[0]/self.cla[0]
+        self.me = me(self.xnp, self.prototype.x_cg, self.prototype.mac)
+
+        margins = []
+        for surf, forces in self.strip_forces.items():
+            cl = (1 - t)*self.strip_cls[a_lo][surf] + t*self.strip_cls[a_hi][surf]
+            margins.append(np.min(self.strip_clmax(surf, forces) - cl))
+        self.stall_constraint = float(min(margins))
+        self.trim_estimated = True
+        logger.info('    ✂️ Trimagem estimada dos casos de alfa entre %s e %s graus: %.2f graus', a_lo, a_hi, self.a_trim)
+        return True
+
+    def run_trim(self, results=None):
+        if self.stall_search == 'superposition':
+            return self.run_trim_superposition(results)
+        if results is None or 'trimmed' not in results:
+            # Sem o caso trimado da sessão única, a estimativa evita uma sessão só para ele
+            results = None
+            if self.trim_estimate and self.estimate_trim():
+                return
+        if results is None:
+            trim_results = self.run_cases([self.trim_spec()])
+        else:
+            trim_results = results
         
         # --- ADICIONE ESTA LINHA ---
         self.last_results = trim_results 
@@ -189,6 +620,10 @@ class Simulator():
         self.xnp = trim_results['trimmed']['StabilityDerivatives']['Xnp']
         self.me = me(self.xnp, self.prototype.x_cg, self.prototype.mac)
 
+        # Menor margem clmax - cl entre todas as faixas no voo trimado (negativa = estol trimado)
+        margins = self.stall_evaluation(trim_results, 'trimmed')[3]
+        self.stall_constraint = float(min(np.min(m) for m in margins.values()))
+
     def get_max_cl_surface(self, surface_name):
         """
         Extrai o Cl máximo de uma superfície específica.
@@ -210,90 +645,111 @@ class Simulator():
         return 0.0
     
     def print_coeffs(self):
+        # Relatório completo do indivíduo, só montado com o nível DEBUG ligado
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+
         aero_coeffs = pd.DataFrame(
             [self.cl, self.cd, self.cm, self.deflex],
             index=['CL', 'CD', 'CM', 'Prof']
         ).T
 
-        print('--------------OUTPUTS-----------------\n')
-        print('--------------Aerodinâmica-----------------')
-        print('CL em corrida=', self.cl_ge.get(0, 'N/A'))
-        print('CD em corrida=', self.cd_ge.get(0, 'N/A'))
-
-        print('Transição=', round(self.prototype.w_baf / self.prototype.w_bt, 3) * 100, '% da envergadura')
-        print('Altura do EH com relação à asa=', round(self.prototype.eh_z_const, 3), 'm')
-        print('Área alar=', round(self.prototype.s_ref, 3), 'm^2')
-        print('AR=', round(self.prototype.ar, 2))
-        print('AR do EH=', round(self.prototype.eh_ar, 2))
-        print('M.A.C.=', round(self.prototype.mac, 3), 'm')
-
-        print('\n--------------Controle e Estabilidade-----------------')
-        print('VHT=', round(self.prototype.vht, 4))
-        print('VVT=', round(self.prototype.vvt, 4))
-        print('X_CG=', round(self.prototype.x_cg_p, 3), '% da corda da asa')
-        print('Z_CG=', round(self.prototype.z_cg, 3), 'm do chão')
-        print('CG=', round(self.prototype.low_cg, 3), 'm abaixo da asa')
-        print('Ângulo de trimagem=', round(self.a_trim, 2), 'graus')
-        print('Margem Estática=', round(self.me, 3))
+        logger.debug('--------------OUTPUTS-----------------\n')
+        logger.debug('--------------Aerodinâmica-----------------')
+        logger.debug('Coeficientes aerodinâmicos:\n%s', aero_coeffs)
+        logger.debug('CL em corrida= %s', self.cl_ge.get(0, 'N/A'))
+        logger.debug('CD em corrida= %s', self.cd_ge.get(0, 'N/A'))
+
+        logger.debug('Transição= %s %% da envergadura', round(self.prototype.w_baf / self.prototype.w_bt, 3) * 100)
+        logger.debug('Altura do EH com relação à asa= %s m', round(self.prototype.eh_z_const, 3))
+        logger.debug('Área alar= %s m^2', round(self.prototype.s_ref, 3))
+        logger.debug('AR= %s', round(self.prototype.ar, 2))
+        logger.debug('AR do EH= %s', round(self.prototype.eh_ar, 2))
+        logger.debug('M.A.C.= %s m', round(self.prototype.mac, 3))
+
+        logger.debug('\n--------------Controle e Estabilidade-----------------')
+        logger.debug('VHT= %s', round(self.prototype.vht, 4))
+        logger.debug('VVT= %s', round(self.prototype.vvt, 4))
+        logger.debug('X_CG= %s %% da corda da asa', round(self.prototype.x_cg_p, 3))
+        logger.debug('Z_CG= %s m do chão', round(self.prototype.z_cg, 3))
+        logger.debug('CG= %s m abaixo da asa', round(self.prototype.low_cg, 3))
+        logger.debug('Ângulo de trimagem= %s graus', round(self.a_trim, 2))
+        logger.debug('Margem Estática= %s', round(self.me, 3))
 
     ###########################################################################
     # MÉTODO PRINCIPAL DE PONTUAÇÃO
     ###########################################################################
     def scorer(self):
+        timer = self.timer
+        batch_results = None
+        if self.batch:
+            try:
+                with timer.stage('avl_batch'):
+                    batch_results = self.run_batch()
+            except Exception as e:
+                logger.warning('❌FALHA NA SESSÃO ÚNICA, SIMULANDO CASO A CASO')
+                logger.warning('    ⚠️Erro: %s', e)
+
         try:
-            self.run_a(0)
-            print('✅CASO ALFA 0 CONCLUIDO')
+            with timer.stage('avl_a'):
+                self.run_a(0, batch_results)
+            logger.info('✅CASO ALFA 0 CONCLUIDO')
         except:
-            print('❌FALHA NA SIMULAÇÃO DE ALFA 0')
+            logger.warning('❌FALHA NA SIMULAÇÃO DE ALFA 0')
             self.score = 0
 
         try:
-            self.run_ge()
-            print('✅CASO EFEITO SOLO CONCLUIDO')
+            with timer.stage('avl_ge'):
+                self.run_ge()
+            logger.info('✅CASO EFEITO SOLO CONCLUIDO')
         except:
-            print('❌FALHA NA SIMULAÇÃO EM EFEITO SOLO')
+            logger.warning('❌FALHA NA SIMULAÇÃO EM EFEITO SOLO')
             self.score = 0
 
         try:
-            self.run_stall()
-            print('✅CASO ESTOL CONCLUIDO')
+            with timer.stage('avl_stall'):
+                self.run_stall(batch_results)
+            logger.info('✅CASO ESTOL CONCLUIDO')
         except Exception as e:
-            print('❌FALHA NA SIMULAÇÃO ATÉ O ESTOL')
-            print(f"    ⚠️Erro: {e}")
+            logger.warning('❌FALHA NA SIMULAÇÃO ATÉ O ESTOL')
+            logger.warning('    ⚠️Erro: %s', e)
             
             self.score = 0
 
         try:
-            self.run_trim()
-            print('✅CASO TRIMADO CONCLUIDO')
+            with timer.stage('avl_trim'):
+                self.run_trim(batch_results)
+            logger.info('✅CASO TRIMADO CONCLUIDO')
         except:
-            print('❌FALHA NA SIMULAÇÃO DE TRIMAGEM')
+            logger.warning('❌FALHA NA SIMULAÇÃO DE TRIMAGEM')
             self.score = 0
             self.a_trim = 0
 
         # MTOW e carga paga
         try:
-            self.mtow = mtow(
-                self.p, self.t, self.v, self.prototype.pv, self.prototype.s_ref,
-                self.cl_ge[0], self.clmax, self.cd_ge[0], self.cd[0],
-                self.prototype.pot, g=9.81, mu=0.03, n=1.2, gamma=0
-            )
+            with timer.stage('mtow'):
+                self.mtow = mtow_np(
+                    self.p, self.t, self.v, self.prototype.pv, self.prototype.s_ref,
+                    self.cl_ge[0], self.clmax, self.cd_ge[0], self.cd[0],
+                    self.prototype.pot, g=9.81, mu=0.03, n=1.2, gamma=0
+                )
             self.prototype.m = self.mtow
             self.cp = self.mtow - self.prototype.pv
             self.score = self.cp
         except Exception as e:
-            print('FALHA NA SIMULAÇÃO DE MTOW')
-            print(f"    ⚠️Erro: {e}")
+            logger.warning('FALHA NA SIMULAÇÃO DE MTOW')
+            logger.warning('    ⚠️Erro: %s', e)
             self.score = 0
             self.cp = 0
 
         # PONTUAÇÃO DA COMPETIÇÃO
         try:
-            comp_score_dict = compute_competition_score(self.prototype.pv, self.cp, self.prototype.w_bt)
+            with timer.stage('competition_score'):
+                comp_score_dict = compute_competition_score(self.prototype.pv, self.cp, self.prototype.w_bt)
             self.competition_score = comp_score_dict["PVOO"]
-            print(f"\n🏆 Pontuação de voo final (PVOO): {self.competition_score:.3f}\n")
+            logger.info('\n🏆 Pontuação de voo final (PVOO): %.3f\n', self.competition_score)
         except Exception as e:
-            print("\n⚠️ Erro ao calcular a pontuação da competição:\n", e)
+            logger.warning('\n⚠️ Erro ao calcular a pontuação da competição:\n %s', e)
             self.competition_score = 0
 
         # Penalidades
@@ -0,0 +1,158 @@
+"""
+Modelo de superposição linear do estol e da trimagem de um indivíduo.
+
+No VLM do AVL o cl de cada faixa e os coeficientes totais (CL, Cm) são afins no ângulo
+de ataque e na deflexão do profundor. Com três soluções do AVL por indivíduo:
+
+- base:      alfa 0, profundor 0
+- alfa:      alfa UNIT_ALPHA, profundor 0
+- profundor: alfa 0, profundor UNIT_ELEVATOR
+
+qualquer caso (alfa, profundor) é reconstruído por combinação linear, sem rodar o AVL:
+
+- trimagem com o profundor (casos de voo livre): profundor(alfa) = -(Cm0 + Cma alfa)/Cmd,
+  e o cl de cada faixa e o CL ficam afins em alfa ao longo do voo trimado
+- ângulo de estol: primeiro alfa em que alguma faixa verificada pelo check_stall atinge
+  o seu cl máximo, resolvido faixa a faixa em forma fechada
+- ângulo de trimagem sem profundor: alfa = -Cm0/Cma
+- ponto neutro: Xnp = Xref - Cref Cma/CLa, como no AVL
+
+O modelo ignora o que não é linear (a parcela do arrasto induzido no CL e a rotação do
+vento em alfas altos), então compare_with_sweep compara o resultado com a varredura
+caso a caso do Simulator antes de confiar nele para uma configuração nova.
+"""
+import numpy as np
+
+UNIT_ALPHA = 10.0       # Alfa (graus) da solução unitária em alfa
+UNIT_ELEVATOR = 5.0     # Deflexão (graus) da solução unitária do profundor
+
+
+class SuperpositionModel:
+    """
+    Coeficientes e cl das faixas de um indivíduo como função afim de (alfa, profundor).
+
+    - trim_elevator(alpha) / trim_alpha(): trimagem pelo profundor ou pelo alfa
+    - trimmed(alpha): CL e cl das faixas no voo livre trimado pelo profundor
+    - stall_alpha(clmaxes): ângulo de estol e superfície que estola
+    - neutral_point(x_ref, c_ref): Xnp
+    """
+
+    def __init__(self, base, alpha, elevator, unit_alpha=UNIT_ALPHA, unit_elevator=UNIT_ELEVATOR):
+        def totals(results, name):
+            return float(results['Totals'][name])
+
+        def strips(results):
+            return {surf: np.asarray(forces['cl'], dtype=float) for surf, forces in results['StripForces'].items()}
+
+        self.strip_forces = base['StripForces']     # Geometria das faixas (Yle, Chord...) para o cl máximo
+
+        # Valor em (0, 0) e derivadas por grau de alfa e de profundor
+        self.cl0 = totals(base, 'CLtot')
+        self.cl_a = (totals(alpha, 'CLtot') - self.cl0)/unit_alpha
+        self.cl_d = (totals(elevator, 'CLtot') - self.cl0)/unit_elevator
+        self.cm0 = totals(base, 'Cmtot')
+        self.cm_a = (totals(alpha, 'Cmtot') - self.cm0)/unit_alpha
+        self.cm_d = (totals(elevator, 'Cmtot') - self.cm0)/unit_elevator
+
+        s0, s_a, s_d = strips(base), strips(alpha), strips(elevator)
+        self.strip0 = s0
+        self.strip_a = {surf: (s_a[surf] - s0[surf])/unit_alpha for surf in s0}
+        self.strip_d = {surf: (s_d[surf] - s0[surf])/unit_elevator for surf in s0}
+
+        if abs(self.cm_d) < 1e-9:
+            raise RuntimeError('O profundor não altera o Cm: sem trimagem pelo profundor.')
+        if abs(self.cm_a) < 1e-9 or abs(self.cl_a) < 1e-9:
+            raise RuntimeError('CLa ou Cma nulos: modelo de superposição degenerado.')
+
+    ###########################################################################
+    # TRIMAGEM
+    ###########################################################################
+    def trim_elevator(self, alpha):
+        return -(self.cm0 + self.cm_a*alpha)/self.cm_d
+
+    def trim_alpha(self, elevator=0.0):
+        return -(self.cm0 + self.cm_d*elevator)/self.cm_a
+
+    def coefficients(self, alpha, elevator):
+        # (CL, {superfície: cl das faixas}) em um par (alfa, profundor)
+        cl = self.cl0 + self.cl_a*alpha + self.cl_d*elevator
+        strip_cl = {surf: self.strip0[surf] + self.strip_a[surf]*alpha + self.strip_d[surf]*elevator
+                    for surf in self.strip0}
+        return cl, strip_cl
+
+    def trimmed(self, alpha):
+        # (CL, cl das faixas) em alfa com o profundor trimando a aeronave
+        return self.coefficients(alpha, self.trim_elevator(alpha))
+
+    def neutral_point(self, x_ref, c_ref):
+        return x_ref - c_ref*self.cm_a/self.cl_a
+
+    ###########################################################################
+    # ESTOL
+    ###########################################################################
+    def stall_alpha(self, clmaxes, a_min=0.0, a_max=30.0, half_surfaces=('Wing',)):
+        '''
+        Primeiro alfa do voo trimado em [a_min, a_max] em que alguma faixa verificada
+        atinge o cl máximo (clmaxes: {superfície: cl máximo das faixas}). Como no
+        check_stall, só a primeira metade das faixas das superfícies em half_surfaces é
+        verificada. Devolve (alfa, superfície), ou (None, None) sem estol até a_max
+        '''
+        # Ao longo do voo trimado cl = p + q alfa em cada faixa
+        ratio = self.cm_a/self.cm_d
+        best = (None, None)
+        for surf, p in self.strip0.items():
+            p = p - self.strip_d[surf]*self.cm0/self.cm_d
+            q = self.strip_a[surf] - self.strip_d[surf]*ratio
+            clmax = np.asarray(clmaxes[surf], dtype=float)
+            if surf in half_surfaces:
+                n = len(p)//2
+                p, q, clmax = p[:n], q[:n], clmax[:n]
+
+            margin = clmax - p - q*a_min
+            if np.any(margin <= 0):
+                return a_min, surf
+            rising = q > 0
+            if not np.any(rising):
+                continue
+            alpha = float(np.min(a_min + margin[rising]/q[rising]))
+            if alpha <= a_max and (best[0] is None or alpha < best[0]):
+                best = (alpha, surf)
+        return best
+
+
+def compare_with_sweep(prototype, backend='avl'):
+    '''
+    Roda o mesmo indivíduo com a varredura de estol caso a caso e com o modelo de
+    superposição e devolve {grandeza: (varredura, superposição)}, incluindo as sessões
+    e os casos do AVL de cada um
+    '''
+    from simulator import Simulator
+
+    results = {}
+    for search in ('sweep', 'superposition'):
+        simulator = Simulator(prototype, cache=False, backend=backend, stall_search=search)
+        simulator.scorer()
+        results[search] = simulator
+
+    names = ['a_stall', 'clmax', 'a_trim', 'xnp', 'me', 'stall_constraint', 'n_avl_calls', 'n_avl_cases']
+    return {name: tuple(getattr(results[search], name, None) for search in ('sweep', 'superposition'))
+            for name in names}
+
+
+##### TESTES #####
+
+if __name__ == '__main__':
+    import sys
+    from benchmark import reference_designs
+    from prototype import Prototype
+
+    backend = sys.argv[1] if len(sys.argv) > 1 else 'vlm'
+    for name, kwargs in reference_designs().items():
+        print(f'\n{name} ({backend})')
+        try:
+            prototype = Prototype(**kwargs)
+        except ZeroDivisionError as e:
+            print(f'    Configuração não suportada pelo Prototype: {e}')
+            continue
+        for quantity, (sweep, model) in compare_with_sweep(prototype, backend).items():
+            print(f'    {quantity:<18}{sweep!s:>24}{model!s:>24}')
@@ -1,5 +1,6 @@
 from scipy.integrate import quad
 from scipy.optimize import root_scalar
+import numpy as np
 
 ##### OTIMIZAÇÃO DE TRANSIÇÃO DE AFILAMENTO #####
 
@@ -141,6 +142,28 @@ def mac(x, w_bt, w_baf, w_cr, w_ct):
 
     return (2/s_ref) * (int_reta+int_trap)
 
+##### CORDA MÉDIA AERODINÂMICA ANALÍTICA #####
+
+# A corda da asa mista é constante (w_cr) na parte reta e varia linearmente de w_cr a w_ct
+# na parte trapezoidal, então as integrais de s_mist e mac têm solução fechada.
+# Todas as funções aceitam escalares ou arrays (uma população inteira de asas).
+
+def s_mist_exact(w_bt, w_baf, w_cr, w_ct):
+    # Área da asa mista, medidas em metros e envergaduras completas
+
+    return w_cr*w_baf + (w_cr + w_ct)/2*(w_bt - w_baf)
+
+def mac_exact(w_bt, w_baf, w_cr, w_ct):
+    # Corda média aerodinâmica da asa mista, mesma definição de mac() sem quadratura numérica
+
+    w_bt, w_baf, w_cr, w_ct= np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in (w_bt, w_baf, w_cr, w_ct)])
+
+    int_reta= w_cr**2*w_baf/2
+    int_trap= (w_cr**2 + w_cr*w_ct + w_ct**2)/3*(w_bt - w_baf)/2
+    mac_val= (2/s_mist_exact(w_bt, w_baf, w_cr, w_ct))*(int_reta + int_trap)
+
+    return mac_val if mac_val.ndim else float(mac_val)
+
 ##### RESTRIÇÕES DE 2024 #####
 
 def restric(b,p,n=2):
@@ -169,4 +192,19 @@ def find_wb_restric(b, p ,n=2):
 if __name__ == '__main__':
 
     print(w_baf_opt(0.1584, 2.59745, 0.528))
-    print(mac(0, 2.52767524, 0.9691546630859376, 0.566, 0.172))
\ No newline at end of file
+    print(mac(0, 2.52767524, 0.9691546630859376, 0.566, 0.172))
+
+    # Regressão: mac_exact e s_mist_exact contra as versões com quad
+    rng= np.random.default_rng(0)
+    w_bt= rng.uniform(1.5, 3.5, 200)
+    w_baf= rng.uniform(0.5, 0.95, 200)*w_bt
+    w_cr= rng.uniform(0.25, 0.7, 200)
+    w_ct= rng.uniform(0.3, 1.0, 200)*w_cr
+
+    mac_quad= np.array([mac(0, *args) for args in zip(w_bt, w_baf, w_cr, w_ct)])
+    s_quad= np.array([s_mist(0, bt, cr, ct, baf) for bt, baf, cr, ct in zip(w_bt, w_baf, w_cr, w_ct)])
+    erro_mac= np.max(np.abs(mac_exact(w_bt, w_baf, w_cr, w_ct) - mac_quad))
+    erro_s= np.max(np.abs(s_mist_exact(w_bt, w_baf, w_cr, w_ct) - s_quad))
+    print('Erro máximo mac_exact x mac:', erro_mac)
+    print('Erro máximo s_mist_exact x s_mist:', erro_s)
+    assert erro_mac < 1e-10 and erro_s < 1e-10
\ No newline at end of file
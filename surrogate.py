@@ -0,0 +1,62 @@
+"""
+Modelo substituto do fitness do DE.
+
+Interpolação RBF (scipy) do fitness penalizado (objetivo + penalidade das restrições,
+o mesmo valor que o driver usa na seleção) em função das variáveis de design
+normalizadas nos limites. O driver usa o modelo para ordenar os filhos de cada geração
+e só manda para o Individual (AVL) a fração mais promissora.
+
+O modelo é refeito a cada geração com todas as avaliações verdadeiras acumuladas,
+incluindo as de execuções anteriores lidas do banco do SqliteRecorder.
+"""
+import numpy as np
+from scipy.interpolate import RBFInterpolator
+
+
+class FitnessSurrogate:
+    """
+    RBF do fitness penalizado sobre x normalizado em [0, 1].
+
+    - add(x, fitness): acrescenta avaliações verdadeiras (fitness infinito = falha, fora do modelo)
+    - ready: se já há amostras válidas suficientes para usar o modelo
+    - predict(x): fitness previsto para um conjunto de candidatos
+    """
+
+    def __init__(self, lower, upper, min_samples=80, neighbors=100, smoothing=1e-6):
+        self.lower = np.asarray(lower, dtype=float)
+        self.span = np.where(np.asarray(upper) > self.lower, np.asarray(upper) - self.lower, 1.0)
+        self.min_samples = min_samples
+        self.neighbors = neighbors
+        self.smoothing = smoothing
+        self.x = np.empty((0, len(self.lower)))
+        self.fitness = np.empty(0)
+        self._model = None
+
+    def __len__(self):
+        return int(np.isfinite(self.fitness).sum())
+
+    @property
+    def ready(self):
+        return len(self) >= self.min_samples
+
+    def add(self, x, fitness):
+        x = np.atleast_2d(x)
+        self.x = np.vstack([self.x, (x - self.lower)/self.span])
+        self.fitness = np.concatenate([self.fitness, np.asarray(fitness, dtype=float)])
+        self._model = None
+
+    def fit(self):
+        # Falhas (fitness infinito) ficam fora: os saltos que criariam estragam a interpolação
+        # Pontos repetidos tornam o sistema do RBF singular: fica a última avaliação de cada x
+        finite = np.isfinite(self.fitness)
+        x, idx = np.unique(self.x[finite][::-1], axis=0, return_index=True)
+        fitness = self.fitness[finite][::-1][idx]
+
+        neighbors = self.neighbors if len(x) > 3*self.neighbors else None
+        self._model = RBFInterpolator(x, fitness, neighbors=neighbors, smoothing=self.smoothing,
+                                      kernel='thin_plate_spline')
+
+    def predict(self, x):
+        if self._model is None:
+            self.fit()
+        return self._model((np.atleast_2d(x) - self.lower)/self.span)
@@ -2,6 +2,7 @@ from prototype import *
 from simulator import *
 from performance import *
 from airfoil_loader import *
+from mdo_logging import configure_logging
 import matplotlib.pyplot as plt
 import time
 
@@ -156,7 +157,8 @@ aviao2= Prototype( af_root_data=dados_root,
 
 aviao2.show_geometry() # Teste para verificar se a geometria está sendo criada corretamente
 aviao2.print_geometry_info()
-simulation2= Simulator(aviao2)
+configure_logging('DEBUG') # Mostra o andamento de cada caso e as tabelas de coeficientes
+simulation2= Simulator(aviao2, output_profile='full') # Todas as saídas do AVL para inspecionar o projeto
 simulation2.run_a()
 simulation2.scorer()
 simulation2.print_coeffs()
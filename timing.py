@@ -0,0 +1,81 @@
+"""
+Tempo de cada etapa da avaliação de um indivíduo.
+
+O StageTimer mede o tempo de parede (e quantas vezes cada etapa rodou) dentro de um
+Individual.compute: construção do Prototype, cada grupo de casos do AVL no scorer,
+cálculo do MTOW e pontuação da competição. Os tempos viram outputs time_<etapa> do
+indivíduo, gravados pelo recorder junto com avl_calls.
+
+O TimingSummary junta os tempos de todas as avaliações do processo e monta o relatório
+com p50/p95 por etapa impresso no fim do optimizer.py.
+"""
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+STAGES = ['prototype', 'avl_batch', 'avl_a', 'avl_ge', 'avl_stall', 'avl_trim', 'mtow', 'competition_score']
+
+
+class StageTimer:
+    """
+    Tempos acumulados (s) e número de execuções de cada etapa de uma avaliação.
+    """
+
+    def __init__(self):
+        self.times = dict.fromkeys(STAGES, 0.0)
+        self.calls = dict.fromkeys(STAGES, 0)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[name] = self.times.get(name, 0.0) + time.perf_counter() - start
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def outputs(self):
+        '''
+        Tempos de cada etapa como outputs do indivíduo (time_<etapa> e time_total)
+        '''
+        outputs = {f'time_{name}': self.times[name] for name in STAGES}
+        outputs['time_total'] = sum(self.times.values())
+        return outputs
+
+
+class TimingSummary:
+    """
+    Tempos e chamadas do AVL de todas as avaliações, para o relatório do fim da otimização.
+    """
+
+    def __init__(self):
+        self.rows = []
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, results):
+        # Avaliações sem tempos (p.ex. outputs antigos) ficam fora do relatório
+        if 'time_total' in results:
+            columns = [f'time_{name}' for name in STAGES] + ['time_total', 'avl_calls']
+            self.rows.append([float(results.get(name, 0.0)) for name in columns])
+
+    def report(self):
+        if not self.rows:
+            return 'Nenhuma avaliação com tempos registrados.'
+
+        data = np.array(self.rows)
+        lines = [f'⏱️ Tempos por avaliação ({len(data)} avaliações)',
+                 f"{'etapa':<20}{'p50 [ms]':>12}{'p95 [ms]':>12}{'total [s]':>12}{'fração':>10}"]
+        total = data[:, len(STAGES)].sum()
+        for ii, name in enumerate(STAGES + ['total']):
+            column = data[:, ii]
+            p50, p95 = np.percentile(column, [50, 95])*1e3
+            share = column.sum()/total if total > 0 else 0.0
+            lines.append(f'{name:<20}{p50:>12.1f}{p95:>12.1f}{column.sum():>12.2f}{share:>10.1%}')
+
+        calls = data[:, -1]
+        lines.append(f'Chamadas do AVL por indivíduo: média {calls.mean():.1f}, '
+                     f'p50 {np.percentile(calls, 50):.0f}, p95 {np.percentile(calls, 95):.0f}')
+        return '\n'.join(lines)
@@ -165,4 +165,48 @@ DESIGN_VARIABLES = {
     'cn_x': {'lower': -0.5, 'upper': -0.20},
     'cn_d': {'lower': -2.0, 'upper': 10.0},
     'cn_z': {'lower': 0.05, 'upper': 0.4},
-}
\ No newline at end of file
+}
+
+# ============================================================
+# EXECUÇÃO DAS SIMULAÇÕES
+# ============================================================
+
+AVL_BATCH = True            # Roda todos os casos de voo livre de um indivíduo (alfa 0, varredura de estol e trimagem) em uma única sessão do AVL
+AVL_MAX_CASES = 25          # Número máximo de casos por sessão (NRMAX do AVL). Listas maiores são divididas em mais sessões
+
+STALL_SEARCH = 'sweep'      # Busca do ângulo de estol: 'sweep' (varredura de 5 a 30 graus), 'secant' (falsa posição sobre a margem de estol) ou 'superposition' (estol e trimagem em forma fechada a partir de três soluções do AVL; valide com superposition.compare_with_sweep)
+STALL_TOL = 0.25            # Tolerância em graus do ângulo de estol na busca 'secant'
+TRIM_ESTIMATE = True        # Sem a sessão única (AVL_BATCH = False ou falha da sessão), estima a trimagem (alfa, Xnp, estol trimado) dos casos de alfa já simulados; o caso trimado só roda quando o alfa de trimagem fica fora da faixa amostrada
+
+AVL_CACHE = True                                # Reaproveita resultados do AVL já calculados para a mesma geometria e caso (False ignora o cache)
+AVL_CACHE_PATH = "optimizer_out/avl_cache.db"   # Banco SQLite do cache de resultados do AVL
+AVL_CACHE_MAX_ENTRIES = 200000                  # Limite de casos guardados; os menos usados recentemente são descartados
+
+N_WORKERS = 0               # Processos que avaliam a população de cada geração em paralelo (0 = em série). O AVL é single-thread, então use até o número de núcleos
+SCRATCH_ROOT = None         # Pasta dos arquivos temporários do AVL (None = /dev/shm, em memória, quando existir; senão a pasta temporária do sistema)
+SCRATCH_MIN_FREE_MB = 256   # Espaço livre mínimo na pasta de rascunho; abaixo disso usa a pasta temporária do sistema
+SCRATCH_STALE_HOURS = 24    # Pastas de rascunho sem o pid do dono no nome são apagadas depois desse tempo (as com pid, só quando o processo dono morreu, ou também por idade se o sistema não permite testar o processo)
+
+PRESCREEN = True            # Descarta sem rodar o AVL indivíduos que violam claramente restrições geométricas e de massa (ar, eh_ar, vht, vvt, x_cg_p, low_cg, eh_z_const)
+PRESCREEN_TOL = 0.20        # Violação mínima, relativa ao limite, para o indivíduo ser descartado na pré-triagem
+PRESCREEN_SCORE = 0.0       # Score atribuído aos indivíduos descartados (o mesmo de uma simulação que falha)
+
+AERO_BACKEND = 'avl'        # Solver aerodinâmico: 'avl' (executável via avlwrapper, um processo por sessão), 'avl_pipe' (um processo do AVL persistente por worker), 'vlm' (vórtices em ferradura em NumPy, no próprio processo; ainda não validado contra o AVL, ver vlm.py) ou 'replay' (resultados do AVL gravados em REPLAY_ARCHIVE)
+AVL_EXECUTABLE = 'avl'      # Executável do AVL usado pelo backend 'avl_pipe' (no Windows, 'avl' encontra o avl.exe da pasta do projeto)
+AVL_PIPE_TIMEOUT = 30       # Tempo máximo (s) de uma chamada ao AVL persistente antes de reiniciá-lo
+AVL_OUTPUT_PROFILE = 'lean' # Saídas pedidas ao AVL: 'lean' (só os blocos usados por cada tipo de caso) ou 'full' (todas, para inspecionar projetos escolhidos)
+
+REPLAY_RECORD = False                   # Grava cada resultado do AVL em REPLAY_ARCHIVE para o backend 'replay'
+REPLAY_ARCHIVE = "optimizer_out/avl_replay"   # Pasta com os resultados gravados (um .jsonl.gz por processo)
+
+SURROGATE = False           # Pré-seleciona os filhos de cada geração do DE com um modelo RBF do fitness e só avalia os mais promissores
+SURROGATE_FRACTION = 0.25   # Fração dos filhos de cada geração avaliada de verdade no modo surrogate
+SURROGATE_MIN_SAMPLES = 80  # Avaliações verdadeiras necessárias antes de o modelo começar a filtrar
+SURROGATE_DB = None         # Banco .db do SqliteRecorder de uma execução anterior para treinar o modelo desde o início (None = só a execução atual)
+
+POLAR_STALL = False         # Checagem de estol com o cl máximo de cada faixa tirado das polares Re*.csv no Reynolds local (False usa o cl_max do info.yaml)
+
+CHECKPOINT_EVERY = 1        # Intervalo, em gerações, entre os checkpoints do DE (<log>.db.ckpt) usados por optimizer.py --resume <log>.db
+
+LOG_LEVEL = 'WARNING'       # Nível das mensagens de cada avaliação: 'DEBUG' (tabelas de coeficientes e pontuação), 'INFO' (andamento de cada caso), 'WARNING' (só falhas)
+EVALUATION_LOG = True       # Grava um registro JSON por avaliação (variáveis de design e resultados) em <log>.jsonl ao lado do .db
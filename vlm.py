@@ -0,0 +1,652 @@
+"""
+Método de vórtices em ferradura (VLM) em NumPy, alternativa em processo ao executável do AVL.
+
+Lê a mesma Geometry do avlwrapper montada pelo Prototype (Surface, Section, Control,
+FileAirfoil) e segue as convenções do AVL:
+
+- eixos da geometria: x para trás, y para a direita, z para cima
+- distribuição de faixas e painéis com os mesmos espaçamentos (equal, cosine, sine, neg_sine)
+  sobre toda a envergadura da superfície, com as seções coincidindo com bordas de faixas
+- vórtice ligado a 1/4 e ponto de controle a 3/4 de cada painel, pernas de esteira em +x
+- incidência, torção, curvatura do perfil (linha média do geometry.dat) e deflexão das
+  superfícies de controle entram apenas como rotação das normais, com o controle
+  linearizado como no AVL (a circulação é linear na deflexão)
+- y_duplicate cria a metade espelhada da superfície, resolvida junto com o resto
+- y_symmetry simétrica espelha todas as superfícies em y = 0 do mesmo jeito (a antissimétrica
+  é rejeitada com ValueError)
+- z_symmetry (efeito solo) soma a imagem espelhada de todas as ferraduras com circulação oposta
+
+VLMSolver(geometry).run_cases(cases) devolve um dicionário no formato do session.get_results()
+do avlwrapper, com o subconjunto lido pelo Simulator: Totals (CLtot, CDtot, Cmtot, Alpha e
+deflexões), StabilityDerivatives (CLa, Cma, Cnb, Xnp) e StripForces (Yle, Chord, cl) de
+cada superfície, com a metade direita seguida da metade espelhada.
+
+A matriz de influência de uma geometria é fatorada (LU) uma única vez. Como a condição
+de contorno é linear nas componentes da velocidade não perturbada e nas deflexões, o
+solver guarda as soluções unitárias (uma por componente de velocidade e por controle) e
+qualquer caso, inclusive as iterações de Newton das trimagens, é só uma combinação
+dessas soluções, sem resolver o sistema de novo.
+
+Validação: o backend só foi conferido contra resultados analíticos (CLa da placa plana,
+cl0 da curvatura, y_symmetry x y_duplicate), ainda não contra o AVL. Antes de usar
+AERO_BACKEND = 'vlm' em uma campanha, rode este arquivo em uma máquina com o avl.exe:
+compare_backends roda a aeronave do tests.py nos dois backends e o teste falha se alguma
+diferença passar de AVL_TOL.
+"""
+import functools
+import os
+
+import numpy as np
+from scipy.linalg import lu_factor, lu_solve
+
+X_AXIS = np.array([1.0, 0.0, 0.0])
+D_DERIV = 0.5       # Passo (graus) das diferenças centrais das derivadas de estabilidade
+TRIM_TOL = 1e-7     # Tolerância do Cm nos casos trimados
+TRIM_STEP = 0.1     # Passo (graus) da derivada numérica do Cm no método de Newton
+TRIM_MAX_ITER = 20
+
+# Diferença máxima aceita entre o AVL e o VLM no compare_backends: (absoluta, relativa)
+AVL_TOL = {
+    'CLtot': (0.02, 0.05),
+    'CDtot': (0.002, 0.15),
+    'Cmtot': (0.02, 0.10),
+    'Cma': (0.05, 0.10),
+    'Cnb': (0.01, 0.20),
+    'Xnp': (0.01, 0.02),
+    'max cl Wing': (0.03, 0.05),
+}
+
+
+###########################################################################
+# LEITURA DA GEOMETRIA DO AVLWRAPPER
+###########################################################################
+def _value(obj, default=0.0):
+    # Enums do avlwrapper (Spacing, Symmetry) ou números simples
+    if obj is None:
+        return default
+    return float(getattr(obj, 'value', obj))
+
+
+def _attr(obj, *names, default=None):
+    # Primeiro atributo existente entre os nomes (os nomes mudam entre versões do avlwrapper)
+    for name in names:
+        if hasattr(obj, name):
+            return getattr(obj, name)
+    return default
+
+
+def _point(obj):
+    return np.array([getattr(obj, 'x', 0.0), getattr(obj, 'y', 0.0), getattr(obj, 'z', 0.0)], dtype=float)
+
+
+def spacing_fractions(n, spacing):
+    '''
+    Frações [0, 1] das n+1 bordas de uma distribuição do AVL (mesma mistura de equal,
+    cosine e sine da rotina SPACER). sine concentra no início e neg_sine no fim.
+    '''
+    s = _value(spacing)
+    i = np.arange(n + 1)/n
+    p_abs = abs(s)
+    n_space = int(p_abs)
+    if n_space == 0:
+        p_equ, p_cos, p_sin = 1 - p_abs, p_abs, 0.0
+    elif n_space == 1:
+        p_equ, p_cos, p_sin = 0.0, 2 - p_abs, p_abs - 1
+    else:
+        p_equ, p_cos, p_sin = min(p_abs - 2, 1.0), 0.0, max(3 - p_abs, 0.0)
+
+    x_sin = 1 - np.cos(np.pi/2*i) if s >= 0 else np.sin(np.pi/2*i)
+    return p_equ*i + p_cos*0.5*(1 - np.cos(np.pi*i)) + p_sin*x_sin
+
+
+@functools.lru_cache(maxsize=None)
+def camber_slope(dat_path):
+    '''
+    Inclinação dz/dx da linha média de um perfil em formato Selig ou Lednicer, como
+    função de x/c. Sem arquivo (ou com arquivo ilegível) o perfil é tratado como placa plana.
+    '''
+    flat = lambda x: np.zeros_like(np.asarray(x, dtype=float))
+    if dat_path is None:
+        return flat
+
+    path = dat_path if os.path.exists(dat_path) else dat_path.replace('\\', os.sep)
+    points = []
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    x, z = (float(v) for v in line.split()[:2])
+                except ValueError:
+                    continue
+                points.append((x, z))
+    except OSError:
+        return flat
+    if len(points) < 5:
+        return flat
+
+    points = np.array(points)
+    if points[0, 0] > 1.5:
+        # Lednicer: a primeira linha traz o número de pontos de cada lado
+        n_up = int(points[0, 0])
+        upper, lower = points[1:n_up + 1], points[n_up + 1:]
+    else:
+        i_le = int(np.argmin(points[:, 0]))
+        upper, lower = points[:i_le + 1][::-1], points[i_le:]
+
+    chord = np.linspace(0.0, 1.0, 201)
+    x_min = min(upper[:, 0].min(), lower[:, 0].min())
+    x_max = max(upper[:, 0].max(), lower[:, 0].max())
+    x = x_min + chord*(x_max - x_min)
+    z_up = np.interp(x, *upper[np.argsort(upper[:, 0])].T)
+    z_low = np.interp(x, *lower[np.argsort(lower[:, 0])].T)
+    slope = np.gradient((z_up + z_low)/2, x)
+
+    return lambda xc: np.interp(xc, chord, slope)
+
+
+def _airfoil_path(section):
+    airfoil = getattr(section, 'airfoil', None)
+    return getattr(airfoil, 'filename', None) if airfoil is not None else None
+
+
+###########################################################################
+# MALHA DE VÓRTICES
+###########################################################################
+class Lattice:
+    """
+    Painéis de todas as superfícies da geometria em arrays NumPy.
+
+    - a, b: extremidades do vórtice ligado de cada painel
+    - cp: pontos de controle
+    - normal: normais com incidência, torção e curvatura (controles neutros)
+    - d_normal: derivada da normal em relação à deflexão de cada controle (por radiano)
+    - strip: faixa de cada painel; as faixas guardam superfície, bordo de ataque, corda e largura
+    """
+
+    def __init__(self, geometry):
+        self.s_ref = _attr(geometry, 'reference_area', 'area')
+        self.c_ref = _attr(geometry, 'reference_chord', 'chord')
+        self.b_ref = _attr(geometry, 'reference_span', 'span')
+        self.ref_point = _point(_attr(geometry, 'reference_point', 'point'))
+
+        self.z_image = None
+        z_symmetry = _value(_attr(geometry, 'z_symmetry', 'z_symm'))
+        if z_symmetry != 0:
+            self.z_image = (float(_attr(geometry, 'z_symmetry_plane', 'z_symm_plane', default=0.0)), z_symmetry)
+
+        # Simetria em y (iYsym = 1): cada superfície é espelhada em y = 0, como com y_duplicate,
+        # o que vale para os casos simétricos do Simulator. A antissimétrica não tem equivalente
+        y_symmetry = _value(_attr(geometry, 'y_symmetry', 'y_symm'))
+        if y_symmetry < 0:
+            raise ValueError('O VLM não trata y_symmetry antissimétrica (iYsym = -1): '
+                             'use o backend avl para essa geometria.')
+
+        self.controls = []
+        panels = {key: [] for key in ('a', 'b', 'cp', 'normal', 'strip', 'controls')}
+        strips = {key: [] for key in ('surface', 'le', 'chord', 'width', 'normal')}
+
+        for surface in geometry.surfaces:
+            halves = [False]
+            if getattr(surface, 'y_duplicate', None) is not None or y_symmetry > 0:
+                halves.append(True)
+            for mirrored in halves:
+                self._add_surface(surface, mirrored, panels, strips)
+
+        self.a = np.array(panels['a'])
+        self.b = np.array(panels['b'])
+        self.cp = np.array(panels['cp'])
+        self.normal = np.array(panels['normal'])
+        self.strip = np.array(panels['strip'])
+        self.n = len(self.a)
+
+        # Derivada da normal para cada controle (zero fora dos painéis do controle)
+        self.d_normal = np.zeros((len(self.controls), self.n, 3))
+        for i, panel_controls in enumerate(panels['controls']):
+            for k, d_n in panel_controls.items():
+                self.d_normal[k, i] = d_n
+
+        self.strip_surface = strips['surface']
+        self.strip_le = np.array(strips['le'])
+        self.strip_chord = np.array(strips['chord'])
+        self.strip_width = np.array(strips['width'])
+        self.strip_normal = np.array(strips['normal'])
+
+    def control_index(self, name):
+        if name not in self.controls:
+            self.controls.append(name)
+        return self.controls.index(name)
+
+    def _sections(self, surface, mirrored):
+        # Seções em coordenadas globais (escala e translação da superfície aplicadas)
+        scale = _point(surface.scaling) if getattr(surface, 'scaling', None) is not None else np.ones(3)
+        shift = _point(surface.translation) if getattr(surface, 'translation', None) is not None else np.zeros(3)
+        surface_angle = _value(getattr(surface, 'angle', None))
+
+        sections = []
+        for section in surface.sections:
+            le = _point(section.leading_edge_point)*scale + shift
+            if mirrored:
+                le[1] = 2*_value(surface.y_duplicate) - le[1]
+            controls = {}
+            for control in getattr(section, 'controls', None) or []:
+                controls[control.name] = control
+            sections.append({
+                'le': le,
+                'chord': section.chord*scale[0],
+                'angle': _value(getattr(section, 'angle', None)) + surface_angle,
+                'camber': camber_slope(_airfoil_path(section)),
+                'controls': controls,
+                'n_spanwise': getattr(section, 'n_spanwise', None),
+                'span_spacing': getattr(section, 'span_spacing', None),
+            })
+        return sections
+
+    def _span_edges(self, surface, sections, stations):
+        # Bordas das faixas no comprimento ao longo da envergadura, com as seções em bordas
+        n_span = getattr(surface, 'n_spanwise', None)
+        if n_span is None:
+            edges = [0.0]
+            for j in range(len(sections) - 1):
+                frac = spacing_fractions(sections[j]['n_spanwise'] or 1, sections[j]['span_spacing'])
+                edges.extend(stations[j] + frac[1:]*(stations[j + 1] - stations[j]))
+            return np.array(edges)
+
+        edges = spacing_fractions(n_span, getattr(surface, 'span_spacing', None))*stations[-1]
+        for station in stations[1:-1]:
+            k = int(np.argmin(np.abs(edges[1:-1] - station))) + 1
+            edges[k] = station
+        return np.maximum.accumulate(edges)
+
+    def _add_surface(self, surface, mirrored, panels, strips):
+        sections = self._sections(surface, mirrored)
+        les = np.array([sec['le'] for sec in sections])
+        stations = np.concatenate([[0.0], np.cumsum(np.hypot(np.diff(les[:, 1]), np.diff(les[:, 2])))])
+        edges = self._span_edges(surface, sections, stations)
+        chord_frac = spacing_fractions(surface.n_chordwise, getattr(surface, 'chord_spacing', None))
+
+        def at(t, j):
+            # Bordo de ataque e corda na posição t dentro do trecho entre as seções j e j+1
+            w = (t - stations[j])/(stations[j + 1] - stations[j])
+            le = (1 - w)*sections[j]['le'] + w*sections[j + 1]['le']
+            chord = (1 - w)*sections[j]['chord'] + w*sections[j + 1]['chord']
+            return le, chord, w
+
+        for t0, t1 in zip(edges[:-1], edges[1:]):
+            if t1 - t0 <= 1e-12:
+                continue
+            j = min(int(np.searchsorted(stations, (t0 + t1)/2) - 1), len(sections) - 2)
+            le0, c0, _ = at(t0, j)
+            le1, c1, _ = at(t1, j)
+            le_mid, c_mid, w = at((t0 + t1)/2, j)
+            if mirrored:
+                # Mantém a orientação da normal igual à da metade original (espelhada)
+                le0, c0, le1, c1 = le1, c1, le0, c0
+
+            span_vec = le1 - le0
+            normal0 = np.cross(X_AXIS, span_vec)
+            normal0 /= np.linalg.norm(normal0)
+            angle = (1 - w)*sections[j]['angle'] + w*sections[j + 1]['angle']
+
+            # Controles presentes nas duas seções do trecho (ganho e articulação da seção interna)
+            controls = [(name, control) for name, control in sections[j]['controls'].items()
+                        if name in sections[j + 1]['controls']]
+
+            strip_id = len(strips['surface'])
+            strips['surface'].append(surface.name)
+            strips['le'].append(le_mid)
+            strips['chord'].append(c_mid)
+            strips['width'].append(np.hypot(span_vec[1], span_vec[2]))
+            strips['normal'].append(normal0)
+
+            for x0, x1 in zip(chord_frac[:-1], chord_frac[1:]):
+                x_v = x0 + 0.25*(x1 - x0)
+                x_c = x0 + 0.75*(x1 - x0)
+                slope = (1 - w)*sections[j]['camber'](x_c) + w*sections[j + 1]['camber'](x_c)
+                theta = np.radians(angle) - np.arctan(slope)
+
+                panels['a'].append(le0 + x_v*c0*X_AXIS)
+                panels['b'].append(le1 + x_v*c1*X_AXIS)
+                panels['cp'].append(le_mid + x_c*c_mid*X_AXIS)
+                panels['normal'].append(np.cos(theta)*normal0 + np.sin(theta)*X_AXIS)
+                panels['strip'].append(strip_id)
+
+                d_normal = {}
+                for name, control in controls:
+                    if x_c > control.x_hinge:
+                        gain = _value(getattr(control, 'gain', 1.0), 1.0)
+                        if mirrored:
+                            gain *= _value(getattr(control, 'duplicate_sign', 1.0), 1.0)
+                        d_normal[self.control_index(name)] = gain*(-np.sin(theta)*normal0 + np.cos(theta)*X_AXIS)
+                panels['controls'].append(d_normal)
+
+
+###########################################################################
+# LEI DE BIOT-SAVART
+###########################################################################
+def _segment_velocity(p, a, b, core=1e-6):
+    # Velocidade induzida em p (M,3) por segmentos a->b (N,3) de circulação unitária: (M,N,3)
+    r1 = p[:, None, :] - a[None, :, :]
+    r2 = p[:, None, :] - b[None, :, :]
+    r0 = b - a
+    cross = np.cross(r1, r2)
+    cross2 = np.einsum('mnc,mnc->mn', cross, cross)
+    n1 = np.linalg.norm(r1, axis=2)
+    n2 = np.linalg.norm(r2, axis=2)
+    valid = (cross2 > (core*np.linalg.norm(r0, axis=1))**2) & (n1 > 0) & (n2 > 0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = np.einsum('nc,mnc->mn', r0, r1/n1[..., None] - r2/n2[..., None])/(4*np.pi*cross2)
+        return np.where(valid[..., None], cross*k[..., None], 0.0)
+
+
+def _trailing_velocity(p, a, core=1e-6):
+    # Velocidade induzida em p por filamentos semi-infinitos que saem de a em +x: (M,N,3)
+    r = p[:, None, :] - a[None, :, :]
+    n = np.linalg.norm(r, axis=2)
+    den = n*(n - r[..., 0])
+    valid = den > core**2
+    v = np.stack([np.zeros_like(n), -r[..., 2], r[..., 1]], axis=2)      # x × r
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = 1/(4*np.pi*den)
+        return np.where(valid[..., None], v*k[..., None], 0.0)
+
+
+def horseshoe_velocity(p, a, b):
+    '''
+    Velocidade induzida em p (M,3) por ferraduras de circulação unitária
+    (esteira em +x até a, vórtice ligado a->b, esteira de b para +x): (M,N,3)
+    '''
+    return _segment_velocity(p, a, b) + _trailing_velocity(p, b) - _trailing_velocity(p, a)
+
+
+###########################################################################
+# SOLVER
+###########################################################################
+class VLMSolver:
+    """
+    Solver de vórtices em ferradura de uma geometria do avlwrapper.
+
+    - aic: matriz de influência normal nos pontos de controle, fatorada uma vez (lu)
+    - unit: circulações para velocidade unitária em x, y e z (N, 3)
+    - unit_controls: o mesmo para 1 radiano de cada controle (n_controles, N, 3)
+    - solve(alpha, beta, deltas): circulação de K casos de uma vez (N, K), sem novo sistema
+    - run_cases(cases): resultados no formato do avlwrapper
+    """
+
+    def __init__(self, geometry):
+        self.lattice = lat = Lattice(geometry)
+        mid = (lat.a + lat.b)/2
+
+        self.w_cp = horseshoe_velocity(lat.cp, lat.a, lat.b)
+        self.w_mid = horseshoe_velocity(mid, lat.a, lat.b)
+        if lat.z_image is not None:
+            z_plane, sign = lat.z_image
+            a_img, b_img = lat.a.copy(), lat.b.copy()
+            a_img[:, 2] = 2*z_plane - a_img[:, 2]
+            b_img[:, 2] = 2*z_plane - b_img[:, 2]
+            # Plano simétrico (solo): imagem com circulação oposta; antissimétrico: mesma circulação
+            self.w_cp -= sign*horseshoe_velocity(lat.cp, a_img, b_img)
+            self.w_mid -= sign*horseshoe_velocity(mid, a_img, b_img)
+
+        # AIC e velocidade induzida nos pontos médios como matrizes: produtos com BLAS (@) em
+        # vez do einsum sem otimização, que a cada chamada percorre os N²x3 termos um a um
+        self.aic = np.matmul(self.w_cp, lat.normal[:, :, None])[..., 0]
+        self.w_mid = self.w_mid.transpose(0, 2, 1).reshape(3*lat.n, lat.n)     # (3N, N)
+        self.mid = mid
+
+        # Condição de contorno (V + v_ind)·n = 0 com o controle linearizado: o lado direito
+        # é -V·(n + δ dn), então bastam as soluções de -n e -dn para cada componente de V
+        self.lu = lu_factor(self.aic)
+        self.unit = lu_solve(self.lu, -lat.normal)
+        self.unit_controls = np.array([lu_solve(self.lu, -d_normal) for d_normal in lat.d_normal]).reshape(-1, lat.n, 3)
+
+    @staticmethod
+    def freestream(alpha, beta):
+        # Velocidade não perturbada unitária nos eixos da geometria, alfa e beta em graus: (K,3)
+        a, b = np.radians(alpha), np.radians(beta)
+        return np.stack([np.cos(a)*np.cos(b), -np.sin(b), np.sin(a)*np.cos(b)], axis=1)
+
+    def solve(self, alpha, beta, deltas):
+        # Combinação das soluções unitárias para K casos: (N, K)
+        v = self.freestream(alpha, beta)
+        gamma = self.unit @ v.T
+        for k, unit in enumerate(self.unit_controls):
+            gamma += (unit @ v.T)*np.radians(deltas[:, k])
+        return gamma
+
+    def loads(self, gamma, alpha, beta, strips=False):
+        '''
+        Coeficientes globais (e de faixa) a partir das circulações de K casos
+        '''
+        lat = self.lattice
+        v = self.freestream(alpha, beta)
+        v_ind = (self.w_mid @ gamma).reshape(lat.n, 3, -1).transpose(0, 2, 1)      # (N,K,3)
+        v_local = v[None, :, :] + v_ind
+        force = gamma[..., None]*np.cross(v_local, (lat.b - lat.a)[:, None, :])     # (N,K,3) com rho=1, V=1
+        qs = 0.5*lat.s_ref
+
+        total = force.sum(axis=0)
+        moment = np.cross((self.mid - lat.ref_point)[:, None, :], force).sum(axis=0)
+        a = np.radians(alpha)
+        cl_body, cn_body = -moment[:, 0]/(qs*lat.b_ref), -moment[:, 2]/(qs*lat.b_ref)
+        coeffs = {
+            'CLtot': (total[:, 2]*np.cos(a) - total[:, 0]*np.sin(a))/qs,
+            'CDtot': np.einsum('kc,kc->k', total, v)/qs,
+            'CYtot': total[:, 1]/qs,
+            'Cltot': cl_body,
+            'Cmtot': moment[:, 1]/(qs*lat.c_ref),
+            'Cntot': cn_body,
+            "Cl'tot": cl_body*np.cos(a) + cn_body*np.sin(a),
+            "Cn'tot": cn_body*np.cos(a) - cl_body*np.sin(a),
+        }
+        coeffs['CDind'] = coeffs['CDtot']
+
+        if strips:
+            n_strips = len(lat.strip_surface)
+            strip_force = np.zeros((n_strips,) + force.shape[1:])
+            np.add.at(strip_force, lat.strip, force)
+            # Sustentação de faixa: componente da força normal ao escoamento no plano da normal da faixa
+            lift_dir = lat.strip_normal[:, None, :] - np.einsum('sc,kc->sk', lat.strip_normal, v)[..., None]*v[None, :, :]
+            lift_dir /= np.linalg.norm(lift_dir, axis=2, keepdims=True)
+            coeffs['strip_cl'] = np.einsum('skc,skc->sk', strip_force, lift_dir)/(0.5*lat.strip_chord*lat.strip_width)[:, None]
+
+        return coeffs
+
+    def coefficients(self, alpha, beta, deltas, strips=False):
+        return self.loads(self.solve(alpha, beta, deltas), alpha, beta, strips)
+
+    ###########################################################################
+    # CASOS NO FORMATO DO AVLWRAPPER
+    ###########################################################################
+    def run_cases(self, cases):
+        '''
+        Resolve uma lista de casos e devolve {nome: resultados} como o session.get_results().
+
+        Cada caso é um dicionário com 'name', 'alpha', 'beta' (opcional) e a deflexão de
+        cada controle pelo nome. alpha ou um controle iguais a 'Cm' são ajustados para
+        Cm=0 (uma variável por caso), os demais valores são em graus.
+        '''
+        controls = self.lattice.controls
+        n_cases = len(cases)
+        alpha = np.zeros(n_cases)
+        beta = np.zeros(n_cases)
+        deltas = np.zeros((n_cases, len(controls)))
+        trim = []
+
+        for i, case in enumerate(cases):
+            beta[i] = case.get('beta', 0.0) or 0.0
+            for col, name in [(None, 'alpha')] + list(enumerate(controls)):
+                value = case.get(name, 0.0)
+                if isinstance(value, str):
+                    if value != 'Cm':
+                        raise ValueError(f"Restrição '{value}' de {name} não suportada pelo VLM.")
+                    trim.append((i, col))
+                elif col is None:
+                    alpha[i] = value
+                elif value is not None:
+                    deltas[i, col] = value
+
+        if trim:
+            self.trim(alpha, beta, deltas, trim)
+
+        coeffs = self.coefficients(alpha, beta, deltas, strips=True)
+        derivs = self.derivatives(alpha, beta, deltas)
+
+        results = {}
+        for i, case in enumerate(cases):
+            totals = {key: float(values[i]) for key, values in coeffs.items() if key != 'strip_cl'}
+            totals.update(Alpha=float(alpha[i]), Beta=float(beta[i]), Mach=0.0)
+            totals.update({name: float(deltas[i, k]) for k, name in enumerate(controls)})
+            results[case['name']] = {
+                'Totals': totals,
+                'StabilityDerivatives': {key: float(values[i]) for key, values in derivs.items()},
+                'StripForces': self.strip_forces(coeffs['strip_cl'][:, i]),
+            }
+        return results
+
+    def trim(self, alpha, beta, deltas, trim):
+        # Newton vetorizado sobre todos os casos trimados (alfa ou controle para Cm=0),
+        # com a derivada do Cm por diferença central; cada iteração só combina soluções unitárias
+        rows = np.array([i for i, _ in trim])
+
+        def set_values(x):
+            for (i, col), value in zip(trim, x):
+                if col is None:
+                    alpha[i] = value
+                else:
+                    deltas[i, col] = value
+
+        def cm(*points):
+            # Cm de cada caso trimado em vários valores da variável livre, avaliados juntos
+            a = np.tile(alpha[rows], len(points))
+            d = np.tile(deltas[rows], (len(points), 1))
+            for p, x in enumerate(points):
+                for r, (_, col) in enumerate(trim):
+                    if col is None:
+                        a[p*len(trim) + r] = x[r]
+                    else:
+                        d[p*len(trim) + r, col] = x[r]
+            return np.split(self.coefficients(a, np.tile(beta[rows], len(points)), d)['Cmtot'], len(points))
+
+        x = np.zeros(len(trim))
+        for _ in range(TRIM_MAX_ITER):
+            f, f_p, f_m = cm(x, x + TRIM_STEP, x - TRIM_STEP)
+            if np.all(np.abs(f) < TRIM_TOL):
+                break
+            df = (f_p - f_m)/(2*TRIM_STEP)
+            x = x - np.where(np.abs(df) > 1e-12, f/df, 0.0)
+        else:
+            raise RuntimeError('Trimagem do VLM não convergiu.')
+        set_values(x)
+
+    def derivatives(self, alpha, beta, deltas):
+        # Derivadas (por radiano) por diferenças centrais, com os controles fixos
+        n_cases = len(alpha)
+        h = D_DERIV
+        a = np.concatenate([alpha + h, alpha - h, alpha, alpha])
+        b = np.concatenate([beta, beta, beta + h, beta - h])
+        c = self.coefficients(a, b, np.tile(deltas, (4, 1)))
+        split = lambda key: np.split(c[key], 4)
+        d = 2*np.radians(h)
+
+        cl_p, cl_m, _, _ = split('CLtot')
+        cm_p, cm_m, _, _ = split('Cmtot')
+        _, _, cn_p, cn_m = split("Cn'tot")
+        _, _, cy_p, cy_m = split('CYtot')
+        _, _, cr_p, cr_m = split("Cl'tot")
+
+        derivs = {
+            'CLa': (cl_p - cl_m)/d,
+            'Cma': (cm_p - cm_m)/d,
+            'Cnb': (cn_p - cn_m)/d,
+            'CYb': (cy_p - cy_m)/d,
+            'Clb': (cr_p - cr_m)/d,
+        }
+        lat = self.lattice
+        derivs['Xnp'] = lat.ref_point[0] - lat.c_ref*derivs['Cma']/derivs['CLa']
+        return derivs
+
+    def strip_forces(self, strip_cl):
+        lat = self.lattice
+        forces = {}
+        for s, name in enumerate(lat.strip_surface):
+            surf = forces.setdefault(name, {'Xle': [], 'Yle': [], 'Zle': [], 'Chord': [], 'Area': [], 'cl': []})
+            surf['Xle'].append(float(lat.strip_le[s, 0]))
+            surf['Yle'].append(float(lat.strip_le[s, 1]))
+            surf['Zle'].append(float(lat.strip_le[s, 2]))
+            surf['Chord'].append(float(lat.strip_chord[s]))
+            surf['Area'].append(float(lat.strip_chord[s]*lat.strip_width[s]))
+            surf['cl'].append(float(strip_cl[s]))
+        return forces
+
+
+def run_cases(geometry, cases):
+    '''
+    Atalho: monta o solver da geometria e resolve a lista de casos
+    '''
+    return VLMSolver(geometry).run_cases(cases)
+
+
+###########################################################################
+# VALIDAÇÃO CONTRA O AVL
+###########################################################################
+def compare_backends(prototype, alphas=(0, 4, 8), ground_effect=False):
+    '''
+    Roda os mesmos casos (alfa fixo com profundor trimado e caso trimado) no AVL e no VLM
+    e devolve {caso: {grandeza: (avl, vlm)}} para as grandezas lidas pelo Simulator
+    '''
+    from simulator import Simulator
+
+    results = {}
+    for backend in ('avl', 'vlm'):
+        simulator = Simulator(prototype, cache=False, backend=backend)
+        specs = [simulator.alpha_spec(a, simulator.alpha_name(a)) for a in alphas]
+        if not ground_effect:
+            specs.append(simulator.trim_spec())
+        results[backend] = simulator.run_cases(specs, ground_effect=ground_effect)
+
+    comparison = {}
+    for name, avl_case in results['avl'].items():
+        vlm_case = results['vlm'][name]
+        comparison[name] = {key: (avl_case['Totals'].get(key), vlm_case['Totals'].get(key))
+                            for key in ('Alpha', 'CLtot', 'CDtot', 'Cmtot', 'elevator')}
+        comparison[name].update({key: (avl_case['StabilityDerivatives'].get(key), vlm_case['StabilityDerivatives'].get(key))
+                                 for key in ('Cma', 'Cnb', 'Xnp')})
+        avl_wing = avl_case['StripForces'].get('Wing', {}).get('cl', [0.0])
+        vlm_wing = vlm_case['StripForces'].get('Wing', {}).get('cl', [0.0])
+        comparison[name]['max cl Wing'] = (max(avl_wing), max(vlm_wing))
+    return comparison
+
+
+##### TESTES #####
+
+if __name__ == '__main__':
+    from prototype import Prototype
+
+    # Aeronave de referência do tests.py
+    dados_root = {'name': 'MIN1112', 'cl_max': 2.39, 'alpha_cl_max': 12.0, 'dat_path': 'airfoils/assymmetric/MIN1112/geometry.dat'}
+    dados_tip = {'name': 'eppler421', 'cl_max': 1.8, 'alpha_cl_max': 11.0, 'dat_path': 'airfoils/assymmetric/eppler421/geometry.dat'}
+    dados_eh = {'name': 'NACA0012', 'cl_max': 1.2, 'alpha_cl_max': 15.0, 'dat_path': 'airfoils/symmetric/NACA0012/geometry.dat'}
+
+    aviao = Prototype(af_root_data=dados_root, af_tip_data=dados_tip, af_eh_data=dados_eh, af_ev_data=dados_eh,
+                      af_canard_data=dados_eh, cn_b=0.0, cn_cr=0.15, cn_ct=0.9, cn_inc=0.0, cn_x=-0.5, cn_d=4.0, cn_z=0.0,
+                      w_bt=2.274771763125795, w_baf=0.9, w_cr=0.46835090245141264, w_ci=0.776990228187889,
+                      w_ct=0.6638203815384615, w_z=0.15, w_inc=2.9744171469230767, w_wo=1.0977240731062243, w_d=0.0,
+                      eh_b=0.75, eh_cr=0.33214639133338325, eh_ct=0.7, eh_inc=-3.0, ev_b=0.4, ev_ct=0.9201353525600001,
+                      eh_x=1.0, eh_z=0.50, motor_x=-0.15129635916666673)
+
+    failures = []
+    for ge in (False, True):
+        print(f'\n--- AVL x VLM (efeito solo={ge}) ---')
+        for case, values in compare_backends(aviao, ground_effect=ge).items():
+            print(case)
+            for key, (avl, vlm) in values.items():
+                delta = None if avl is None or vlm is None else vlm - avl
+                print(f'    {key:>12}: AVL={avl}  VLM={vlm}  delta={delta}')
+                if key in AVL_TOL and delta is not None:
+                    tol_abs, tol_rel = AVL_TOL[key]
+                    if abs(delta) > max(tol_abs, tol_rel*abs(avl)):
+                        failures.append(f'{case} {key} (ge={ge}): AVL={avl:.4f} VLM={vlm:.4f}')
+
+    assert not failures, 'VLM fora da tolerância do AVL:\n' + '\n'.join(failures)
+    print('\n✅ VLM dentro de AVL_TOL em todos os casos')